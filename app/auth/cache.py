@@ -0,0 +1,116 @@
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from app.auth.models import User
+
+SESSION_CACHE_MAX_ENTRIES = int(os.getenv("SESSION_CACHE_MAX_ENTRIES", "10000"))
+SESSION_CACHE_TTL_SECONDS = float(os.getenv("SESSION_CACHE_TTL_SECONDS", "60"))
+
+USER_COLUMNS = tuple(column.key for column in User.__table__.columns)
+
+
+class CachedSession:
+    """ Önbellekteki tek kayıt: session bitiş zamanı ve kullanıcının kolon değerleri. """
+    __slots__ = ("user_id", "valid_until", "user_snapshot", "cached_until")
+
+    def __init__(self, valid_until: datetime, user_snapshot: dict, cached_until: float):
+        self.user_id = user_snapshot["userid"]
+        self.valid_until = valid_until
+        self.user_snapshot = user_snapshot
+        self.cached_until = cached_until
+
+    def is_session_valid(self) -> bool:
+        return self.valid_until > datetime.now(timezone.utc)
+
+    def to_user(self) -> User:
+        """ Her çağrıda yeni, session'a bağlı olmayan bir User döner; çağıran değiştirse de önbellek bozulmaz. """
+        return User(**self.user_snapshot)
+
+
+class SessionCache:
+    """
+    Session token -> (session bitişi, kullanıcı) için sınırlı boyutlu TTL/LRU önbellek.
+    Sadece bu process içinde geçerlidir; diğer worker'lar en fazla TTL kadar eski veri görebilir.
+    Kullanıcı veya session değiştiğinde invalidate_* çağrılmalıdır.
+    """
+
+    def __init__(self, max_entries: int = SESSION_CACHE_MAX_ENTRIES, ttl_seconds: float = SESSION_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, CachedSession] = OrderedDict()
+        self._tokens_by_user: dict[int, set[str]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, token: str) -> CachedSession | None:
+        entry = self._entries.get(token)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry.cached_until <= time.monotonic() or not entry.is_session_valid():
+            self._remove(token)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(token)
+        self.hits += 1
+        return entry
+
+    def peek(self, token: str) -> CachedSession | None:
+        """ İstatistik ve LRU sırasını değiştirmeden bakar; middleware gibi yan okuyucular için. """
+        entry = self._entries.get(token)
+        if entry is None or entry.cached_until <= time.monotonic() or not entry.is_session_valid():
+            return None
+        return entry
+
+    def put(self, token: str, valid_until: datetime, user: User) -> CachedSession:
+        if valid_until.tzinfo is None:
+            valid_until = valid_until.replace(tzinfo=timezone.utc)
+        snapshot = {key: getattr(user, key) for key in USER_COLUMNS}
+        entry = CachedSession(valid_until, snapshot, time.monotonic() + self.ttl_seconds)
+        if token in self._entries:
+            self._remove(token)
+        self._entries[token] = entry
+        self._tokens_by_user.setdefault(entry.user_id, set()).add(token)
+        while len(self._entries) > self.max_entries:
+            oldest_token = next(iter(self._entries))
+            self._remove(oldest_token)
+            self.evictions += 1
+        return entry
+
+    def invalidate_token(self, token: str) -> None:
+        self._remove(token)
+
+    def invalidate_user(self, user_id: int) -> None:
+        for token in self._tokens_by_user.pop(user_id, set()):
+            self._entries.pop(token, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._tokens_by_user.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def _remove(self, token: str) -> None:
+        entry = self._entries.pop(token, None)
+        if entry is None:
+            return
+        tokens = self._tokens_by_user.get(entry.user_id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[entry.user_id]
+
+
+session_cache = SessionCache()
@@ -0,0 +1,64 @@
+"""
+bcrypt maliyetini bu sunucuda ölçer ve hedef doğrulama süresine uyan BCRYPT_ROUNDS değerini önerir.
+
+    python -m app.auth.calibrate --target-ms 250
+
+Önerilen değer ortama yazılır; eski maliyetle saklanan hash'ler kullanıcılar giriş yaptıkça
+arka planda yeni maliyete çevrilir, kimsenin şifresini sıfırlaması gerekmez.
+"""
+import argparse
+import statistics
+import time
+
+from passlib.hash import bcrypt
+
+MIN_ROUNDS = 10
+MAX_ROUNDS = 16
+
+
+def measure_verify_ms(rounds: int, samples: int) -> float:
+    """ Verilen maliyetteki bir hash'i doğrulamanın medyan süresini (ms) ölçer. """
+    hashed = bcrypt.using(rounds=rounds).hash("calibration-password")
+    durations = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        bcrypt.verify("calibration-password", hashed)
+        durations.append((time.perf_counter() - started) * 1000)
+    return statistics.median(durations)
+
+
+def calibrate(target_ms: float, samples: int = 5, min_rounds: int = MIN_ROUNDS,
+              max_rounds: int = MAX_ROUNDS) -> tuple[int, dict[int, float]]:
+    """
+    Medyan doğrulama süresi target_ms'i aşmayan en yüksek maliyeti döner (en az min_rounds).
+    Her maliyet süreyi yaklaşık iki katına çıkardığından hedef aşılınca ölçüm durdurulur.
+    """
+    timings = {}
+    chosen = min_rounds
+    for rounds in range(min_rounds, max_rounds + 1):
+        timings[rounds] = measure_verify_ms(rounds, samples)
+        if timings[rounds] > target_ms:
+            break
+        chosen = rounds
+    return chosen, timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="bcrypt maliyetini hedef doğrulama süresine göre seçer.")
+    parser.add_argument("--target-ms", type=float, default=250, help="Hedef doğrulama süresi (ms)")
+    parser.add_argument("--samples", type=int, default=5, help="Maliyet başına ölçüm sayısı")
+    parser.add_argument("--min-rounds", type=int, default=MIN_ROUNDS)
+    parser.add_argument("--max-rounds", type=int, default=MAX_ROUNDS)
+    args = parser.parse_args()
+
+    chosen, timings = calibrate(args.target_ms, args.samples, args.min_rounds, args.max_rounds)
+    for rounds, elapsed in timings.items():
+        marker = " <-" if rounds == chosen else ""
+        print(f"rounds={rounds:>2}  verify={elapsed:8.1f} ms{marker}")
+    if timings[chosen] > args.target_ms:
+        print(f"Uyarı: en düşük maliyet bile hedefi ({args.target_ms:.0f} ms) aşıyor.")
+    print(f"BCRYPT_ROUNDS={chosen}")
+
+
+if __name__ == "__main__":
+    main()
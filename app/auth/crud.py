@@ -2,37 +2,44 @@ from datetime import datetime, timezone
 
 
 from app.auth.models import *
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update, delete
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.auth.schemas import UserUpdate
+from app.auth.security import session_token_digest
+from app.reviews.models import Review
 
 
 # Kullanıcı oluştur, commit kısmı daha sonra yapılmalı
-def create_user(db: Session, user: User) -> User:
+async def create_user(db: AsyncSession, user: User) -> User:
     db.add(user)
-    db.flush()
+    await db.flush()
     return user
 
  # Kullanıcı nesnesine göre, mail ya da telefon için arama yap
-def get_user_by_login(db: Session, user_data: User):
-    query = db.query(User)
+async def get_user_by_login(db: AsyncSession, user_data: User):
+    query = select(User)
     if user_data.email and user_data.phone:
-        return query.filter(User.email == user_data.email, User.phone == user_data.phone).first()
+        query = query.where(User.email == user_data.email, User.phone == user_data.phone)
     elif user_data.email:
-        return query.filter(User.email == user_data.email).first()
+        query = query.where(User.email == user_data.email)
     elif user_data.phone:
-        return query.filter(User.phone == user_data.phone).first()
-    return None
+        query = query.where(User.phone == user_data.phone)
+    else:
+        return None
+    result = await db.execute(query.limit(1))
+    return result.scalars().first()
 
-def get_user_by_id(db: Session, userid: int) -> User | None:
-    return db.query(User).filter(User.userid == userid).first()
+async def get_user_by_id(db: AsyncSession, userid: int) -> User | None:
+    result = await db.execute(select(User).where(User.userid == userid))
+    return result.scalars().first()
 
 
-def update_user(db: Session, user_id: int, user_update_data: UserUpdate) -> User | None:
-    db_user = get_user_by_id(db, user_id)
+async def update_user(db: AsyncSession, user_id: int, user_update_data: UserUpdate) -> User | None:
+    db_user = await get_user_by_id(db, user_id)
     if db_user is None:
         return None
-    
+
     update_data = user_update_data.model_dump(exclude_unset=True)
 
     for key, value in update_data.items():
@@ -40,76 +47,144 @@ def update_user(db: Session, user_id: int, user_update_data: UserUpdate) -> User
 
     return db_user
 
-def update_user_password(db: Session, user_id: int, password: str):
-    db_user = db.query(User).filter(User.userid == user_id).first()
+async def update_user_password(db: AsyncSession, user_id: int, password: str):
+    db_user = await get_user_by_id(db, user_id)
     if db_user:
         db_user.password = password
-        db.commit()
-        db.refresh(db_user)
+        await db.commit()
+        await db.refresh(db_user)
     return db_user
 
+async def replace_password_hash(db: AsyncSession, user_id: int, old_hash: str, new_hash: str) -> bool:
+    """ Sadece hash hâlâ old_hash ise yazar; bu arada değiştirilmiş şifrenin üzerine yazılmaz. """
+    result = await db.execute(
+        update(User).where(User.userid == user_id, User.password == old_hash).values(password=new_hash)
+    )
+    await db.commit()
+    return result.rowcount == 1
 
-def save_session(db: Session, session: SessionModel) -> SessionModel:
+
+def save_session(db: AsyncSession, session: SessionModel) -> SessionModel:
     db.add(session)
     return session
 
 """
     Session getir
 """
-def get_session(db: Session, session_id: str) -> SessionModel | None:
-    return db.query(SessionModel).filter(SessionModel.session_id == session_id).first()
+async def get_session(db: AsyncSession, session_id: str) -> SessionModel | None:
+    result = await db.execute(select(SessionModel).where(SessionModel.token_hash == session_token_digest(session_id)))
+    return result.scalars().first()
+
+"""
+    İmzalı token'ı iptal edildi olarak işaretle; diğer worker'lar revoked_at üzerinden senkronize olur.
+"""
+async def revoke_session(db: AsyncSession, session_id: str):
+    await db.execute(
+        update(SessionModel)
+        .where(SessionModel.token_hash == session_token_digest(session_id))
+        .values(revoked_at=datetime.now(timezone.utc))
+    )
 
-def edit_email_status(db: Session, user_id: int, status: bool):
-    db.query(User).filter(User.userid == user_id).update({User.email_status: status})
-    db.commit()
+"""
+    Kullanıcı silinmeden önce süresi dolmamış bütün session'larını iptal eder ve kullanıcıdan ayırır
+    (user_id NULL): satırlar cascade ile silinmez, diğer worker'lar revoked_at üzerinden senkronize olur,
+    süreleri dolunca temizlik görevi siler. İptal edilen (token_hash, valid_until) listesini döner.
+"""
+async def revoke_user_sessions(db: AsyncSession, user_id: int) -> list[tuple[bytes, datetime]]:
+    now = datetime.now(timezone.utc)
+    live = (SessionModel.user_id == user_id) & (SessionModel.valid_until > now)
+    rows = (await db.execute(select(SessionModel.token_hash, SessionModel.valid_until).where(live))).all()
+    await db.execute(
+        update(SessionModel).where(live).values(revoked_at=now, user_id=None)
+        .execution_options(synchronize_session=False) # SQLite'tan dönen tz'siz zamanlar Python'da karşılaştırılmasın
+    )
+    return [(bytes(token_hash), valid_until) for token_hash, valid_until in rows]
+
+"""
+    Kullanıcının onaylı yorum yaptığı şubeler; kullanıcı silinince bu şubelerin kart sayaçları yenilenir.
+"""
+async def get_reviewed_branch_ids(db: AsyncSession, user_id: int) -> list[int]:
+    result = await db.execute(
+        select(Review.branch_id).where(Review.user_id == user_id, Review.status == 'approved').distinct()
+    )
+    return result.scalars().all()
+
+"""
+    Session ve sahibi kullanıcıyı tek sorguda getir: (valid_until, User) ya da None
+"""
+async def get_session_with_user(db: AsyncSession, session_id: str):
+    result = await db.execute(
+        select(SessionModel.valid_until, User)
+        .join(User, User.userid == SessionModel.user_id)
+        .where(SessionModel.token_hash == session_token_digest(session_id))
+    )
+    return result.first()
+
+async def edit_email_status(db: AsyncSession, user_id: int, status: bool):
+    await db.execute(update(User).where(User.userid == user_id).values(email_status=status))
+    await db.commit()
     return status
 
 
-def get_recovery_code(db: Session, user_id: int):
-    return db.query(RecoveryCode).filter(RecoveryCode.user_id == user_id).first()
+async def get_recovery_code(db: AsyncSession, user_id: int):
+    result = await db.execute(select(RecoveryCode).where(RecoveryCode.user_id == user_id))
+    return result.scalars().first()
 
-def save_recovery_code(db: Session, code: RecoveryCode):
-    existing = get_recovery_code(db, code.user_id)
+async def save_recovery_code(db: AsyncSession, code: RecoveryCode):
+    existing = await get_recovery_code(db, code.user_id)
     if existing is not None:
-        db.delete(existing)
+        await db.delete(existing)
     db.add(code)
     return code
 
 """ Checks if the Recovery Code is correct, and if it is still valid return true"""
-def validate_recovery_code(db: Session, user_id: int, code: str) -> bool:
-    valid_code = get_recovery_code(db, user_id)
+async def validate_recovery_code(db: AsyncSession, user_id: int, code: str) -> bool:
+    valid_code = await get_recovery_code(db, user_id)
     if valid_code is not None:
         if valid_code.valid_until.replace(tzinfo=timezone.utc) > datetime.now(timezone.utc):
             if valid_code.recovery_code == code:
-                db.delete(valid_code) # Remove used entry.
-                db.commit()
+                await db.delete(valid_code) # Remove used entry.
+                await db.commit()
                 return True
         else:
-            db.delete(valid_code)
+            await db.delete(valid_code)
             return False
     return False
 
 """ İLK KAYIT SIRASINDA EMAİL DOĞRULAMAK İÇİN"""
-def get_email_verification_code(db: Session, user_id: int):
-    return db.query(EmailVerificationCode).filter(EmailVerificationCode.user_id == user_id).first()
+async def get_email_verification_code(db: AsyncSession, user_id: int):
+    result = await db.execute(select(EmailVerificationCode).where(EmailVerificationCode.user_id == user_id))
+    return result.scalars().first()
 
-def save_email_verification_code(db: Session, code: EmailVerificationCode):
-    existing = get_email_verification_code(db, code.user_id)
+async def save_email_verification_code(db: AsyncSession, code: EmailVerificationCode):
+    existing = await get_email_verification_code(db, code.user_id)
     if existing is not None: # remove old entries
-        db.delete(existing)
+        await db.delete(existing)
     db.add(code)
     return code
 
 """ Checks if the Verification Code is correct, and if it is still valid return true"""
-def validate_email_verification_code(db: Session, user_id: int, code: str) -> bool:
-    valid_code = get_email_verification_code(db, user_id)
+async def validate_email_verification_code(db: AsyncSession, user_id: int, code: str) -> bool:
+    valid_code = await get_email_verification_code(db, user_id)
     if valid_code is not None:
         if valid_code.valid_until.replace(tzinfo=timezone.utc) > datetime.now(timezone.utc):
             if valid_code.verification_code == code:
-                db.delete(valid_code) # Remove used entry.
-                db.commit()
+                await db.delete(valid_code) # Remove used entry.
+                await db.commit()
                 return True
         else:
-            db.delete(valid_code)
+            await db.delete(valid_code)
             return False
     return False
+
+""" Süresi dolmuş en fazla batch_size kaydı siler; kısa transaction'lar uzun kilitleri önler. """
+async def delete_expired_batch(db: AsyncSession, model, key_column, batch_size: int) -> int:
+    expired_keys = (
+        select(key_column)
+        .where(model.valid_until < datetime.now(timezone.utc))
+        .limit(batch_size)
+        .scalar_subquery()
+    )
+    result = await db.execute(delete(model).where(key_column.in_(expired_keys)))
+    await db.commit()
+    return result.rowcount
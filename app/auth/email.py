@@ -1,14 +1,19 @@
+import json
 import os
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
 
 from pydantic import BaseModel, EmailStr
 from postmarker.core import PostmarkClient
 
 
 MAIL_FROM = os.getenv("MAIL_FROM")
+# postmark: gerçek gönderim, file: EMAIL_OUTPUT_FILE dosyasına JSON satırı, memory: sadece bellekte tut (testler)
+EMAIL_TRANSPORT = os.getenv("EMAIL_TRANSPORT", "postmark")
+EMAIL_OUTPUT_FILE = os.getenv("EMAIL_OUTPUT_FILE", "sent_emails.jsonl")
 POSTMARK_API_KEY = os.getenv("POSTMARK_API_KEY")
-if not POSTMARK_API_KEY:
+if EMAIL_TRANSPORT == "postmark" and not POSTMARK_API_KEY:
     raise ValueError("POSTMARK_API_KEY environment variable is not set.")
-postmark = PostmarkClient(server_token=POSTMARK_API_KEY)
 
 class EmailRequest(BaseModel):
     to_email: EmailStr
@@ -17,25 +22,78 @@ class EmailRequest(BaseModel):
     text_body: str | None = None
     from_email: str = MAIL_FROM #Postmark'ta kayıtlı adres
 
+
+class EmailTransport(ABC):
+    """
+    E-postaları toplu gönderen taşıyıcı. send_batch her mesaj için hata metni ya da
+    başarılıysa None döner; sıra gelen mesajlarla aynıdır.
+    """
+    @abstractmethod
+    def send_batch(self, messages: list[dict]) -> list[str | None]:
+        ...
+
+
+class PostmarkTransport(EmailTransport):
+    def __init__(self, api_key: str):
+        self.client = PostmarkClient(server_token=api_key)
+
+    def send_batch(self, messages: list[dict]) -> list[str | None]:
+        responses = self.client.emails.send_batch(*messages) # 500'lük parçalara postmarker böler
+        return [None if response.get("ErrorCode") == 0 else response.get("Message", "Unknown error")
+                for response in responses]
+
+
+class MemoryTransport(EmailTransport):
+    def __init__(self):
+        self.sent: list[dict] = []
+
+    def send_batch(self, messages: list[dict]) -> list[str | None]:
+        self.sent.extend(messages)
+        return [None] * len(messages)
+
+
+class FileTransport(EmailTransport):
+    def __init__(self, path: str):
+        self.path = path
+
+    def send_batch(self, messages: list[dict]) -> list[str | None]:
+        sent_at = datetime.now(timezone.utc).isoformat()
+        with open(self.path, "a", encoding="utf-8") as f:
+            for message in messages:
+                f.write(json.dumps({**message, "SentAt": sent_at}, ensure_ascii=False) + "\n")
+        return [None] * len(messages)
+
+
+def create_transport(name: str = EMAIL_TRANSPORT) -> EmailTransport:
+    if name == "memory":
+        return MemoryTransport()
+    if name == "file":
+        return FileTransport(EMAIL_OUTPUT_FILE)
+    return PostmarkTransport(POSTMARK_API_KEY)
+
+transport = create_transport()
+
+
+def build_message(subject: str, recipient: str, body: str) -> dict:
+    return {"From": MAIL_FROM, "To": recipient, "Subject": subject, "HtmlBody": body}
+
 def send_email(subject: str, recipient: str, body: str):
-    return postmark.emails.send(
-        From=MAIL_FROM,
-        To=recipient,
-        Subject=subject,
-        HtmlBody=body
-    )
+    """ Outbox'ı atlayarak hemen gönderir; istek içinden değil, arka plan işlerinden çağrılmalı. """
+    error = transport.send_batch([build_message(subject, recipient, body)])[0]
+    if error is not None:
+        raise RuntimeError(error)
 
 
-def send_verification_email(email_to: str, verification_code: str):
+def verification_email(verification_code: str) -> tuple[str, str]:
     subject = "Lütfen Email Adresinizi Doğrulayın"
     body = f"""
     <p>Merhaba,</p>
     <p>Hesabınızı doğrulamak için lütfen aşağıdaki kodu yazın:</p>
     <a href="{verification_code}">{verification_code}</a>
     """
-    return send_email(subject, email_to, body)
+    return subject, body
 
-def send_password_reset_email(email_to: str, reset_code: str):
+def password_reset_email(reset_code: str) -> tuple[str, str]:
     subject = "Şifre Sıfırlama İsteği"
     body = f"""
     <p>Merhaba,</p>
@@ -45,4 +103,13 @@ def send_password_reset_email(email_to: str, reset_code: str):
     <p>İyi günler dileriz,</p>
     <p>ŞİRKET ADI</p>
     """
+    return subject, body
+
+
+def send_verification_email(email_to: str, verification_code: str):
+    subject, body = verification_email(verification_code)
+    return send_email(subject, email_to, body)
+
+def send_password_reset_email(email_to: str, reset_code: str):
+    subject, body = password_reset_email(reset_code)
     return send_email(subject, email_to, body)
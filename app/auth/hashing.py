@@ -0,0 +1,113 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+
+from fastapi import HTTPException
+from starlette import status
+
+from app.auth.security import hash_password, verify_password
+
+logger = logging.getLogger('uvicorn.error')
+
+# 0 verilirse process pool yerine event loop'un varsayılan thread havuzu kullanılır (geliştirme/test için).
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1)))
+# Çalışan işlere ek olarak en fazla kaç isteğin sırada bekleyebileceği. Dolunca 503 döner.
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "64"))
+
+
+def _timed_call(fn, *args):
+    """ Worker process içinde çalışır: sonucu, başlama zamanını ve süreyi döner. """
+    started_at = time.time()
+    result = fn(*args)
+    return result, started_at, time.time() - started_at
+
+
+class PasswordHasher:
+    """
+    bcrypt hash/verify işlemlerini event loop dışında, ayrı process'lerde çalıştırır.
+    Sıra dolduğunda beklemek yerine hemen 503 döner (load shedding).
+    """
+
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, max_queue: int = PASSWORD_HASH_MAX_QUEUE):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor: Executor | None = None
+        self._in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+        self.hash_time_total = 0.0
+        self.hash_time_max = 0.0
+
+    @property
+    def max_in_flight(self) -> int:
+        return max(self.workers, 1) + self.max_queue
+
+    @property
+    def is_busy(self) -> bool:
+        """ Bütün worker'lar meşgul; ertelenebilir işler (ör. yeniden hash) şimdilik atlanmalı. """
+        return self._in_flight >= max(self.workers, 1)
+
+    def _get_executor(self) -> Executor | None:
+        if self.workers > 0 and self._executor is None:
+            # fork yerine spawn: event loop ve thread'ler çalışırken fork etmek güvenli değil.
+            self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    async def _run(self, fn, *args):
+        if self._in_flight >= self.max_in_flight:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy, please try again shortly.",
+                headers={"Retry-After": "1"},
+            )
+        self._in_flight += 1
+        submitted_at = time.time()
+        try:
+            loop = asyncio.get_running_loop()
+            result, started_at, elapsed = await loop.run_in_executor(self._get_executor(), _timed_call, fn, *args)
+        finally:
+            self._in_flight -= 1
+
+        queue_wait = max(started_at - submitted_at, 0.0)
+        self.completed += 1
+        self.queue_wait_total += queue_wait
+        self.queue_wait_max = max(self.queue_wait_max, queue_wait)
+        self.hash_time_total += elapsed
+        self.hash_time_max = max(self.hash_time_max, elapsed)
+        return result
+
+    async def hash(self, password: str) -> str:
+        return await self._run(hash_password, password)
+
+    async def verify(self, plain_password: str, password: str) -> bool:
+        return await self._run(verify_password, plain_password, password)
+
+    def stats(self) -> dict:
+        completed = self.completed or 1
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "in_flight": self._in_flight,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "queue_wait_avg_ms": self.queue_wait_total / completed * 1000,
+            "queue_wait_max_ms": self.queue_wait_max * 1000,
+            "hash_time_avg_ms": self.hash_time_total / completed * 1000,
+            "hash_time_max_ms": self.hash_time_max * 1000,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            logger.info(f"Password hasher stats: {self.stats()}")
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,59 @@
+import asyncio
+import os
+
+from app.auth.crud import delete_expired_batch
+from app.auth.models import SessionModel, RecoveryCode, EmailVerificationCode, AuthThrottle
+from app.auth.outbox import purge_sent_emails
+from app.auth.revocation import revocation_list
+from app.auth.throttle import sync_throttle
+from app.core.database import SessionLocal
+
+MAINTENANCE_INTERVAL_SECONDS = float(os.getenv("MAINTENANCE_INTERVAL_SECONDS", "300"))
+MAINTENANCE_BATCH_SIZE = int(os.getenv("MAINTENANCE_BATCH_SIZE", "1000"))
+# Tek çalıştırmada silinecek en fazla batch; kalanlar bir sonraki çalıştırmaya bırakılır.
+MAINTENANCE_MAX_BATCHES = int(os.getenv("MAINTENANCE_MAX_BATCHES", "50"))
+
+EXPIRING_TABLES = (
+    (SessionModel, SessionModel.token_hash),
+    (RecoveryCode, RecoveryCode.id),
+    (EmailVerificationCode, EmailVerificationCode.id),
+    (AuthThrottle, AuthThrottle.key_hash),
+)
+
+
+async def _delete_in_batches(delete_batch) -> int:
+    total = 0
+    for _ in range(MAINTENANCE_MAX_BATCHES):
+        async with SessionLocal() as db:
+            count = await delete_batch(db)
+        total += count
+        if count < MAINTENANCE_BATCH_SIZE:
+            break
+        await asyncio.sleep(0) # batch'ler arasında diğer isteklere sıra ver
+    return total
+
+
+async def sweep_expired_auth_rows() -> dict:
+    """
+    Süresi dolmuş session, şifre sıfırlama ve email doğrulama, deneme sınırlama kayıtlarını, saklama süresini
+    geçmiş gönderilmiş e-postaları küçük batch'ler halinde siler. Tablo başına silinen kayıt sayısını döner.
+    """
+    deleted = {}
+    for model, key_column in EXPIRING_TABLES:
+        deleted[model.__tablename__] = await _delete_in_batches(
+            lambda db: delete_expired_batch(db, model, key_column, MAINTENANCE_BATCH_SIZE)
+        )
+    deleted["email_outbox"] = await _delete_in_batches(lambda db: purge_sent_emails(db, MAINTENANCE_BATCH_SIZE))
+    return deleted
+
+
+async def sync_revocation_list() -> dict:
+    async with SessionLocal() as db:
+        revoked = await revocation_list.sync(db)
+    return {"revoked": revoked}
+
+
+async def sync_login_throttle() -> dict:
+    async with SessionLocal() as db:
+        synced = await sync_throttle(db)
+    return {"synced": synced}
@@ -0,0 +1,46 @@
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.auth.cache import session_cache
+from app.auth.revocation import revocation_list
+from app.auth.security import is_signed_session_token, verify_signed_session_token
+
+
+def resolve_user_id(authorization: str | None) -> int | None:
+    """
+    Authorization başlığından kullanıcı id'sini veritabanına gitmeden çözer.
+    İmzalı token'lar doğrulanır, opak token'lar sadece session önbelleğinde aranır;
+    çözülemezse None döner ve istek IP'si ile sınırlandırılır.
+    """
+    if not authorization:
+        return None
+    scheme, _, session_token = authorization.partition(" ")
+    session_token = session_token.strip()
+    if scheme.lower() != "bearer" or not session_token:
+        return None
+    if is_signed_session_token(session_token):
+        claims = verify_signed_session_token(session_token)
+        if claims is None or revocation_list.is_revoked(session_token):
+            return None
+        return claims[0]
+    cached = session_cache.peek(session_token)
+    return cached.user_id if cached is not None else None
+
+
+class IdentityMiddleware:
+    """
+    request.state.user_id'yi rate limiter'dan önce doldurur; main.py'de SlowAPIMiddleware'den
+    sonra eklenmelidir (Starlette'te son eklenen middleware en dışta çalışır).
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http":
+            authorization = None
+            for name, value in scope["headers"]:
+                if name == b"authorization":
+                    authorization = value.decode("latin-1")
+                    break
+            scope.setdefault("state", {})["user_id"] = resolve_user_id(authorization)
+        await self.app(scope, receive, send)
@@ -1,4 +1,6 @@
-from sqlalchemy import Column, ForeignKey, Integer, String, DateTime, Boolean
+from datetime import datetime, timezone
+
+from sqlalchemy import Column, ForeignKey, Integer, String, DateTime, Boolean, LargeBinary, Text, Index
 from sqlalchemy.orm import relationship, backref
 
 from app.core.database import Base
@@ -18,9 +20,11 @@ class User(Base):
 
 class SessionModel(Base):
     __tablename__ = 'session'
-    session_id = Column(String(255), primary_key=True)
+    # Token'ın kendisi değil SHA-256 özeti (32 byte) tutulur: index küçük kalır, DB'de geçerli token bulunmaz.
+    token_hash = Column(LargeBinary(32), primary_key=True)
     user_id = Column(Integer, ForeignKey('users.userid', ondelete='CASCADE'), index=True)
-    valid_until = Column(DateTime(timezone=True))
+    valid_until = Column(DateTime(timezone=True), index=True) # süresi dolanları temizleyen görev için
+    revoked_at = Column(DateTime(timezone=True), nullable=True) # imzalı token'lar için: çıkış yapıldı, iptal listesine girer
     parent = relationship('User', backref=backref('sessions', passive_deletes=True))
 
 class RecoveryCode(Base):
@@ -28,14 +32,42 @@ class RecoveryCode(Base):
     id = Column(Integer, primary_key=True, autoincrement=True)
     recovery_code = Column(String(6), unique=True)
     user_id = Column(Integer, ForeignKey('users.userid'), nullable=False, index=True) # from user_email to user_id
-    valid_until = Column(DateTime(timezone=True))
+    valid_until = Column(DateTime(timezone=True), index=True)
 
 class EmailVerificationCode(Base):
     __tablename__ = 'email_verification_code'
     id = Column(Integer, primary_key=True, autoincrement=True)
     verification_code = Column(String(6), unique=True)
     user_id = Column(Integer, ForeignKey('users.userid'), nullable=False, index=True) # from user_email to user_id
-    valid_until = Column(DateTime(timezone=True))
+    valid_until = Column(DateTime(timezone=True), index=True)
+
+class EmailOutbox(Base):
+    """ Gönderilecek e-postalar; iş verisiyle aynı transaction'da yazılır, arka plan görevi gönderir. """
+    __tablename__ = 'email_outbox'
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    dedupe_key = Column(String(128), unique=True, nullable=False) # aynı olay için ikinci kez kuyruğa girmesin
+    to_email = Column(String(255), nullable=False)
+    subject = Column(String(255), nullable=False)
+    html_body = Column(Text, nullable=False)
+    status = Column(String(15), default='pending', nullable=False) # 'pending', 'sent', 'failed'
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    sent_at = Column(DateTime(timezone=True), nullable=True, index=True)
+
+    __table_args__ = (
+        Index('ix_email_outbox_status_next_attempt_at', 'status', 'next_attempt_at'),
+    )
+
+class AuthThrottle(Base):
+    """ Giriş/kod denemesi başarısızlıkları; THROTTLE_SHARED açıksa worker'lar arasında paylaşılır. """
+    __tablename__ = 'auth_throttle'
+    # "login:<email>" gibi anahtarın 16 byte'lık özeti; e-posta/telefon tabloda açık tutulmaz.
+    key_hash = Column(LargeBinary(16), primary_key=True)
+    failures = Column(Integer, nullable=False)
+    last_failure_at = Column(DateTime(timezone=True), nullable=False)
+    valid_until = Column(DateTime(timezone=True), nullable=False, index=True) # bu zamandan sonra sayaç sıfırlanır
 
 def schema_to_model(schema_instance, model_class):
     return model_class(**schema_instance.model_dump())
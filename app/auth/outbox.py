@@ -0,0 +1,107 @@
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from app.auth import email
+from app.auth.models import EmailOutbox
+from app.core.database import SessionLocal
+
+logger = logging.getLogger('uvicorn.error')
+
+OUTBOX_POLL_SECONDS = float(os.getenv("OUTBOX_POLL_SECONDS", "5"))
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "500")) # Postmark batch üst sınırı
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+OUTBOX_RETRY_BASE_SECONDS = float(os.getenv("OUTBOX_RETRY_BASE_SECONDS", "30"))
+OUTBOX_RETRY_MAX_SECONDS = float(os.getenv("OUTBOX_RETRY_MAX_SECONDS", "3600"))
+OUTBOX_RETENTION_DAYS = int(os.getenv("OUTBOX_RETENTION_DAYS", "7"))
+
+
+async def enqueue_email(db: AsyncSession, dedupe_key: str, to_email: str, subject: str, html_body: str) -> EmailOutbox:
+    """
+    E-postayı outbox'a ekler; commit çağırana aittir, böylece kodla aynı transaction'da yazılır.
+    Aynı dedupe_key zaten varsa yeni kayıt açılmaz.
+    """
+    result = await db.execute(select(EmailOutbox).where(EmailOutbox.dedupe_key == dedupe_key))
+    existing = result.scalars().first()
+    if existing is not None:
+        return existing
+    message = EmailOutbox(dedupe_key=dedupe_key, to_email=to_email, subject=subject, html_body=html_body,
+                          status='pending', attempts=0, next_attempt_at=datetime.now(timezone.utc))
+    db.add(message)
+    return message
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """ Üstel geri çekilme: 30s, 60s, 120s ... en fazla OUTBOX_RETRY_MAX_SECONDS. """
+    return timedelta(seconds=min(OUTBOX_RETRY_BASE_SECONDS * 2 ** (attempts - 1), OUTBOX_RETRY_MAX_SECONDS))
+
+
+async def send_pending_batch(db: AsyncSession, transport: email.EmailTransport) -> dict:
+    """ Zamanı gelmiş en fazla OUTBOX_BATCH_SIZE e-postayı tek batch isteğiyle gönderir. """
+    now = datetime.now(timezone.utc)
+    result = await db.execute(
+        select(EmailOutbox)
+        .where(EmailOutbox.status == 'pending', EmailOutbox.next_attempt_at <= now)
+        .order_by(EmailOutbox.id)
+        .limit(OUTBOX_BATCH_SIZE)
+        .with_for_update(skip_locked=True) # SQLite'ta yok sayılır
+    )
+    messages = result.scalars().all()
+    counts = {"sent": 0, "retried": 0, "failed": 0}
+    if not messages:
+        return counts
+
+    payload = [email.build_message(m.subject, m.to_email, m.html_body) for m in messages]
+    try:
+        # Postmark istemcisi senkron HTTP kullanır; event loop'u bloklamasın.
+        errors = await run_in_threadpool(transport.send_batch, payload)
+    except Exception as e:
+        logger.error(f"Email batch send failed: {e}")
+        errors = [str(e)] * len(messages)
+
+    for message, error in zip(messages, errors):
+        if error is None:
+            message.status = 'sent'
+            message.sent_at = now
+            counts["sent"] += 1
+            continue
+        message.attempts += 1
+        message.last_error = error
+        if message.attempts >= OUTBOX_MAX_ATTEMPTS:
+            message.status = 'failed'
+            counts["failed"] += 1
+        else:
+            message.next_attempt_at = now + retry_delay(message.attempts)
+            counts["retried"] += 1
+    await db.commit()
+    return counts
+
+
+async def drain_outbox() -> dict:
+    """ Zamanlayıcı görevi: bekleyen e-postalar bitene kadar batch'ler halinde gönderir. """
+    totals = {"sent": 0, "retried": 0, "failed": 0}
+    while True:
+        async with SessionLocal() as db:
+            counts = await send_pending_batch(db, email.transport)
+        for key, value in counts.items():
+            totals[key] += value
+        if sum(counts.values()) < OUTBOX_BATCH_SIZE:
+            return totals
+
+
+async def purge_sent_emails(db: AsyncSession, batch_size: int) -> int:
+    """ Saklama süresini geçmiş gönderilmiş e-postalardan en fazla batch_size tanesini siler. """
+    cutoff = datetime.now(timezone.utc) - timedelta(days=OUTBOX_RETENTION_DAYS)
+    old_ids = (
+        select(EmailOutbox.id)
+        .where(EmailOutbox.sent_at < cutoff)
+        .limit(batch_size)
+        .scalar_subquery()
+    )
+    result = await db.execute(delete(EmailOutbox).where(EmailOutbox.id.in_(old_ids)))
+    await db.commit()
+    return result.rowcount
@@ -0,0 +1,64 @@
+import os
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.auth.models import SessionModel
+from app.auth.security import session_token_digest
+
+REVOCATION_SYNC_SECONDS = float(os.getenv("REVOCATION_SYNC_SECONDS", "30"))
+
+
+class RevocationList:
+    """
+    İmzalı session token'ları için process içi iptal listesi.
+    Token yerine 32 byte'lık SHA-256 özeti ve bitiş zamanı tutulur; süresi geçen kayıtlar atılır.
+    Diğer worker'lardaki çıkışlar `session` tablosundaki revoked_at kolonundan senkronize edilir.
+    """
+
+    def __init__(self):
+        self._revoked: dict[bytes, float] = {}
+        self.last_synced_at: float | None = None
+
+    def __len__(self) -> int:
+        return len(self._revoked)
+
+    def revoke(self, token: str, valid_until: datetime) -> None:
+        self.revoke_digest(session_token_digest(token), valid_until)
+
+    def revoke_digest(self, digest: bytes, valid_until: datetime) -> None:
+        self._revoked[digest] = valid_until.timestamp()
+
+    def is_revoked(self, token: str) -> bool:
+        digest = session_token_digest(token)
+        expires_at = self._revoked.get(digest)
+        if expires_at is None:
+            return False
+        if expires_at <= time.time():
+            del self._revoked[digest]
+            return False
+        return True
+
+    def prune(self) -> None:
+        now = time.time()
+        self._revoked = {digest: expires_at for digest, expires_at in self._revoked.items() if expires_at > now}
+
+    async def sync(self, db: AsyncSession) -> int:
+        """ session tablosundaki iptal edilmiş ve süresi dolmamış token'ları listeye ekler. """
+        now = datetime.now(timezone.utc)
+        result = await db.execute(
+            select(SessionModel.token_hash, SessionModel.valid_until)
+            .where(SessionModel.revoked_at.is_not(None), SessionModel.valid_until > now)
+        )
+        for token_hash, valid_until in result.all():
+            if valid_until.tzinfo is None:
+                valid_until = valid_until.replace(tzinfo=timezone.utc)
+            self.revoke_digest(bytes(token_hash), valid_until)
+        self.prune()
+        self.last_synced_at = time.time()
+        return len(self._revoked)
+
+
+revocation_list = RevocationList()
@@ -7,8 +7,9 @@ from app.auth import service
 from app.auth.schemas import UserCreate, UserLogin, SessionSchema, RegisterResponse, ForgotPasswordSchema, \
     ResetPasswordSchema, VerifyEmailSchema, UserLogoutSchema, ReturnUser, LoginResponse
 from app.auth.crud import *
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.auth.service import get_current_user
-from app.core.database import get_db, Base, engine
+from app.core.database import get_db
 from app.core.limiter import limiter
 
 
@@ -27,54 +28,54 @@ async def root():
     UserInfo: 
 """
 @auth_router.post("/register", response_model=RegisterResponse)
-def register(new_user: UserCreate, encrypted: bool, db: Session = Depends(get_db)):
+async def register(new_user: UserCreate, encrypted: bool, db: AsyncSession = Depends(get_db)):
 
-    result = service.register(new_user=new_user, encrypted=encrypted, db=db)
+    result = await service.register(new_user=new_user, encrypted=encrypted, db=db)
     logger.info(result)
     return result
 
 
 @auth_router.post("/login", response_model=LoginResponse, status_code=200)
-async def login_endpoint(user: UserLogin, db: Session = Depends(get_db)):
-    return service.login(user=user, db=db)
+async def login_endpoint(user: UserLogin, db: AsyncSession = Depends(get_db)):
+    return await service.login(user=user, db=db)
 
 
 @auth_router.post("/logout", response_model=LoginResponse, status_code=200)
-async def logout_endpoint(user: UserLogoutSchema, db: Session = Depends(get_db)):
+async def logout_endpoint(user: UserLogoutSchema, db: AsyncSession = Depends(get_db)):
     print("logged out")
     return await service.logout(user_data=user, db=db)
 
 
 @auth_router.post("/edit-user", status_code=200)
-async def edit_user_endpoint(user: UserUpdate, session: SessionSchema,  db: Session = Depends(get_db)):
-    return service.edit_user(user=user, session=session, db=db)
+async def edit_user_endpoint(user: UserUpdate, session: SessionSchema,  db: AsyncSession = Depends(get_db)):
+    return await service.edit_user(user=user, session=session, db=db)
 
 
 @auth_router.post("/verify-session")
-async def verify_session_endpoint(session: SessionSchema, db: Session = Depends(get_db)):
-    return service.verify_session(session, db)
+async def verify_session_endpoint(session: SessionSchema, db: AsyncSession = Depends(get_db)):
+    return await service.verify_session(session, db)
 
 """Şifremi Unuttum isteği"""
 @auth_router.post("/forgot-password", status_code=200)
-async def forgot_password_endpoint(user_data: ForgotPasswordSchema, db: Session = Depends(get_db)):
-    return service.forgot_password(user_data=user_data, db=db)
+async def forgot_password_endpoint(user_data: ForgotPasswordSchema, db: AsyncSession = Depends(get_db)):
+    return await service.forgot_password(user_data=user_data, db=db)
 
 """Şifre Değiştirme isteği """
 @auth_router.post("/reset-password", status_code=200)
-async def reset_password_endpoint(data: ResetPasswordSchema, db: Session = Depends(get_db)):
-    return service.reset_password(data=data, db=db)
+async def reset_password_endpoint(data: ResetPasswordSchema, db: AsyncSession = Depends(get_db)):
+    return await service.reset_password(data=data, db=db)
 
 
 @auth_router.post("/verify-email", status_code=200)
 @limiter.limit("15/15 minutes")
-async def verify_email_endpoint(request: Request, login_data: VerifyEmailSchema, db: Session = Depends(get_db)):
-    return service.verify_email(login_data, db)
+async def verify_email_endpoint(request: Request, login_data: VerifyEmailSchema, db: AsyncSession = Depends(get_db)):
+    return await service.verify_email(login_data, db)
 
 @auth_router.post("/delete-user", status_code=200)
-def delete_user_endpoint(session: str,  db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    return service.delete_user(session=session, db=db, user=current_user)
+async def delete_user_endpoint(session: str,  db: AsyncSession = Depends(get_db), current_user: User = Depends(get_current_user)):
+    return await service.delete_user(session=session, db=db, user=current_user)
 
 @auth_router.get("/users/me")
-def read_users_me(current_user: User = Depends(get_current_user)):
+async def read_users_me(current_user: User = Depends(get_current_user)):
     user_data = ReturnUser.model_validate(current_user)
     return {"success": True, "message": "User data retrieved successfully.", "user": user_data}
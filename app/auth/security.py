@@ -1,6 +1,9 @@
+import base64
+import hashlib
+import hmac
 import os
 from dotenv import load_dotenv
-from datetime import datetime, timedelta
+from datetime import datetime, timezone
 from passlib.context import CryptContext
 import secrets
 
@@ -13,18 +16,60 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 60
 if not SECRET_KEY:
     raise Exception("SECRET_KEY must be set")
 
+# "opaque": rastgele token, her istekte DB'den kontrol edilir.
+# "signed": HMAC imzalı token, DB'ye gitmeden doğrulanır (iptal listesi hariç).
+SESSION_TOKEN_MODE = os.getenv("SESSION_TOKEN_MODE", "opaque")
+SIGNED_TOKEN_PREFIX = "v1"
+
+# bcrypt maliyeti; sunucuya göre `python -m app.auth.calibrate` ile seçilir.
+# Farklı maliyetle saklanmış hash'ler başarılı girişte arka planda yeniden hesaplanır.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
 
 # Encryption
 def generate_session_id():
     return secrets.token_hex(nbytes=127)
 
+def _sign(message: str) -> str:
+    digest = hmac.new(SECRET_KEY.encode(), message.encode(), hashlib.sha256).digest() # ALGORITHM: HS256
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+def generate_signed_session_token(user_id: int, valid_until: datetime) -> str:
+    """ v1.<user_id>.<bitiş unix zamanı>.<nonce>.<imza> biçiminde imzalı session token üretir. """
+    message = f"{SIGNED_TOKEN_PREFIX}.{user_id}.{int(valid_until.timestamp())}.{secrets.token_urlsafe(16)}"
+    return f"{message}.{_sign(message)}"
+
+def is_signed_session_token(token: str) -> bool:
+    return token.startswith(SIGNED_TOKEN_PREFIX + ".")
+
+def verify_signed_session_token(token: str) -> tuple[int, datetime] | None:
+    """ İmza ve süre geçerliyse (user_id, valid_until) döner, değilse None. """
+    message, _, signature = token.rpartition(".")
+    parts = message.split(".")
+    if len(parts) != 4 or parts[0] != SIGNED_TOKEN_PREFIX:
+        return None
+    if not hmac.compare_digest(signature, _sign(message)):
+        return None
+    try:
+        user_id = int(parts[1])
+        valid_until = datetime.fromtimestamp(int(parts[2]), tz=timezone.utc)
+    except ValueError:
+        return None
+    if valid_until <= datetime.now(timezone.utc):
+        return None
+    return user_id, valid_until
+
+def session_token_digest(token: str) -> bytes:
+    return hashlib.sha256(token.encode()).digest()
+
 def verification_code():
     return secrets.token_hex(nbytes=3)
 
 def email_verification_code():
     return secrets.token_hex(nbytes=16)
 
-password_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+password_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS,
+                                bcrypt__min_rounds=BCRYPT_ROUNDS, bcrypt__max_rounds=BCRYPT_ROUNDS)
 
 def hash_password(password):
     password = password_context.hash(password)
@@ -32,3 +77,7 @@ def hash_password(password):
 
 def verify_password(plain_password, password):
     return password_context.verify(plain_password, password)
+
+def password_needs_rehash(password):
+    """ Hash'i yeniden hesaplamadan, maliyetin BCRYPT_ROUNDS'tan farklı olup olmadığına bakar. """
+    return password_context.needs_update(password)
@@ -1,21 +1,26 @@
+import asyncio
 from datetime import timedelta
-from urllib.error import URLError
 
-import requests.exceptions
 from fastapi import HTTPException, Depends, Header
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from starlette import status
-from urllib3.exceptions import NewConnectionError
 
-from app.auth.email import send_password_reset_email, send_verification_email
+from app.auth.email import password_reset_email, verification_email
+from app.auth.outbox import enqueue_email
 from app.auth.schemas import UserCreate, UserLogin, SessionSchema, ReturnUser, ForgotPasswordSchema, ResetPasswordSchema, VerifyEmailSchema, UserLogoutSchema
-from app.auth.security import generate_session_id, hash_password, verify_password, verification_code
+from app.auth.security import generate_session_id, verification_code, SESSION_TOKEN_MODE, session_token_digest, \
+    generate_signed_session_token, is_signed_session_token, verify_signed_session_token, password_needs_rehash
+from app.auth.hashing import password_hasher
 from app.auth.crud import *
+from app.auth.cache import session_cache
+from app.auth.revocation import revocation_list
+from app.business.cards import refresh_card_reviews
+from app.auth.throttle import throttle_key, ensure_not_throttled, register_failure, register_success
 from app.auth.utils import validate_session, verify_email_format, verify_phone_format, normalize_phone
-from app.core.database import get_db
+from app.core.database import get_db, SessionLocal
 
 
-def register(new_user: UserCreate, encrypted: bool, db: Session):
+async def register(new_user: UserCreate, encrypted: bool, db: AsyncSession):
     if not verify_email_format(new_user.email):
         return {"success": False, "message": "Please enter a correct email"}
     if isinstance(new_user.phone, str) and new_user.phone.strip(): # if phone is empty, or not an str at all, do not check
@@ -23,17 +28,17 @@ def register(new_user: UserCreate, encrypted: bool, db: Session):
         if not verify_phone_format(new_user.phone):
             return {"success": False, "message": "Please enter a valid phone number"}
     if not encrypted:
-        new_user.password = hash_password(new_user.password)
+        new_user.password = await password_hasher.hash(new_user.password)
     user: User = User(**(new_user.model_dump()), user_status="open") # Gelen UserCreate schema User Model yapılır
     try:
-        created_user = create_user(db, user)
+        created_user = await create_user(db, user)
         user.email_status = True
-        db.flush()
-        db.commit()
-        db.refresh(created_user)
+        await db.flush()
+        await db.commit()
+        await db.refresh(created_user)
     except IntegrityError as e:
         print(e)
-        db.rollback()
+        await db.rollback()
         # get the original DB error from mysql
         error_info = str(e.orig).lower()
         if 'email' in error_info:
@@ -44,61 +49,101 @@ def register(new_user: UserCreate, encrypted: bool, db: Session):
             return {"success": False, "message": "Phone number already registered"}
         return {"success": False, "message": "User already exists"}
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         print(f"Error: {e}")
         raise HTTPException(501, "Error when creating user")
 
-    for i in range(3): # Because of DNS issues on the first run, try again
-        try:    # Email Doğrulama kodu oluştur ve kaydet
-            email_code = verification_code()
-            code = EmailVerificationCode(user_id=created_user.userid, verification_code=email_code,
-                                         valid_until=datetime.now(timezone.utc) + timedelta(hours=1))
-            save_email_verification_code(db, code)
-            #send_verification_email(user.email, email_code)
-            db.commit()
-            db.refresh(code)
-        except (NewConnectionError, URLError, ConnectionError, requests.exceptions.ConnectionError) as e:
-            db.rollback()
-            print(f"DNS Error: {e}")
-            continue # Try again, probably will get fixed.
-        except Exception as e:
-            db.rollback()
-            print(f"Error: {e}")
-            raise HTTPException(501, "Error when creating user")
-        break # Email sent successfully, exit
+    try:    # Email Doğrulama kodu oluştur ve kaydet; e-posta outbox üzerinden arka planda gider
+        email_code = verification_code()
+        code = EmailVerificationCode(user_id=created_user.userid, verification_code=email_code,
+                                     valid_until=datetime.now(timezone.utc) + timedelta(hours=1))
+        await save_email_verification_code(db, code)
+        await enqueue_email(db, f"verify:{created_user.userid}:{email_code}", user.email, *verification_email(email_code))
+        await db.commit()
+        await db.refresh(code)
+    except Exception as e:
+        await db.rollback()
+        print(f"Error: {e}")
+        raise HTTPException(501, "Error when creating user")
 
     returnUser = ReturnUser.model_validate(created_user) # Convert to return value, which removes password
     return {"success": True, "message": "Email Validation Required", "user": returnUser}#, "session": saved_session}
 
-def login(user: UserLogin, db: Session):
+async def login(user: UserLogin, db: AsyncSession):
+    throttle = throttle_key("login", user.email, user.phone)
+    ensure_not_throttled(throttle) # bekleme süresindeyse bcrypt'e hiç girilmez
     userModel = schema_to_model(user, User)
-    foundUser = get_user_by_login(db, userModel)
+    foundUser = await get_user_by_login(db, userModel)
     if foundUser is None:  # Kullanıcı yok
+        await register_failure(db, throttle)
         return {"success": False, "message": "Invalid credentials"}
-    if not verify_password(user.password, foundUser.password):  # Şifre yanlış
+    if not await password_hasher.verify(user.password, foundUser.password):  # Şifre yanlış
+        await register_failure(db, throttle)
         return {"success": False, "message": "Invalid credentials"}
-    elif not foundUser.email_status:  # Henüz Email Doğrulanmadıysa
+    await register_success(db, throttle)
+    if password_needs_rehash(foundUser.password):
+        schedule_password_rehash(foundUser.userid, user.password, foundUser.password)
+    if not foundUser.email_status:  # Henüz Email Doğrulanmadıysa
         return {"success": False, "message": "Email Validation Required"}
     #    elif not foundUser.forgot_password:
     #        return {"success": False, "message": "Password reset required"}
 
-    session_id = generate_session_id()
+    valid_until = datetime.now(timezone.utc).replace(microsecond=0) + timedelta(days=1)
+    if SESSION_TOKEN_MODE == "signed":
+        session_id = generate_signed_session_token(foundUser.userid, valid_until)
+    else:
+        session_id = generate_session_id()
     try:
-        session = SessionSchema(session_id=session_id,
-                             user_id=foundUser.userid, valid_until=datetime.now(timezone.utc) + timedelta(days=1))
-        sessionModel = schema_to_model(session, SessionModel)
+        session = SessionSchema(session_id=session_id, user_id=foundUser.userid, valid_until=valid_until)
+        sessionModel = SessionModel(token_hash=session_token_digest(session_id), user_id=foundUser.userid,
+                                    valid_until=valid_until)
         save_session(db, sessionModel)
-        db.commit()
-        db.refresh(sessionModel)  # Refresh to get the new session info
+        await db.commit()
+        await db.refresh(sessionModel)  # Refresh to get the new session info
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         print(f"SQL Error: {e}")
         return {"success": False, "message": "Internal Server Error"}
     returnUser = ReturnUser.model_validate(foundUser)  # Convert to return value, which removes password
     return {"success": True, "user": returnUser, "session": session}
 
-def edit_user(user: UserUpdate, session: SessionSchema,  db: Session):
-    db_session = get_session(db, session.session_id)
+_background_tasks: set[asyncio.Task] = set()
+
+async def _rehash_password(user_id: int, plain_password: str, old_hash: str):
+    try:
+        new_hash = await password_hasher.hash(plain_password)
+        async with SessionLocal() as db:
+            if await replace_password_hash(db, user_id, old_hash, new_hash):
+                session_cache.invalidate_user(user_id)
+    except Exception as e:
+        print(f"Password rehash failed for user {user_id}: {e}")
+
+def schedule_password_rehash(user_id: int, plain_password: str, old_hash: str):
+    """
+    Hash'i BCRYPT_ROUNDS ile yeniden hesaplayıp arka planda yazar; giriş yanıtı beklemez.
+    Hasher meşgulse atlanır, bir sonraki başarılı girişte tekrar denenir.
+    """
+    if password_hasher.is_busy:
+        return
+    task = asyncio.create_task(_rehash_password(user_id, plain_password, old_hash))
+    _background_tasks.add(task) # referans tutulmazsa task GC tarafından toplanabilir
+    task.add_done_callback(_background_tasks.discard)
+
+async def resolve_session(db: AsyncSession, session_id: str):
+    """
+    İmzalı token'ları DB'ye gitmeden (imza, süre ve iptal listesi ile), diğerlerini
+    session tablosundan çözer. user_id ve valid_until içeren bir nesne ya da None döner.
+    """
+    if is_signed_session_token(session_id):
+        claims = verify_signed_session_token(session_id)
+        if claims is None or revocation_list.is_revoked(session_id):
+            return None
+        user_id, valid_until = claims
+        return SessionSchema(session_id=session_id, user_id=user_id, valid_until=valid_until)
+    return await get_session(db, session_id)
+
+async def edit_user(user: UserUpdate, session: SessionSchema,  db: AsyncSession):
+    db_session = await resolve_session(db, session.session_id)
     if db_session is None: # session yoksa
         return {"success": False, "message": "Not Authorized"}
     elif db_session.user_id != user.userid: # session, düzenlemeyi yapandan başkasına aitse
@@ -106,15 +151,16 @@ def edit_user(user: UserUpdate, session: SessionSchema,  db: Session):
     elif not validate_session(session):
         return {"success": False, "message": "Not Authorized"}
     if user.password:
-        user.password = hash_password(user.password)
-    edited = update_user(db, user.userid, user)
+        user.password = await password_hasher.hash(user.password)
+    edited = await update_user(db, user.userid, user)
     if edited is None: return {"success": False, "message": "Server Error"}
-    db.commit()
+    await db.commit()
+    session_cache.invalidate_user(user.userid)
     edited_return = ReturnUser.model_validate(edited)
     return {"success": True, "user": edited_return}
 
-def verify_session(session: SessionSchema, db: Session):
-    db_session = get_session(db, session.session_id)
+async def verify_session(session: SessionSchema, db: AsyncSession):
+    db_session = await resolve_session(db, session.session_id)
     if db_session is None:
         return {"success": False, "message": "Session not found"}
     if not validate_session(session):
@@ -123,75 +169,110 @@ def verify_session(session: SessionSchema, db: Session):
         return {"success": False, "message": "Session not found"}
     return {"success": True, "message": "Session verified"}
 
-def forgot_password(user_data: ForgotPasswordSchema, db: Session):
+async def forgot_password(user_data: ForgotPasswordSchema, db: AsyncSession):
     if not verify_email_format(user_data.email):
         return {"success": False, "message": "Please enter a valid email address"}
     blank_user = User(email=user_data.email)
-    blank_user = get_user_by_login(db, blank_user)
+    blank_user = await get_user_by_login(db, blank_user)
     if blank_user is None: return {"success": True, "message": "Sent Code if the account exists"}
     code = verification_code()
     valid_until = datetime.now(timezone.utc) + timedelta(minutes=5)
     saved_code = RecoveryCode(recovery_code=code, user_id=blank_user.userid, valid_until=valid_until)
-    saved_code = save_recovery_code(db, saved_code)
-    db.commit()
-    send_password_reset_email(blank_user.email, code)
+    saved_code = await save_recovery_code(db, saved_code)
+    # Kod ve e-posta aynı transaction'da yazılır; gönderimi outbox görevi yapar.
+    await enqueue_email(db, f"password_reset:{blank_user.userid}:{code}", blank_user.email, *password_reset_email(code))
+    await db.commit()
 
     return {"success": True, "message": "Sent Code if the account exists"}
 
-def reset_password(data: ResetPasswordSchema, db: Session):
+async def reset_password(data: ResetPasswordSchema, db: AsyncSession):
+    throttle = throttle_key("reset_password", data.email, None)
+    ensure_not_throttled(throttle)
     blank_user = User(email=data.email)
-    blank_user = get_user_by_login(db, blank_user) #DB'den kullanıcı verisini getir.
-    if blank_user is None: return {"success": False, "message": "Invalid email or recovery code."}
-    if blank_user.email != data.email: return {"success": False, "message": "Invalid email or recovery code."}
-    hashed_password = hash_password(data.new_password)
-    blank_user.password = hashed_password
-    if not validate_recovery_code(db, blank_user.userid, data.recovery_code):
+    blank_user = await get_user_by_login(db, blank_user) #DB'den kullanıcı verisini getir.
+    if blank_user is None or blank_user.email != data.email:
+        await register_failure(db, throttle)
         return {"success": False, "message": "Invalid email or recovery code."}
+    # Kod doğrulanmadan hash hesaplanmaz; yanlış kodla gelen istekler CPU harcamaz.
+    if not await validate_recovery_code(db, blank_user.userid, data.recovery_code):
+        await register_failure(db, throttle)
+        return {"success": False, "message": "Invalid email or recovery code."}
+    await register_success(db, throttle)
+    hashed_password = await password_hasher.hash(data.new_password)
+    blank_user.password = hashed_password
 
-    edited = update_user_password(db, blank_user.userid, blank_user.password)
+    edited = await update_user_password(db, blank_user.userid, blank_user.password)
     if edited is None: return {"success": False, "message": "Invalid email or recovery code."}
+    session_cache.invalidate_user(blank_user.userid)
     return {"success": True, "message": "Password Reset Successfully."}
 
-def verify_email(login_data: VerifyEmailSchema, db: Session):
+async def verify_email(login_data: VerifyEmailSchema, db: AsyncSession):
+    throttle = throttle_key("verify_email", login_data.email, login_data.phone)
+    ensure_not_throttled(throttle)
     new_user = User(email=login_data.email, phone=login_data.phone)
-    new_user = get_user_by_login(db, new_user)
-    if new_user is None: return {"success": False, "message": "Invalid credentials"}
-    validation_result = validate_email_verification_code(db, new_user.userid, login_data.verification_code)
+    new_user = await get_user_by_login(db, new_user)
+    if new_user is None:
+        await register_failure(db, throttle)
+        return {"success": False, "message": "Invalid credentials"}
+    validation_result = await validate_email_verification_code(db, new_user.userid, login_data.verification_code)
     if not validation_result:
+        await register_failure(db, throttle)
         return {"success": False, "message": "Invalid credentials"}
-    edit_email_status(db, new_user.userid, True)
+    await register_success(db, throttle)
+    await edit_email_status(db, new_user.userid, True)
+    session_cache.invalidate_user(new_user.userid)
     return {"success": True, "message": "Validated Verification Code", "code": login_data.verification_code}
 
-async def logout(user_data: UserLogoutSchema, db: Session):
-    db_session = get_session(db, user_data.session_id)
+async def logout(user_data: UserLogoutSchema, db: AsyncSession):
+    db_session = await resolve_session(db, user_data.session_id)
     if db_session is None or db_session.user_id != user_data.user_id:
         return {"success": False, "message": "Session does not exist"}
     try:
-        db.delete(db_session)
-        db.commit()
+        if is_signed_session_token(user_data.session_id):
+            # İmzalı token silinemez, sadece iptal edilebilir: satır işaretlenir, iptal listesine eklenir.
+            await revoke_session(db, user_data.session_id)
+            await db.commit()
+            revocation_list.revoke(user_data.session_id, db_session.valid_until)
+        else:
+            await db.delete(db_session)
+            await db.commit()
+        session_cache.invalidate_token(user_data.session_id)
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         print(e)
         return {"success": False, "message": "Internal Server Error"}
     return {"success": True, "message": "Successfully logged out"}
 
 
-def delete_user(user: User, session: str,  db: Session):
-    db_session = get_session(db, session)
+async def delete_user(user: User, session: str,  db: AsyncSession):
+    db_session = await resolve_session(db, session)
     if db_session is None: # session yoksa
         return {"success": False, "message": "Not Authorized"}
     elif db_session.user_id != user.userid: # session, düzenlemeyi yapandan başkasına aitse
         return {"success": False, "message": "Not Authorized"}
-    elif db_session.valid_until < datetime.now(timezone.utc):
+    elif db_session.valid_until.replace(tzinfo=timezone.utc) < datetime.now(timezone.utc):
         return {"success": False, "message": "Not Authorized"}
 
-    db.delete(user)
-    db.commit()
+    # current_user önbellekten gelen, session'a bağlı olmayan bir kopya olabilir; silmek için DB'den yükle.
+    db_user = await get_user_by_id(db, user.userid)
+    if db_user is None:
+        return {"success": False, "message": "Not Authorized"}
+    # İmzalı token'lar DB'ye gitmeden doğrulandığından, süreleri dolana kadar iptal listesinde kalmalı.
+    revoked = await revoke_user_sessions(db, user.userid)
+    reviewed_branch_ids = await get_reviewed_branch_ids(db, user.userid)
+    await db.delete(db_user)
+    # Yorumlar kullanıcıyla birlikte silinir; şube kartlarının sayaçları aynı transaction'da yeniden hesaplanır.
+    await db.flush()
+    await refresh_card_reviews(db, reviewed_branch_ids)
+    await db.commit()
+    for token_hash, valid_until in revoked:
+        revocation_list.revoke_digest(token_hash, valid_until.replace(tzinfo=valid_until.tzinfo or timezone.utc))
+    session_cache.invalidate_user(user.userid)
     #edit edited_return = ReturnUser.model_validate(edited)
     return {"success": True, "message": "User deleted"}
 
 
-def get_current_user(authorization: str = Header(...), db: Session = Depends(get_db)) -> User:
+async def get_current_user(authorization: str = Header(...), db: AsyncSession = Depends(get_db)) -> User:
     if authorization is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -209,21 +290,45 @@ def get_current_user(authorization: str = Header(...), db: Session = Depends(get
             detail="Invalid authorization scheme. Must be 'Bearer'.",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    db_session = get_session(db, session_token)
+    if is_signed_session_token(session_token):
+        return await _get_user_for_signed_token(session_token, db)
+
+    cached = session_cache.get(session_token)
+    if cached is not None:
+        return cached.to_user()
+
+    row = await get_session_with_user(db, session_token) # session + user tek sorguda
+
+    if row is None or row.valid_until.replace(tzinfo=timezone.utc) < datetime.now(timezone.utc):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired session token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
 
-    if not db_session or db_session.valid_until < datetime.now(timezone.utc):
+    cached = session_cache.put(session_token, row.valid_until, row.User)
+    return cached.to_user() # Her şey yolunda
+
+
+async def _get_user_for_signed_token(session_token: str, db: AsyncSession) -> User:
+    """ İmzalı token: session tablosuna hiç gitmeden doğrula, kullanıcıyı önbellekten ya da PK ile getir. """
+    claims = verify_signed_session_token(session_token)
+    if claims is None or revocation_list.is_revoked(session_token):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or expired session token",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    cached = session_cache.get(session_token)
+    if cached is not None:
+        return cached.to_user()
 
-    user = get_user_by_id(db, db_session.user_id)
+    user_id, valid_until = claims
+    user = await get_user_by_id(db, user_id)
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not find user for the provided session",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    return user # Her şey yolunda
-
+    return session_cache.put(session_token, valid_until, user).to_user()
@@ -0,0 +1,168 @@
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+from fastapi import HTTPException
+from sqlalchemy import select, delete, case
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette import status
+
+from app.auth.models import AuthThrottle
+from app.auth.utils import normalize_phone
+
+THROTTLE_FREE_ATTEMPTS = int(os.getenv("THROTTLE_FREE_ATTEMPTS", "5")) # beklemesiz hatalı deneme sayısı
+THROTTLE_BASE_SECONDS = float(os.getenv("THROTTLE_BASE_SECONDS", "1"))
+THROTTLE_MAX_SECONDS = float(os.getenv("THROTTLE_MAX_SECONDS", "900"))
+THROTTLE_RESET_SECONDS = float(os.getenv("THROTTLE_RESET_SECONDS", "3600")) # son hatadan bu kadar sonra sayaç sıfırlanır
+THROTTLE_MAX_ENTRIES = int(os.getenv("THROTTLE_MAX_ENTRIES", "100000"))
+# true ise hatalar auth_throttle tablosuna da yazılır ve diğer worker'larınki periyodik olarak okunur.
+THROTTLE_SHARED = os.getenv("THROTTLE_SHARED", "false").lower() == "true"
+THROTTLE_SYNC_SECONDS = float(os.getenv("THROTTLE_SYNC_SECONDS", "5"))
+
+
+def throttle_key(scope: str, email: str | None, phone: str | None) -> bytes | None:
+    """ 'login', 'reset_password' gibi bir kapsam ve tanımlayıcıdan 16 byte'lık anahtar üretir. """
+    if email:
+        identifier = email.strip().lower()
+    elif phone:
+        identifier = normalize_phone(phone)
+    else:
+        return None
+    return hashlib.blake2b(f"{scope}:{identifier}".encode(), digest_size=16).digest()
+
+
+class LoginThrottle:
+    """
+    Tanımlayıcı başına hatalı deneme sayacı. THROTTLE_FREE_ATTEMPTS hatadan sonra her yeni hata
+    bekleme süresini ikiye katlar (en fazla THROTTLE_MAX_SECONDS). Kayıtlar (hata sayısı, son hata zamanı)
+    ikilisidir ve LRU ile THROTTLE_MAX_ENTRIES'te sınırlanır.
+    """
+
+    def __init__(self, max_entries: int = THROTTLE_MAX_ENTRIES, free_attempts: int = THROTTLE_FREE_ATTEMPTS,
+                 base_seconds: float = THROTTLE_BASE_SECONDS, max_seconds: float = THROTTLE_MAX_SECONDS,
+                 reset_seconds: float = THROTTLE_RESET_SECONDS):
+        self.max_entries = max_entries
+        self.free_attempts = free_attempts
+        self.base_seconds = base_seconds
+        self.max_seconds = max_seconds
+        self.reset_seconds = reset_seconds
+        self._entries: OrderedDict[bytes, tuple[int, float]] = OrderedDict()
+        self.rejected = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def delay(self, failures: int) -> float:
+        if failures <= self.free_attempts:
+            return 0.0
+        return min(self.base_seconds * 2 ** (failures - self.free_attempts - 1), self.max_seconds)
+
+    def retry_after(self, key: bytes, now: float | None = None) -> float:
+        """ Bekleme süresi dolmadıysa kalan saniyeyi, dolduysa 0 döner. """
+        entry = self._entries.get(key)
+        if entry is None:
+            return 0.0
+        now = time.time() if now is None else now
+        failures, last_failure = entry
+        if now - last_failure >= self.reset_seconds:
+            del self._entries[key]
+            return 0.0
+        return max(last_failure + self.delay(failures) - now, 0.0)
+
+    def record_failure(self, key: bytes, now: float | None = None) -> int:
+        now = time.time() if now is None else now
+        failures, last_failure = self._entries.pop(key, (0, now))
+        if now - last_failure >= self.reset_seconds:
+            failures = 0
+        self._entries[key] = (failures + 1, now)
+        self._evict()
+        return failures + 1
+
+    def record_success(self, key: bytes) -> None:
+        self._entries.pop(key, None)
+
+    def merge(self, key: bytes, failures: int, last_failure: float) -> None:
+        """ Diğer worker'lardan gelen kaydı birleştirir; hangisi daha kötüyse o kalır. """
+        local = self._entries.get(key)
+        if local is None or (failures, last_failure) > local:
+            self._entries[key] = (failures, last_failure)
+            self._entries.move_to_end(key)
+            self._evict()
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "max_entries": self.max_entries, "rejected": self.rejected}
+
+    def _evict(self) -> None:
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+login_throttle = LoginThrottle()
+
+
+def ensure_not_throttled(key: bytes | None) -> None:
+    """ Bekleme süresindeki tanımlayıcı için şifre/kod kontrolüne geçmeden 429 döner. """
+    if key is None:
+        return
+    retry_after = login_throttle.retry_after(key)
+    if retry_after > 0:
+        login_throttle.rejected += 1
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many failed attempts, try again later",
+            headers={"Retry-After": str(int(retry_after) + 1)},
+        )
+
+
+async def register_failure(db: AsyncSession, key: bytes | None) -> None:
+    if key is None:
+        return
+    now = time.time()
+    failures = login_throttle.record_failure(key, now)
+    if not THROTTLE_SHARED:
+        return
+    # Diğer worker'lardaki hatalar da sayılsın diye artış tabloda yapılır.
+    last_failure_at = datetime.fromtimestamp(now, timezone.utc)
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    stmt = dialect.insert(AuthThrottle).values(
+        key_hash=key, failures=1, last_failure_at=last_failure_at,
+        valid_until=last_failure_at + timedelta(seconds=THROTTLE_RESET_SECONDS),
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[AuthThrottle.key_hash],
+        set_={"failures": case((AuthThrottle.valid_until > stmt.excluded.last_failure_at, AuthThrottle.failures + 1),
+                               else_=1), # süresi geçmiş (henüz silinmemiş) kayıt baştan sayılır
+              "last_failure_at": stmt.excluded.last_failure_at,
+              "valid_until": stmt.excluded.valid_until},
+    ).returning(AuthThrottle.failures)
+    shared_failures = (await db.execute(stmt)).scalar()
+    await db.commit()
+    if shared_failures > failures:
+        login_throttle.merge(key, shared_failures, now)
+
+
+async def register_success(db: AsyncSession, key: bytes | None) -> None:
+    if key is None:
+        return
+    login_throttle.record_success(key)
+    if THROTTLE_SHARED:
+        await db.execute(delete(AuthThrottle).where(AuthThrottle.key_hash == key))
+        await db.commit()
+
+
+async def sync_throttle(db: AsyncSession) -> int:
+    """ Bekleme süresinde olabilecek kayıtları tablodan okuyup bellekteki sayaçlarla birleştirir. """
+    now = datetime.now(timezone.utc)
+    result = await db.execute(
+        select(AuthThrottle.key_hash, AuthThrottle.failures, AuthThrottle.last_failure_at)
+        .where(AuthThrottle.valid_until > now, AuthThrottle.failures > login_throttle.free_attempts)
+    )
+    rows = result.all()
+    for key_hash, failures, last_failure_at in rows:
+        if last_failure_at.tzinfo is None:
+            last_failure_at = last_failure_at.replace(tzinfo=timezone.utc)
+        login_throttle.merge(bytes(key_hash), failures, last_failure_at.timestamp())
+    return len(rows)
@@ -0,0 +1,207 @@
+"""
+Arama kutusu için önek (prefix) tamamlama index'i.
+
+Aktif şubelerin işletme adı ve adres kelimeleri (app.business.search ile normalize edilmiş)
+(kelime, -popülerlik, şube id) üçlüleri halinde sıralı bir listede tutulur; bir önekle başlayan
+kelimeler bisect ile bulunan tek bir aralıktır ve her kelimenin şubeleri popülerden başlar. Her tuş vuruşu veritabanına gitmeden bu worker'ın
+belleğinden cevaplanır. Popülerlik şubenin onaylı yorum sayısıdır; konum verilirse yakın
+şubeler öne çıkar. Index hazır değilse /branches/search ile aynı sorguya düşülür.
+"""
+import heapq
+import math
+import os
+import time
+from bisect import bisect_left, insort
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.business.models import BranchCard
+from app.business.search import SEARCH_DISTANCE_SCALE_METERS, normalize_search_text
+from app.business.spatial import haversine
+from app.core.database import SessionLocal
+
+AUTOCOMPLETE_INDEX_ENABLED = os.getenv("AUTOCOMPLETE_INDEX_ENABLED", "true").lower() == "true"
+# Diğer worker'lardaki değişiklikler ve yorum sayıları bu aralıkla tablodan yeniden okunur.
+AUTOCOMPLETE_REFRESH_SECONDS = float(os.getenv("AUTOCOMPLETE_REFRESH_SECONDS", "300"))
+# Bundan kısa sorgular için öneri üretilmez (tek harf neredeyse bütün index'i aday yapar).
+AUTOCOMPLETE_MIN_CHARS = int(os.getenv("AUTOCOMPLETE_MIN_CHARS", "2"))
+# Bir sorguda bakılan en fazla aday. Çok kısa önekler birçok kelimeyi kapsar; o zaman aralığın
+# yalnızca başındaki kelimelerin (her birinde popülerden başlayarak) şubeleri puanlanır.
+AUTOCOMPLETE_MAX_CANDIDATES = int(os.getenv("AUTOCOMPLETE_MAX_CANDIDATES", "500"))
+# Konum verildiğinde yakınlık puanı: AUTOCOMPLETE_DISTANCE_BOOST / (1 + mesafe / ölçek).
+# Popülerlik puanı log(1 + yorum sayısı) olduğundan 2.0, yanı başındaki şubeyi ~6 yorumluk öne taşır.
+AUTOCOMPLETE_DISTANCE_BOOST = float(os.getenv("AUTOCOMPLETE_DISTANCE_BOOST", "2.0"))
+
+
+class AutocompleteEntry:
+    __slots__ = ("branch_id", "business_id", "business_name", "address_text", "lat", "lon", "popularity", "tokens")
+
+    def __init__(self, branch_id: int, business_id: int, business_name: str, address_text: str | None,
+                 lat: float | None, lon: float | None, popularity: int = 0):
+        self.branch_id = branch_id
+        self.business_id = business_id
+        self.business_name = business_name
+        self.address_text = address_text
+        self.lat = lat
+        self.lon = lon
+        self.popularity = popularity
+        self.tokens = tuple(sorted(set(normalize_search_text(f"{business_name} {address_text or ''}").split())))
+
+    def key(self) -> tuple:
+        return self.business_id, self.business_name, self.address_text, self.lat, self.lon, self.popularity
+
+
+class AutocompleteIndex:
+    """ Şube id -> giriş sözlüğü ve üzerinde bisect yapılan sıralı (kelime, -popülerlik, şube id) listesi. """
+
+    def __init__(self, max_candidates: int = AUTOCOMPLETE_MAX_CANDIDATES):
+        self.max_candidates = max_candidates
+        self._entries: dict[int, AutocompleteEntry] = {}
+        self._keys: list[tuple[str, int, int]] = []
+        self.ready = False
+        self.loaded_at: float | None = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, branch_id: int) -> bool:
+        return branch_id in self._entries
+
+    def upsert(self, entry: AutocompleteEntry) -> None:
+        current = self._entries.get(entry.branch_id)
+        if current is not None and current.tokens == entry.tokens and current.popularity == entry.popularity:
+            self._entries[entry.branch_id] = entry
+            return
+        self.remove(entry.branch_id)
+        self._entries[entry.branch_id] = entry
+        for token in entry.tokens:
+            insort(self._keys, (token, -entry.popularity, entry.branch_id))
+
+    def remove(self, branch_id: int) -> None:
+        entry = self._entries.pop(branch_id, None)
+        if entry is None:
+            return
+        for token in entry.tokens:
+            key = (token, -entry.popularity, branch_id)
+            position = bisect_left(self._keys, key)
+            if position < len(self._keys) and self._keys[position] == key:
+                del self._keys[position]
+
+    def popularity(self, branch_id: int) -> int:
+        entry = self._entries.get(branch_id)
+        return entry.popularity if entry is not None else 0
+
+    def add_popularity(self, branch_id: int, delta: int) -> None:
+        entry = self._entries.get(branch_id)
+        if entry is not None:
+            self.upsert(AutocompleteEntry(branch_id, entry.business_id, entry.business_name, entry.address_text,
+                                          entry.lat, entry.lon, max(entry.popularity + delta, 0)))
+
+    def replace_all(self, entries: list[AutocompleteEntry]) -> dict:
+        """ Index'i verilen anlık görüntüyle eşitler; eklenen/silinen/değişen şube sayısını döner. """
+        fresh = {entry.branch_id: entry for entry in entries}
+        removed = sum(1 for branch_id in self._entries if branch_id not in fresh)
+        added = sum(1 for branch_id in fresh if branch_id not in self._entries)
+        changed = sum(1 for branch_id, entry in fresh.items()
+                      if branch_id in self._entries and self._entries[branch_id].key() != entry.key())
+        # Kelimeler toptan sıralanır; yüz binlerce insort'tan çok daha hızlı.
+        self._entries = fresh
+        self._keys = sorted((token, -entry.popularity, entry.branch_id) for entry in entries for token in entry.tokens)
+        self.ready = True
+        self.loaded_at = time.time()
+        return {"added": added, "removed": removed, "changed": changed}
+
+    def _prefix_range(self, prefix: str) -> tuple[int, int]:
+        """ prefix ile başlayan kelimelerin _keys içindeki [başlangıç, bitiş) aralığı. """
+        return bisect_left(self._keys, (prefix,)), bisect_left(self._keys, (prefix + "\U0010ffff",))
+
+    def suggest(self, query: str, limit: int, lat: float | None = None,
+                lon: float | None = None) -> list[tuple[AutocompleteEntry, float | None]]:
+        """
+        Sorgunun her kelimesi şubenin bir kelimesinin öneki olan şubeleri (giriş, mesafe) olarak,
+        popülerlik (ve konum verildiyse yakınlık) puanına göre en iyiden başlayarak döner.
+        """
+        terms = normalize_search_text(query).split()
+        if not terms or len(" ".join(terms)) < AUTOCOMPLETE_MIN_CHARS:
+            return []
+        # Adaylar en dar aralığı olan kelimeden alınır, diğer kelimeler adayın kelimelerinde aranır.
+        ranges = {term: self._prefix_range(term) for term in terms}
+        anchor = min(ranges, key=lambda term: ranges[term][1] - ranges[term][0])
+        others = [term for term in ranges if term != anchor]
+        start, end = ranges[anchor]
+        keys, entries = self._keys, self._entries
+        with_location = lat is not None and lon is not None
+        boost = AUTOCOMPLETE_DISTANCE_BOOST if with_location else 0.0
+
+        best: list[tuple[float, int, AutocompleteEntry, float | None]] = [] # en kötüsü başta (min-heap)
+        seen = set()
+        position, examined = start, 0
+        while position < end and examined < self.max_candidates:
+            token, negative_popularity, branch_id = keys[position]
+            if len(best) == limit and math.log1p(-negative_popularity) + boost < best[0][0]:
+                # Bu kelimenin kalan şubeleri daha az popüler, hiçbiri listeye giremez: sonraki kelimeye geç.
+                position = bisect_left(keys, (token, math.inf), position, end)
+                continue
+            position += 1
+            if branch_id in seen:
+                continue
+            seen.add(branch_id)
+            examined += 1
+            entry = entries[branch_id]
+            if others and not all(any(word.startswith(term) for word in entry.tokens) for term in others):
+                continue
+            score = math.log1p(entry.popularity)
+            distance = None
+            if with_location and entry.lat is not None:
+                distance = haversine(lat, lon, entry.lat, entry.lon)
+                score += boost / (1 + distance / SEARCH_DISTANCE_SCALE_METERS)
+            hit = (score, -branch_id, entry, distance)
+            if len(best) < limit:
+                heapq.heappush(best, hit)
+            elif hit[:2] > best[0][:2]:
+                heapq.heapreplace(best, hit)
+        best.sort(key=lambda hit: hit[:2], reverse=True)
+        return [(entry, distance) for _, _, entry, distance in best]
+
+autocomplete_index = AutocompleteIndex()
+
+
+def autocomplete_branch(branch_id: int, is_active: bool, business_id: int, business_name: str,
+                        address_text: str | None, lat: float | None, lon: float | None) -> None:
+    """ Şube kaydedildikten (commit) sonra çağrılır; bu worker'ın index'ini hemen günceller. """
+    if not AUTOCOMPLETE_INDEX_ENABLED:
+        return
+    if not is_active:
+        autocomplete_index.remove(branch_id)
+        return
+    autocomplete_index.upsert(AutocompleteEntry(branch_id, business_id, business_name, address_text, lat, lon,
+                                                autocomplete_index.popularity(branch_id)))
+
+
+def unautocomplete_branch(branch_id: int) -> None:
+    if AUTOCOMPLETE_INDEX_ENABLED:
+        autocomplete_index.remove(branch_id)
+
+
+def count_branch_review(branch_id: int, delta: int) -> None:
+    """ Onaylı bir yorum eklendiğinde (+1) ya da silindiğinde (-1) popülerliği günceller. """
+    if AUTOCOMPLETE_INDEX_ENABLED:
+        autocomplete_index.add_popularity(branch_id, delta)
+
+
+async def load_autocomplete_entries(db: AsyncSession) -> list[AutocompleteEntry]:
+    """ Görünür şubeleri onaylı yorum sayılarıyla birlikte branch_card'dan tek sorguda okur. """
+    result = await db.execute(
+        select(BranchCard.branch_id, BranchCard.business_id, BranchCard.business_name, BranchCard.address_text,
+               BranchCard.latitude, BranchCard.longitude, BranchCard.review_count)
+    )
+    return [AutocompleteEntry(*row) for row in result.all()]
+
+
+async def refresh_autocomplete_index() -> dict:
+    """ Zamanlayıcı görevi: index'i tablodaki aktif şubeler ve yorum sayılarıyla eşitler. """
+    async with SessionLocal() as db:
+        changes = autocomplete_index.replace_all(await load_autocomplete_entries(db))
+    changes["branches"] = len(autocomplete_index)
+    return changes
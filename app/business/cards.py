@@ -0,0 +1,237 @@
+"""
+branch_card okuma tablosunun bakımı.
+
+Public okuma yolları (/near-me, /list, /branches/search, /branch/{id}, /in-bounds, /clusters, /autocomplete
+ve bellekteki index'lerin yüklenmesi) Branch -> Business -> OpeningHour birleştirmesi yerine yalnızca
+branch_card'ı okur. Kart yalnızca aktif işletmelerin aktif şubeleri için bulunur. Şubeyi, çalışma saatlerini
+ya da onaylı bir yorumu yazan fonksiyon kartı commit'ten önce aynı transaction'da günceller; okuyucular
+ya eski ya da yeni hali görür. Migration'dan sonra ya da tablolar elle değiştirildiyse:
+
+    python -m app.business.cards rebuild
+
+Yorum sayaçları yorum yazılarında tek UPDATE ile artırılıp azaltılır; reconcile_branch_cards görevi
+bunları düzenli aralıklarla reviews tablosundan yeniden hesaplayıp kayan kartları düzeltir.
+"""
+import argparse
+import asyncio
+import logging
+import os
+
+from sqlalchemy import and_, bindparam, case, delete, exists, func, insert, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.business.models import Branch, BranchCard, Business, OpeningHour
+from app.business.schedule import compile_schedule
+from app.core.database import SessionLocal
+from app.reviews.models import Review
+
+CARD_REBUILD_BATCH_SIZE = int(os.getenv("CARD_REBUILD_BATCH_SIZE", "1000"))
+# Yorum sayaçlarının reviews tablosuyla karşılaştırılma aralığı.
+CARD_RECONCILE_SECONDS = float(os.getenv("CARD_RECONCILE_SECONDS", "3600"))
+
+RATINGS = range(1, 6)
+REVIEW_COLUMNS = ["review_count", "rating_sum", *(f"rating_{rating}" for rating in RATINGS), "last_review_at"]
+
+# INSERT ... SELECT ile card_source'tan yazılan kolonlar; saatler ayrıca yazılır.
+CARD_COLUMNS = ["branch_id", "business_id", "business_name", "business_description", "address_text", "phone",
+                "location", "latitude", "longitude", "search_text", *REVIEW_COLUMNS, "created_at"]
+
+logger = logging.getLogger('uvicorn.error')
+
+
+def review_stats(branch_id) -> dict:
+    """
+    REVIEW_COLUMNS -> branch_id'deki şubenin onaylı yorumlarından hesaplanan ilişkili alt sorgu.
+    Her biri (branch_id, status, created_at, id) index'inde tek şubenin aralığını okur.
+    """
+    approved = and_(Review.branch_id == branch_id, Review.status == 'approved')
+    stats = {
+        "review_count": select(func.count()).where(approved),
+        "rating_sum": select(func.coalesce(func.sum(Review.rating), 0)).where(approved),
+        **{f"rating_{rating}": select(func.count()).where(approved, Review.rating == rating) for rating in RATINGS},
+        "last_review_at": select(func.max(Review.created_at)).where(approved),
+    }
+    return {name: query.scalar_subquery() for name, query in stats.items()}
+
+
+def card_source():
+    """ Aktif işletmelerin aktif şubeleri için CARD_COLUMNS sırasıyla kart değerleri. """
+    return select(
+        Branch.id, Branch.business_id, Business.name, Business.description, Branch.address_text, Branch.phone,
+        Branch.location, Branch.latitude, Branch.longitude, Branch.search_text,
+        *review_stats(Branch.id).values(),
+        Branch.created_at
+    ).join(Branch.business).where(Branch.is_active == True, Business.is_active == True)
+
+
+async def write_branch_cards(db: AsyncSession, opening_hours: dict[int, list]) -> None:
+    """
+    Verilen şubelerin (branch_id -> OpeningHour listesi) kartlarını tablolardaki güncel halinden yeniden
+    yazar; görünmez olan (pasif şube ya da işletme) şubelerin kartı silinir. Bekleyen değişiklikler önce
+    flush edilir; commit etmez.
+    """
+    branch_ids = list(opening_hours)
+    if not branch_ids:
+        return
+    card = BranchCard.__table__
+    await db.flush()
+    await db.execute(delete(card).where(card.c.branch_id.in_(branch_ids)))
+    await db.execute(insert(card).from_select(CARD_COLUMNS, card_source().where(Branch.id.in_(branch_ids))))
+
+    schedules = []
+    for branch_id, hours in opening_hours.items():
+        if not hours:
+            continue # kolonların varsayılanı boş liste
+        compiled = compile_schedule(hours)
+        schedules.append({
+            "card_id": branch_id,
+            "card_hours": compiled.opening_hours,
+            "card_intervals": [[start, end] for start, end in zip(compiled.starts, compiled.ends)],
+        })
+    if schedules:
+        await db.execute(
+            update(card).where(card.c.branch_id == bindparam("card_id"))
+            .values(opening_hours=bindparam("card_hours"), open_intervals=bindparam("card_intervals")),
+            schedules
+        )
+
+
+async def write_branch_card(db: AsyncSession, branch_id: int, opening_hours: list) -> None:
+    """ Tek şube için write_branch_cards. """
+    await write_branch_cards(db, {branch_id: opening_hours})
+
+
+async def delete_branch_card(db: AsyncSession, branch_id: int) -> None:
+    """ Şube silinirken aynı transaction'da çağrılır (SQLite'ta ON DELETE CASCADE varsayılan olarak kapalı). """
+    await db.execute(delete(BranchCard).where(BranchCard.branch_id == branch_id))
+
+
+async def count_card_review(db: AsyncSession, review: Review, sign: int, rating: int | None = None) -> None:
+    """
+    Onaylı bir yorum sayıma girince (sign=1) ya da sayımdan çıkınca (sign=-1: silme, onayın kalkması ya da
+    puan değişikliğinde eski puan) kartın sayaçlarını yerinde günceller. rating verilmezse review.rating.
+    Satır kilidi altında tek UPDATE olduğundan eşzamanlı yorumlar birbirini ezmez. Commit etmez;
+    review flush edilmiş (created_at dolu) olmalıdır.
+    """
+    rating = review.rating if rating is None else rating
+    histogram = getattr(BranchCard, f"rating_{rating}")
+    if sign > 0:
+        last_review_at = case(
+            (or_(BranchCard.last_review_at.is_(None), BranchCard.last_review_at < review.created_at),
+             review.created_at),
+            else_=BranchCard.last_review_at
+        )
+    else:
+        # En yeni yorum çıkmış olabilir; kalanların en yenisi index'ten okunur.
+        last_review_at = select(func.max(Review.created_at)).where(
+            Review.branch_id == review.branch_id, Review.status == 'approved', Review.id != review.id
+        ).scalar_subquery()
+    await db.execute(
+        update(BranchCard).where(BranchCard.branch_id == review.branch_id).values({
+            "review_count": BranchCard.review_count + sign,
+            "rating_sum": BranchCard.rating_sum + sign * rating,
+            histogram.key: histogram + sign,
+            "last_review_at": last_review_at,
+        })
+    )
+
+
+async def refresh_card_reviews(db: AsyncSession, branch_ids) -> None:
+    """
+    Verilen şubelerin kartlarındaki yorum sayaçlarını reviews tablosundan yeniden hesaplar (tek UPDATE).
+    Birden çok yorumun birlikte silindiği yollarda (kullanıcı silme) tek tek count_card_review yerine
+    kullanılır; yorumlar silinip flush edildikten sonra çağrılmalıdır. Commit etmez.
+    """
+    branch_ids = list(branch_ids)
+    if not branch_ids:
+        return
+    card = BranchCard.__table__
+    await db.execute(update(card).where(card.c.branch_id.in_(branch_ids)).values(review_stats(card.c.branch_id)))
+
+
+async def rebuild_branch_cards(db: AsyncSession, batch_size: int = CARD_REBUILD_BATCH_SIZE) -> int:
+    """
+    Bütün kartları branch / business / opening_hours / reviews tablolarından yeniden üretir. Şubeler id
+    sırasıyla batch'ler halinde yazılır ve her batch ayrı commit edilir; okuyucular bu sırada boş tablo
+    görmez. Silinmiş şubelerden kalan kartlar en sonda temizlenir. İşlenen şube sayısını döner.
+    """
+    processed, after_id = 0, 0
+    while True:
+        branch_ids = (await db.execute(
+            select(Branch.id).where(Branch.id > after_id).order_by(Branch.id).limit(batch_size)
+        )).scalars().all()
+        if not branch_ids:
+            break
+        hours = {branch_id: [] for branch_id in branch_ids}
+        rows = await db.execute(
+            select(OpeningHour).where(OpeningHour.branch_id.in_(branch_ids)).order_by(OpeningHour.id)
+        )
+        for hour in rows.scalars():
+            hours[hour.branch_id].append(hour)
+        await write_branch_cards(db, hours)
+        await db.commit()
+        db.expunge_all()
+        processed += len(branch_ids)
+        after_id = branch_ids[-1]
+
+    await db.execute(delete(BranchCard).where(~exists().where(Branch.id == BranchCard.branch_id)))
+    await db.commit()
+    return processed
+
+
+async def reconcile_card_reviews(db: AsyncSession, batch_size: int = CARD_REBUILD_BATCH_SIZE) -> dict:
+    """
+    Kartların yorum sayaçlarını batch'ler halinde reviews tablosundan hesaplananla karşılaştırır; farklı
+    olanlar (kaçan bir yazı, elle yapılan değişiklik) aynı alt sorgularla tek UPDATE'te yeniden yazılır.
+    Kontrol edilen ve düzeltilen kart sayısını döner.
+    """
+    card = BranchCard.__table__
+    differs = or_(*(
+        card.c[name].is_distinct_from(stat) for name, stat in review_stats(card.c.branch_id).items()
+    ))
+    checked = repaired = after_id = 0
+    while True:
+        rows = (await db.execute(
+            select(card.c.branch_id, differs)
+            .where(card.c.branch_id > after_id).order_by(card.c.branch_id).limit(batch_size)
+        )).all()
+        if not rows:
+            break
+        drifted = [branch_id for branch_id, differs in rows if differs]
+        if drifted:
+            await refresh_card_reviews(db, drifted)
+            await db.commit()
+        checked += len(rows)
+        repaired += len(drifted)
+        after_id = rows[-1][0]
+    return {"checked": checked, "repaired": repaired}
+
+
+async def reconcile_branch_cards() -> dict:
+    """ Zamanlayıcı görevi: kayan yorum sayaçlarını düzeltir. """
+    async with SessionLocal() as db:
+        report = await reconcile_card_reviews(db)
+    if report["repaired"]:
+        logger.warning(f"Branch card review counters drifted: {report}")
+    return report
+
+
+async def _rebuild(batch_size: int) -> int:
+    async with SessionLocal() as db:
+        return await rebuild_branch_cards(db, batch_size)
+
+
+def main():
+    import app.auth.models # Review ve BusinessStaff mapper'ları User'a bağlı
+
+    parser = argparse.ArgumentParser(description="branch_card okuma tablosunun bakımı.")
+    parser.add_argument("command", choices=["rebuild"], help="rebuild: bütün kartları tablolardan yeniden üretir")
+    parser.add_argument("--batch-size", type=int, default=CARD_REBUILD_BATCH_SIZE, help="Commit başına şube sayısı")
+    args = parser.parse_args()
+
+    processed = asyncio.run(_rebuild(args.batch_size))
+    print(f"{processed} şube işlendi.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,88 +1,241 @@
 from typing import Optional
 
-from sqlalchemy import or_
-from sqlalchemy.orm import Session, joinedload, selectinload
-from geoalchemy2.functions import ST_DWithin, ST_Distance, ST_SetSRID, ST_MakePoint
-from geoalchemy2.shape import from_shape
-from shapely.geometry import Point
+from geoalchemy2 import Geometry
+from sqlalchemy import Float, and_, cast, delete, exists, func, literal, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
+from geoalchemy2.functions import ST_DWithin, ST_Distance
 
-from .models import Branch, Business, DayOfWeekEnum, OpeningHour
+from .cards import delete_branch_card, write_branch_card
+from .geo import Point, geography_envelope, geography_point, geometry_point
+from .models import Branch, BranchCard, BranchOpenInterval, Business, DayOfWeekEnum, OpeningHour
+from .schedule import week_intervals
+from .search import SEARCH_DISTANCE_BOOST, SEARCH_DISTANCE_SCALE_METERS, branch_search_text, normalize_search_text, text_match
 from .schemas import BranchUpdateSchema
 
+# `<->` küre üzerinde ölçer, ST_Distance sferoid üzerinde; aradaki fark %0.5'in altında olduğundan
+# sıralamayı yalnızca neredeyse eşit uzaklıktaki şubeler arasında değiştirebilir.
+KNN_RECHECK_EXTRA = 16
 
-def business_near_point(point: Point, radius: int, db: Session):
+
+def open_at_filter(open_second: float, branch_id=Branch.id):
     """
-    Finds active branches within a given radius of a point.
-    Optimized to pre-load business data to avoid N+1 queries.
+    Şubenin haftanın open_second. saniyesinde açık olmasını şart koşan EXISTS ifadesi.
+    Aralık sınırları tam saniye olduğundan kesirli kısım atılabilir. branch_id dış sorgudaki şube
+    id kolonudur (Branch.id ya da BranchCard.branch_id).
     """
-    search_point_wkb = from_shape(point, srid=4326)
-
-    query = db.query(Branch).options(
-            joinedload(Branch.business),
-            selectinload(Branch.opening_hours)
-    ).filter(
-        Branch.is_active == True,
-        # Geospatial filter to find branches within the specified radius.
-        ST_DWithin(
-            Branch.location,
-            search_point_wkb,
-            radius
-        )
+    second = int(open_second)
+    return exists().where(
+        BranchOpenInterval.branch_id == branch_id,
+        BranchOpenInterval.opens_at <= second,
+        BranchOpenInterval.closes_at > second
     )
 
-    return query.all()
 
+async def replace_open_intervals(db: AsyncSession, branch_id: int, opening_hours) -> None:
+    """ Şubenin branch_open_interval satırlarını saatlerinden yeniden üretir; commit etmez. """
+    await db.execute(delete(BranchOpenInterval).where(BranchOpenInterval.branch_id == branch_id))
+    db.add_all([
+        BranchOpenInterval(branch_id=branch_id, opens_at=int(start), closes_at=int(end))
+        for start, end in week_intervals(opening_hours)
+    ])
 
-def find_nearest_businesses_ordered(lat: float, lon: float, limit: int, db: Session):
+
+async def find_nearest_businesses_ordered(lat: float, lon: float, limit: int, db: AsyncSession,
+                                          max_distance: Optional[float] = None,
+                                          after: Optional[tuple[float, int]] = None,
+                                          open_second: Optional[float] = None) -> list[tuple[BranchCard, float]]:
     """
-    Finds a limited number of the nearest active branches to a point,
-    ordered by distance. Optimized to pre-load business data.
+    Finds a limited number of the nearest visible branches (branch_card) to a point,
+    ordered by (distance, branch_id).
+
+    Adaylar GiST index üzerinden `<->` (KNN) sırasıyla gelir; böylece PostgreSQL tüm tabloyu
+    ölçüp sıralamak yerine index'ten en yakın birkaç satırı okuyup durur. `<->` küre üzerinde
+    ölçtüğünden ilk limit + KNN_RECHECK_EXTRA aday ST_Distance (sferoid) ile yeniden sıralanır.
+    - max_distance: metre cinsinden yarıçap (ST_DWithin, index'i kullanır).
+    - after: önceki sayfanın son (mesafe, id) değeri; "daha fazla yükle" için.
+    - open_second: yalnızca haftanın bu saniyesinde açık olanlar; limit açık şube sayısıdır.
     """
-    user_point = ST_SetSRID(ST_MakePoint(lon, lat), 4326)
-    distance_expr = ST_Distance(Branch.location, user_point).label("distance")
+    user_point = geography_point(lat, lon)
+    exact_distance = ST_Distance(BranchCard.location, user_point)
+
+    candidates = select(
+        BranchCard.branch_id,
+        exact_distance.label("distance")
+    ).order_by(
+        BranchCard.location.op("<->", return_type=Float)(user_point)
+    ).limit(
+        limit + KNN_RECHECK_EXTRA
+    )
+    if max_distance is not None:
+        candidates = candidates.where(ST_DWithin(BranchCard.location, user_point, max_distance))
+    if open_second is not None:
+        candidates = candidates.where(open_at_filter(open_second, BranchCard.branch_id))
+    if after is not None:
+        after_distance, after_id = after
+        candidates = candidates.where(or_(
+            exact_distance > after_distance,
+            and_(exact_distance == after_distance, BranchCard.branch_id > after_id)
+        ))
+    candidates = candidates.subquery()
 
-    query = db.query(
-        Branch,
-        distance_expr
-    ).options(
-        joinedload(Branch.business)
-    ).filter(
-        Branch.is_active == True,
-        Branch.business.has(Business.is_active == True)  # make sure business is active too
+    query = select(
+        BranchCard,
+        candidates.c.distance
+    ).join(
+        candidates, candidates.c.branch_id == BranchCard.branch_id
     ).order_by(
-        distance_expr
+        candidates.c.distance,
+        BranchCard.branch_id
     ).limit(
         limit
     )
 
-    return query.all()
+    result = await db.execute(query)
+    return result.all()
+
+async def get_branch_cards_by_ids(db: AsyncSession, branch_ids: list[int],
+                                  open_second: Optional[float] = None) -> list[BranchCard]:
+    """
+    Verilen ID'lerdeki görünür şubelerin kartlarını getirir, verilen sırayı korur.
+    Bellekteki spatial index'ten gelen adaylar için kullanılır; pasifleşmiş olanların kartı yoktur.
+    """
+    if not branch_ids:
+        return []
+    query = select(BranchCard).where(BranchCard.branch_id.in_(branch_ids))
+    if open_second is not None:
+        query = query.where(open_at_filter(open_second, BranchCard.branch_id))
+    result = await db.execute(query)
+    cards_by_id = {card.branch_id: card for card in result.scalars().all()}
+    return [cards_by_id[branch_id] for branch_id in branch_ids if branch_id in cards_by_id]
+
+
+def average_rating():
+    """
+    Kartın onaylı yorumlarının ortalama puanı; yorumu olmayan şube için 0 (en sona düşer). İki taraf da
+    double precision: cursor'daki Python float'ı ile aynı değer çıksın, keyset eşitliği kaymasın.
+    """
+    return func.coalesce(
+        cast(BranchCard.rating_sum, Float) / cast(func.nullif(BranchCard.review_count, 0), Float), 0.0
+    )
+
+
+async def find_top_rated_within(db: AsyncSession, lat: float, lon: float, radius: float, limit: int,
+                                after: Optional[tuple[float, int, int]] = None,
+                                open_second: Optional[float] = None) -> list[BranchCard]:
+    """
+    Noktanın radius metre yakınındaki görünür şubeler, (ortalama puan azalan, yorum sayısı azalan, id)
+    sırasıyla en fazla limit tane. Puanlar kartta hazır olduğundan yorumlar taranmaz; yarıçaptaki adaylar
+    ST_DWithin ile GiST index'ten gelir. after önceki sayfanın son (ortalama, yorum sayısı, id) değeridir.
+    """
+    average = average_rating()
+    query = select(BranchCard).where(ST_DWithin(BranchCard.location, geography_point(lat, lon), radius))
+    if open_second is not None:
+        query = query.where(open_at_filter(open_second, BranchCard.branch_id))
+    if after is not None:
+        after_average, after_count, after_id = after
+        query = query.where(or_(
+            average < after_average,
+            and_(average == after_average, or_(
+                BranchCard.review_count < after_count,
+                and_(BranchCard.review_count == after_count, BranchCard.branch_id > after_id)
+            ))
+        ))
+    query = query.order_by(average.desc(), BranchCard.review_count.desc(), BranchCard.branch_id).limit(limit)
+    result = await db.execute(query)
+    return list(result.scalars().all())
+
+
+def _in_bounds(min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> list:
+    """
+    Dikdörtgen filtresi: adaylar location üzerindeki GiST index'ten `&&` (sınır kutusu) ile gelir; geography
+    kutusunun kenarları paralellerden biraz farklı olduğundan koordinatlarla kesin olarak yeniden süzülür.
+    """
+    return [
+        BranchCard.location.op("&&")(geography_envelope(min_lat, min_lon, max_lat, max_lon)),
+        BranchCard.latitude.between(min_lat, max_lat),
+        BranchCard.longitude.between(min_lon, max_lon),
+    ]
+
+
+async def find_branches_in_bounds(db: AsyncSession, min_lat: float, min_lon: float, max_lat: float, max_lon: float,
+                                  limit: int, order: str = "popularity") -> list[BranchCard]:
+    """
+    Enlem/boylam dikdörtgeni içindeki görünür şubelerden en fazla limit tanesi (harita ekranı).
+    - order: "popularity" (onaylı yorum sayısı), "rating" (ortalama puan, sonra yorum sayısı) ya da
+      "newest"; eşitlikte id sırası. Sayaçlar kartta hazır olduğundan yorumlar taranmaz.
+    """
+    ordering = {
+        "popularity": [BranchCard.review_count.desc()],
+        "rating": [average_rating().desc(), BranchCard.review_count.desc()],
+        "newest": [BranchCard.created_at.desc()],
+    }[order]
+
+    query = select(BranchCard).where(
+        *_in_bounds(min_lat, min_lon, max_lat, max_lon)
+    ).order_by(*ordering, BranchCard.branch_id).limit(limit)
+    result = await db.execute(query)
+    return list(result.scalars().all())
+
+
+async def cluster_branches(db: AsyncSession, min_lat: float, min_lon: float, max_lat: float, max_lon: float,
+                           cell_degrees: float, open_second: float, max_cells: int):
+    """
+    Dikdörtgendeki görünür şubeleri cell_degrees boyutlu grid hücrelerinde (ST_SnapToGrid) toplar.
+    Hücre başına (enlem ortalaması, boylam ortalaması, şube sayısı, open_second'da açık olan sayısı) döner;
+    en kalabalık max_cells hücre.
+    """
+    cell = func.ST_SnapToGrid(cast(BranchCard.location, Geometry(geometry_type="POINT", srid=4326)),
+                              cell_degrees, cell_degrees)
+    branch_count = func.count()
+    query = select(
+        func.avg(BranchCard.latitude),
+        func.avg(BranchCard.longitude),
+        branch_count,
+        func.count().filter(open_at_filter(open_second, BranchCard.branch_id))
+    ).where(
+        *_in_bounds(min_lat, min_lon, max_lat, max_lon)
+    ).group_by(cell).order_by(branch_count.desc()).limit(max_cells)
+    result = await db.execute(query)
+    return result.all()
+
+
+async def get_active_branch_points_within(db: AsyncSession, lat: float, lon: float,
+                                          radius: float) -> list[tuple[int, float, float]]:
+    """
+    Noktanın radius metre yakınındaki görünür şubelerin (id, enlem, boylam) listesi (ST_DWithin, GiST index).
+    Harita karesi önbelleğinin adaylarını yükler.
+    """
+    user_point = geography_point(lat, lon)
+    result = await db.execute(
+        select(BranchCard.branch_id, BranchCard.latitude, BranchCard.longitude).where(
+            ST_DWithin(BranchCard.location, user_point, radius)
+        )
+    )
+    return [tuple(row) for row in result.all()]
+
 
-def get_branch_with_details_by_id(db: Session, branch_id: int):
+async def get_branch_card(db: AsyncSession, branch_id: int) -> BranchCard | None:
     """
-    Verilen ID'ye sahip aktif bir şubeyi, bağlı olduğu aktif işletme
-    bilgileriyle birlikte getirir.
+    Verilen ID'ye sahip görünür (aktif işletmenin aktif) şubenin kartı; yoksa None.
     """
-    return db.query(Branch).options(
-        joinedload(Branch.business)
-    ).filter(
-        Branch.id == branch_id,
-        Branch.is_active == True,
-        Branch.business.has(Business.is_active == True)
-    ).first()
+    result = await db.execute(select(BranchCard).where(BranchCard.branch_id == branch_id))
+    return result.scalars().first()
 
 
-def get_branch_by_id(db: Session, branch_id: int) -> Branch | None:
+async def get_branch_by_id(db: AsyncSession, branch_id: int) -> Branch | None:
     """
     Tek bir şubeyi ID'sine göre getirir.
     Performans için ilişkili 'business' verisini de aynı sorguda yükler (joinedload).
     """
-    return db.query(Branch).options(
+    result = await db.execute(select(Branch).options(
         joinedload(Branch.business),
         selectinload(Branch.opening_hours)
-    ).filter(Branch.id == branch_id).first()
+    ).where(Branch.id == branch_id))
+    return result.scalars().first()
 
 
-def update_branch(db: Session, db_branch: Branch, update_data: BranchUpdateSchema) -> Branch:
+async def update_branch(db: AsyncSession, db_branch: Branch, update_data: BranchUpdateSchema) -> Branch:
     """
     Mevcut bir Branch nesnesini yeni verilerle günceller ve veritabanına kaydeder.
     """
@@ -91,8 +244,7 @@ def update_branch(db: Session, db_branch: Branch, update_data: BranchUpdateSchem
     for key, value in update_dict.items():
         # Konum verisi özel işlem gerektirir.
         if key == "location" and value is not None:
-            point = Point(value['longitude'], value['latitude'])
-            setattr(db_branch, key, from_shape(point, srid=4326))
+            setattr(db_branch, key, geometry_point(value['latitude'], value['longitude']))
         elif key == "opening_hours":
             # 1. Mevcut tüm saatleri temizle
             db_branch.opening_hours.clear()
@@ -107,79 +259,103 @@ def update_branch(db: Session, db_branch: Branch, update_data: BranchUpdateSchem
                         closes=hour_data['closes']
                     )
                     db_branch.opening_hours.append(new_hour)
+            # "Açık olanlar" filtresinin okuduğu aralıklar da aynı transaction'da güncellenir.
+            await replace_open_intervals(db, db_branch.id, db_branch.opening_hours)
         else:
             setattr(db_branch, key, value)
+    if "address_text" in update_dict:
+        db_branch.search_text = branch_search_text(db_branch.business.name, db_branch.address_text)
 
     db.add(db_branch)
-    db.commit()
-    db.refresh(db_branch)
+    # Okuma tablosu aynı transaction'da; pasifleşen şubenin kartı silinir.
+    await write_branch_card(db, db_branch.id, db_branch.opening_hours)
+    await db.commit()
+    await db.refresh(db_branch)
     return db_branch
 
 
-def get_business_with_branches_by_id(db: Session, business_id: int) -> Business | None:
+async def get_business_with_branches_by_id(db: AsyncSession, business_id: int) -> Business | None:
     """
     Verilen ID'ye sahip işletmeyi, ilişkili tüm şubeleriyle birlikte getirir.
     Performans için `selectinload` kullanılarak N+1 sorgu problemi önlenir.
     """
-    query = db.query(Business).options(
+    query = select(Business).options(
         selectinload(Business.branches)
-    ).filter(Business.id == business_id)
+    ).where(Business.id == business_id)
 
-    return query.first()
+    result = await db.execute(query)
+    return result.scalars().first()
 
 
-def search_branches(db: Session, keyword: str, point: Optional[Point] = None, radius: Optional[int] = None)\
-        -> list[Branch]:
+async def search_branches(db: AsyncSession, keyword: str, limit: int, point: Optional[Point] = None,
+                          radius: Optional[int] = None, open_second: Optional[float] = None,
+                          after: Optional[tuple] = None) -> list[tuple[BranchCard, float]]:
     """
-    Anahtar kelimeye ve opsiyonel olarak lokasyona göre şubeleri arar.
-    - `business.name` ve `branch.address_text` alanlarında arama yapar.
-    - Sadece aktif şubeleri ve işletmeleri döndürür.
-    - Performans için 'business' verisini önceden yükler.
+    Anahtar kelimeye ve opsiyonel olarak lokasyona göre şubeleri (kartlarını) arar.
+    - `search_text` (işletme adı + adres, normalize edilmiş) üzerinde index'li arama yapar
+      (bkz. app.business.search).
+    - Yalnızca görünür şubelerin kartı olduğundan aktiflik için ayrıca süzülmez.
+    - open_second verilirse yalnızca haftanın o saniyesinde açık olanları döndürür.
+    - En fazla limit kadar (kart, puan) döner; puan metin eşleşmesi + nokta verildiyse yakınlık
+      bonusudur. Sıra (puan azalan, id); after bu sıradaki son (puan, id) değeridir.
     """
-    # Temel sorgu: Branch ve Business tablolarını birleştirir.
-    query = db.query(Branch).join(Branch.business).options(
-        joinedload(Branch.business)
-    )
-    # Filtre 1: Anahtar Kelime (Case-insensitive)
-    if keyword:
-        search_term = f"%{keyword}%"
-        query = query.filter(
-            or_(
-                Business.name.ilike(search_term),
-                Branch.address_text.ilike(search_term)
-            )
-        )
+    score_expr = literal(0.0, type_=Float)
+    # Filtre 1: Anahtar Kelime (normalize edilmiş, Türkçe karakterlere duyarsız)
+    text_filter = None
+    if normalize_search_text(keyword):
+        text_filter, score_expr = text_match(db, keyword)
+
+    if point:
+        user_point = geography_point(point.y, point.x)
+        distance_expr = ST_Distance(BranchCard.location, user_point, type_=Float)
+        score_expr = score_expr + SEARCH_DISTANCE_BOOST / (1 + distance_expr / SEARCH_DISTANCE_SCALE_METERS)
+
+    query = select(BranchCard, score_expr.label("score"))
+    if text_filter is not None:
+        query = query.where(text_filter)
     # Filtre 2: Lokasyon (Eğer parametreler verildiyse)
     if point and radius:
-        search_point_wkb = from_shape(point, srid=4326)
-        query = query.filter(
-            ST_DWithin(Branch.location, search_point_wkb, radius)
+        query = query.where(
+            ST_DWithin(BranchCard.location, geography_point(point.y, point.x), radius)
         )
-    # Filtre 3: Sadece Aktif Olanlar
-    # Hem şubenin hem de ana işletmenin aktif olması önemlidir.
-    query = query.filter(
-        Branch.is_active == True,
-        Business.is_active == True
-    )
+    # Filtre 3: Açık olanlar (opsiyonel)
+    if open_second is not None:
+        query = query.where(open_at_filter(open_second, BranchCard.branch_id))
+    # Sıralama ve sayfa
+    if after is not None:
+        after_score, after_id = after
+        query = query.where(or_(
+            score_expr < after_score,
+            and_(score_expr == after_score, BranchCard.branch_id > after_id)
+        ))
+    query = query.order_by(score_expr.desc(), BranchCard.branch_id)
 
-    return query.all()
+    result = await db.execute(query.limit(limit))
+    return result.all()
 
-def delete_branch(db: Session, db_branch: Branch) -> None:
+async def delete_branch(db: AsyncSession, db_branch: Branch) -> None:
     """
-    Verilen Branch nesnesini veritabanından siler.
+    Verilen Branch nesnesini (ve kartını) veritabanından siler.
     """
-    db.delete(db_branch)
-    db.commit()
+    await delete_branch_card(db, db_branch.id)
+    await db.delete(db_branch)
+    await db.commit()
     return
 
-def get_businesses_by_owner_id(db: Session, owner_id: int) -> list[Business]:
+async def get_businesses_by_owner_id(db: AsyncSession, owner_id: int, limit: int,
+                                     after_id: Optional[int] = None) -> list[Business]:
     """
-    Belirli bir sahip ID'sine ait tüm işletmeleri getirir.
+    Belirli bir sahip ID'sine ait işletmeleri id sırasıyla, en fazla limit kadar getirir.
     Performans için kritik olan, ilişkili 'branches' verisini de aynı sorguda yükler.
-    Bu, N+1 sorgu problemini engeller.
+    Bu, N+1 sorgu problemini engeller. after_id önceki sayfanın son işletmesidir.
     """
-    return db.query(Business).options(
+    query = select(Business).options(
         # 'branches' ilişkisini önceden yükle.
         # Her işletme için ayrı bir şube sorgusu atılmasını önler.
-        joinedload(Business.branches)
-    ).filter(Business.owner_id == owner_id).all()
+        selectinload(Business.branches)
+    ).where(Business.owner_id == owner_id)
+    if after_id is not None:
+        query = query.where(Business.id > after_id)
+
+    result = await db.execute(query.order_by(Business.id).limit(limit))
+    return result.scalars().all()
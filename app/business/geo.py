@@ -0,0 +1,31 @@
+"""
+Konum yardımcıları. Nokta yalnızca (boylam, enlem) çifti olarak taşınır; WKB'yi Python'da çözmek
+için shapely'e gerek yoktur, koordinatlar sorguda ST_Y / ST_X ile okunur (bkz. Branch.latitude).
+"""
+from typing import NamedTuple
+
+from geoalchemy2 import Geography
+from geoalchemy2.functions import ST_MakeEnvelope, ST_MakePoint, ST_SetSRID
+from sqlalchemy import cast
+
+
+class Point(NamedTuple):
+    """ shapely.Point ile aynı eksen sırası: x boylam, y enlem. """
+    x: float
+    y: float
+
+
+def geometry_point(lat: float, lon: float):
+    """ Branch.location'a yazılabilen SRID 4326 nokta ifadesi. """
+    return ST_SetSRID(ST_MakePoint(lon, lat), 4326)
+
+
+def geography_point(lat: float, lon: float):
+    """ Branch.location ile karşılaştırılacak (ST_Distance, ST_DWithin, <->) geography nokta ifadesi. """
+    return cast(geometry_point(lat, lon), Geography(geometry_type="POINT", srid=4326))
+
+
+def geography_envelope(min_lat: float, min_lon: float, max_lat: float, max_lon: float):
+    """ Enlem/boylam dikdörtgeni; Branch.location ile `&&` (sınır kutusu kesişimi, GiST index) için. """
+    return cast(ST_MakeEnvelope(min_lon, min_lat, max_lon, max_lat, 4326),
+                Geography(geometry_type="POLYGON", srid=4326))
@@ -2,9 +2,9 @@ import enum
 from datetime import datetime, timezone
 from typing import List
 
-from geoalchemy2 import Geography
-from sqlalchemy import Column, ForeignKey, Integer, String, DateTime, Boolean, Enum, Time
-from sqlalchemy.orm import backref, relationship, Mapped
+from geoalchemy2 import Geography, Geometry
+from sqlalchemy import JSON, Column, Float, ForeignKey, Index, Integer, String, DateTime, Boolean, Enum, Text, Time, cast, func
+from sqlalchemy.orm import backref, column_property, deferred, relationship, Mapped
 
 from app.core.database import Base
 
@@ -19,6 +19,11 @@ class Business(Base):
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
     branches: Mapped[List["Branch"]] = relationship(back_populates="business") #doesn't exist normally, just a type hint.
 
+    # /my-businesses sayfaları (owner_id, id) üzerinde aralık taraması olsun diye.
+    __table_args__ = (
+        Index('ix_business_owner_id_id', 'owner_id', 'id'),
+    )
+
 
 class Branch(Base):
     __tablename__ = 'branch'
@@ -26,14 +31,23 @@ class Branch(Base):
     business_id = Column(Integer, ForeignKey('business.id', ondelete='CASCADE'), index=True)
     address_text = Column(String(length=255))
     phone = Column(String(length=16))
-    location = Column(Geography(geometry_type='POINT', srid=4326, spatial_index=True), index=True)
+    # Geography değeri (WKB) yalnızca SQL içinde kullanılır; okuma yollarında yüklenmez (erişilirse hata verir),
+    # koordinatlar latitude / longitude ile sorgunun kendisinde okunur.
+    location = deferred(Column(Geography(geometry_type='POINT', srid=4326, spatial_index=True), index=True),
+                        raiseload=True)
+    latitude = column_property(func.ST_Y(cast(location.columns[0], Geometry(geometry_type="POINT", srid=4326))))
+    longitude = column_property(func.ST_X(cast(location.columns[0], Geometry(geometry_type="POINT", srid=4326))))
     is_active = Column(Boolean, index=True)
     created_at = Column(DateTime, default=datetime.now(timezone.utc))
+    # İşletme adı + adresin normalize edilmiş hali (app.business.search.branch_search_text);
+    # aranan kopyası branch_card'dadır.
+    search_text = Column(Text, nullable=False, default="", server_default="")
     business: Mapped["Business"] = relationship(back_populates="branches")
     opening_hours: Mapped[List["OpeningHour"]] = relationship(
         back_populates="branch", cascade="all, delete-orphan"
     )
 
+
 # Veritabanında int, sadece kodda enum
 class DayOfWeekEnum(enum.Enum):
     monday = 0
@@ -55,6 +69,65 @@ class OpeningHour(Base):
     branch: Mapped["Branch"] = relationship(back_populates="opening_hours")
 
 
+class BranchOpenInterval(Base):
+    """
+    OpeningHour'dan türetilen açık aralıklar; haftanın saniyesi cinsinden [opens_at, closes_at).
+    "Şu an açık olanlar" filtresi sorgunun içinde EXISTS ile çalışsın diye tutulur,
+    saatler her değiştiğinde aynı transaction'da yeniden yazılır (app.business.crud).
+    """
+    __tablename__ = 'branch_open_interval'
+    id = Column(Integer, primary_key=True)
+    branch_id = Column(Integer, ForeignKey('branch.id', ondelete='CASCADE'), nullable=False)
+    opens_at = Column(Integer, nullable=False)
+    closes_at = Column(Integer, nullable=False)
+
+    # EXISTS alt sorgusu bu index'ten tabloya gitmeden (index-only) cevaplanır.
+    __table_args__ = (
+        Index('ix_branch_open_interval_branch_id_opens_at', 'branch_id', 'opens_at', 'closes_at'),
+    )
+
+
+class BranchCard(Base):
+    """
+    Public okuma yollarının okuduğu tek tablo: aktif işletmelerin her aktif şubesi için bir satır.
+    İşletme adı/açıklaması, koordinatlar, derlenmiş çalışma saatleri ve onaylı yorum sayaçları hazır
+    durur; şube, saat ve yorum yazılarıyla aynı transaction'da güncellenir (app.business.cards).
+    """
+    __tablename__ = 'branch_card'
+    branch_id = Column(Integer, ForeignKey('branch.id', ondelete='CASCADE'), primary_key=True)
+    business_id = Column(Integer, nullable=False, index=True)
+    business_name = Column(String(length=50))
+    business_description = Column(String(length=255))
+    address_text = Column(String(length=255))
+    phone = Column(String(length=16))
+    # KNN / ST_DWithin / && için GiST index'li kopya; okuma yollarında yüklenmez.
+    location = deferred(Column(Geography(geometry_type='POINT', srid=4326, spatial_index=True)), raiseload=True)
+    latitude = Column(Float)
+    longitude = Column(Float)
+    # Yalnızca aramanın WHERE / ORDER BY'ında kullanılır, satırla birlikte yüklenmez.
+    search_text = deferred(Column(Text, nullable=False, default="", server_default=""))
+    # app.business.schedule.compile_schedule çıktısı: API'deki saat listesi ve haftanın saniyesi
+    # cinsinden sıralı [başlangıç, bitiş) aralıkları.
+    opening_hours = Column(JSON, nullable=False, default=list)
+    open_intervals = Column(JSON, nullable=False, default=list)
+    # Onaylı yorum sayaçları (app.business.cards.count_card_review): sayı, puan toplamı, 1-5 yıldız
+    # histogramı ve en yeni yorumun zamanı. Ortalama rating_sum / review_count'tur.
+    review_count = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_sum = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_1 = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_2 = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_3 = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_4 = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_5 = Column(Integer, nullable=False, default=0, server_default="0")
+    last_review_at = Column(DateTime(timezone=True))
+    created_at = Column(DateTime)
+
+    __table_args__ = (
+        Index('ix_branch_card_search_text_trgm', 'search_text',
+              postgresql_using='gin', postgresql_ops={'search_text': 'gin_trgm_ops'}),
+    )
+
+
 class BusinessStaff(Base):
     __tablename__ = 'business_staff'
     id = Column(Integer, primary_key=True)
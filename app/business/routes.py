@@ -1,50 +1,46 @@
 import logging
+from datetime import datetime
 from typing import Optional
 
 import geoalchemy2.types
-from fastapi import APIRouter, Depends, HTTPException
-from geoalchemy2.shape import to_shape
-from shapely import Point
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
 from . import service
+from .geo import Point
 from .models import *
 from .schemas import BusinessCreateResponse, BusinessCreateSchema, CustomBusinessCreationResponse, BranchCreateSchema, \
     CustomBranchCreationResponse, BranchCreateResponse, PointSchema, BranchNearMeResponseList, BranchListResponse, \
     CustomBranchDetailResponse, CustomBranchUpdateResponse, BranchUpdateSchema, CustomBusinessDetailResponse, \
-    BusinessDetailResponse, BranchSearchResponseList, CustomSuccessResponse, MyBusinessListResponse
+    BusinessDetailResponse, BranchSearchResponseList, CustomSuccessResponse, MyBusinessListResponse, AutocompleteResponse, \
+    BranchInBoundsResponse, InBoundsOrder, BranchClusterResponse, NearMeSort
 from ..auth.models import User
 from ..auth.service import get_current_user
+from .autocomplete import AUTOCOMPLETE_MIN_CHARS
+from ..core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 from ..core.database import get_db
 
 logger = logging.getLogger('uvicorn.error')
 business_router = APIRouter(prefix="/business", tags=["Businesses"])
 
 @business_router.post("/create", response_model=CustomBusinessCreationResponse)
-def create_business_endpoint(business_data: BusinessCreateSchema, db: Session = Depends(get_db)):
-    result = service.create_business(business_data, db)
+async def create_business_endpoint(business_data: BusinessCreateSchema, db: AsyncSession = Depends(get_db)):
+    result = await service.create_business(business_data, db)
     if not result:
         return CustomBusinessCreationResponse(success=False, message="Business Creation Fail")
     return CustomBusinessCreationResponse(
         success=True, message="Business Created", business=BusinessCreateResponse.model_validate(result.__dict__))
 
 @business_router.post("/create-branch")
-def create_branch_endpoint(branch_data: BranchCreateSchema, db: Session = Depends(get_db)):
-    result = service.create_branch(branch_data, db)
+async def create_branch_endpoint(branch_data: BranchCreateSchema, db: AsyncSession = Depends(get_db)):
+    result = await service.create_branch(branch_data, db)
     if not result:
         return CustomBranchCreationResponse(success=False, message="Branch Creation Fail")
 
-    # WKBElement'i PointSchema'ya dönüştürme
-    shapely_point = to_shape(result.location)
-    location_schema = PointSchema(
-        latitude=shapely_point.y,
-        longitude=shapely_point.x
-    )
-
-    # Yanıt modelini oluştururken dönüştürülmüş location'ı kullanma
+    # Yanıt modelini oluştururken sorguda okunan koordinatları kullanma
     branch_response_data = result.__dict__.copy()
-    branch_response_data['location'] = location_schema
+    branch_response_data['location'] = service.location_schema(result)
 
     return CustomBranchCreationResponse(
         success=True,
@@ -54,13 +50,22 @@ def create_branch_endpoint(branch_data: BranchCreateSchema, db: Session = Depend
 
 # LAT: Kuzey güney LON: Doğu-Batı
 @business_router.get("/near-me", response_model=BranchNearMeResponseList)
-def business_near_me_endpoint(lat: float, lon: float, radius: int, db: Session = Depends(get_db)):
+async def business_near_me_endpoint(lat: float, lon: float, radius: int,
+                                    limit: int = Query(DEFAULT_PAGE_SIZE, gt=0, le=MAX_PAGE_SIZE),
+                                    cursor: Optional[str] = None, open_now: bool = False,
+                                    open_at: Optional[datetime] = None, sort: NearMeSort = NearMeSort.DISTANCE,
+                                    db: AsyncSession = Depends(get_db)):
     """
     Takes in a Point(float longtitude, float latitude) and the radius and
     returns a list of businesses near the point.
+    Sonuçlar yakından uzağa en fazla limit kadar döner; sonraki sayfa için next_cursor gönderilir.
+    sort=rating yarıçaptakileri ortalama puana (eşitlikte yorum sayısına) göre sıralar; cursor aynı
+    sort değeriyle gönderilmelidir.
+    open_now=true yalnızca şu an açık olanları, open_at verilen anda açık olanları döndürür.
     """
     location = Point(lon, lat)
-    result = service.business_near_me(location, radius, db)
+    result, next_cursor = await service.business_near_me(location, radius, limit, db, cursor, open_now, open_at,
+                                                         sort)
 
     if not result:
         return BranchNearMeResponseList(success=False, message="None Found")
@@ -68,17 +73,24 @@ def business_near_me_endpoint(lat: float, lon: float, radius: int, db: Session =
     return BranchNearMeResponseList(
         success=True,
         message="Branches found",
-        branches=result
+        branches=result,
+        next_cursor=next_cursor
     )
 
 @business_router.get("/list")
-def branch_list_endpoint(lat: float, lon: float, limit: int, db: Session = Depends(get_db)):
+async def branch_list_endpoint(lat: float, lon: float, limit: int = Query(gt=0, le=MAX_PAGE_SIZE),
+                               max_distance: Optional[float] = Query(None, gt=0), cursor: Optional[str] = None,
+                               open_now: bool = False, open_at: Optional[datetime] = None,
+                               db: AsyncSession = Depends(get_db)):
     """
     Takes in latitude and longitude and returns a list of businesses nearby,
     sorted from closest to farthest.
+    max_distance (metre) verilirse daha uzaktakiler listelenmez; "daha fazla yükle" için
+    bir önceki cevabın next_cursor değeri cursor olarak gönderilir.
+    open_now / open_at ile yalnızca açık şubeler listelenir; limit açık şube sayısıdır.
     """
     location = Point(lon, lat)
-    result = service.branch_list(location, limit, db)
+    result, next_cursor = await service.branch_list(location, limit, db, max_distance, cursor, open_now, open_at)
 
     if not result:
         return BranchListResponse(success=False, message="None Found")
@@ -86,16 +98,17 @@ def branch_list_endpoint(lat: float, lon: float, limit: int, db: Session = Depen
     return BranchListResponse(
         success=True,
         message="Branches found",
-        branches=result
+        branches=result,
+        next_cursor=next_cursor
     )
 
 @business_router.get("/branch/{branch_id}", response_model=CustomBranchDetailResponse)
-def get_branch_detail_endpoint(branch_id: int, db: Session = Depends(get_db)):
+async def get_branch_detail_endpoint(branch_id: int, db: AsyncSession = Depends(get_db)):
     """
     Belirli bir şubenin ve bağlı olduğu işletmenin detaylı bilgilerini getirir.
     Bu endpoint herkese açıktır.
     """
-    branch_details = service.get_branch_details(db, branch_id)
+    branch_details = await service.get_branch_details(db, branch_id)
 
     if not branch_details:
         return CustomBranchDetailResponse(
@@ -112,26 +125,21 @@ def get_branch_detail_endpoint(branch_id: int, db: Session = Depends(get_db)):
 
 
 @business_router.put("/branches/{branch_id}",response_model=CustomBranchUpdateResponse)
-def update_branch_endpoint(branch_id: int, branch_data: BranchUpdateSchema, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def update_branch_endpoint(branch_id: int, branch_data: BranchUpdateSchema, db: AsyncSession = Depends(get_db), current_user: User = Depends(get_current_user)):
     """
     Mevcut bir şubeyi günceller.
     - Kimlik doğrulaması (Authentication) gerektirir.
     - Kullanıcı, şubenin ait olduğu işletmenin sahibi olmalıdır (Authorization).
     """
     try:
-        updated_branch = service.edit_branch(
+        updated_branch = await service.edit_branch(
             db=db,
             branch_id=branch_id,
             update_data=branch_data,
             current_user=current_user
         )
-        shapely_point = to_shape(updated_branch.location)
-        location_schema = PointSchema(
-            latitude=shapely_point.y,
-            longitude=shapely_point.x
-        )
         branch_response_data = updated_branch.__dict__.copy()
-        branch_response_data['location'] = location_schema
+        branch_response_data['location'] = service.location_schema(updated_branch)
 
         return CustomBranchUpdateResponse(
             success=True,
@@ -150,37 +158,74 @@ def update_branch_endpoint(branch_id: int, branch_data: BranchUpdateSchema, db:
         )
 
 @business_router.get("/my-businesses", response_model=MyBusinessListResponse)
-def get_my_businesses_endpoint(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def get_my_businesses_endpoint(limit: int = Query(DEFAULT_PAGE_SIZE, gt=0, le=MAX_PAGE_SIZE),
+                                     cursor: Optional[str] = None, db: AsyncSession = Depends(get_db),
+                                     current_user: User = Depends(get_current_user)):
     """
-    Oturum açmış kullanıcının sahip olduğu tüm işletmeleri ve şubelerini listeler.
+    Oturum açmış kullanıcının sahip olduğu işletmeleri ve şubelerini sayfa sayfa listeler.
     Authentication (Bearer Token) gerektirir.
     """
-    user_businesses = service.get_my_businesses(db, current_user)
+    user_businesses, next_cursor = await service.get_my_businesses(db, current_user, limit, cursor)
 
-    return MyBusinessListResponse(success=True, businesses=user_businesses)
+    return MyBusinessListResponse(success=True, businesses=user_businesses, next_cursor=next_cursor)
 
 
+@business_router.get("/in-bounds", response_model=BranchInBoundsResponse)
+async def branches_in_bounds_endpoint(min_lat: float = Query(ge=-90, le=90), min_lon: float = Query(ge=-180, le=180),
+                                      max_lat: float = Query(ge=-90, le=90), max_lon: float = Query(ge=-180, le=180),
+                                      limit: int = Query(DEFAULT_PAGE_SIZE, gt=0, le=MAX_PAGE_SIZE),
+                                      order: InBoundsOrder = InBoundsOrder.POPULARITY,
+                                      db: AsyncSession = Depends(get_db)):
+    """
+    Harita ekranı için görünen dikdörtgendeki şubeler.
+    - **min_lat, min_lon, max_lat, max_lon**: Dikdörtgenin güneybatı ve kuzeydoğu köşeleri.
+    - **limit**: En fazla kaç şube döneceği.
+    - **order**: Öncelik; popularity (yorum sayısı), rating (ortalama puan) ya da newest.
+    """
+    branches = await service.branches_in_bounds(db, min_lat, min_lon, max_lat, max_lon, limit, order)
+    if not branches:
+        return BranchInBoundsResponse(success=True, message="No branches found in this area.", branches=[])
+    return BranchInBoundsResponse(success=True, message=f"{len(branches)} branches found.", branches=branches)
+
+@business_router.get("/clusters", response_model=BranchClusterResponse)
+async def branch_clusters_endpoint(zoom: int = Query(ge=0, le=22),
+                                   min_lat: float = Query(ge=-90, le=90), min_lon: float = Query(ge=-180, le=180),
+                                   max_lat: float = Query(ge=-90, le=90), max_lon: float = Query(ge=-180, le=180),
+                                   open_at: Optional[datetime] = None, db: AsyncSession = Depends(get_db)):
+    """
+    Uzaklaştırılmış harita için şube kümeleri; cevap boyutu şube sayısından bağımsızdır.
+    - **zoom**: Haritanın zoom seviyesi; hücre boyutu buna göre seçilir.
+    - **min_lat, min_lon, max_lat, max_lon**: Görünen dikdörtgenin güneybatı ve kuzeydoğu köşeleri.
+    - **open_at**: open_count bu andaki açık şube sayısıdır (verilmezse şu an).
+    """
+    cell_degrees, clusters = await service.branch_clusters(db, zoom, min_lat, min_lon, max_lat, max_lon, open_at)
+    return BranchClusterResponse(success=True, zoom=zoom, cell_degrees=cell_degrees, clusters=clusters)
+
+@business_router.get("/autocomplete", response_model=AutocompleteResponse)
+async def autocomplete_endpoint(q: str = Query(min_length=AUTOCOMPLETE_MIN_CHARS, max_length=100),
+                                lat: Optional[float] = None, lon: Optional[float] = None,
+                                limit: int = Query(10, gt=0, le=20), db: AsyncSession = Depends(get_db)):
+    """
+    Arama kutusu için öneriler; her tuş vuruşunda çağrılabilir.
+    - **q**: Yazılan metin; her kelimesi işletme adı ya da adresteki bir kelimenin başıyla eşleşmeli.
+    - **lat, lon**: Verilirse yakın şubeler öne çıkar.
+    """
+    suggestions = await service.autocomplete(db, q, limit, lat, lon)
+    return AutocompleteResponse(success=True, suggestions=suggestions)
+
 @business_router.get("/{business_id}", response_model=CustomBusinessDetailResponse)
-def get_business_detail_endpoint(business_id: int, db: Session = Depends(get_db)):
+async def get_business_detail_endpoint(business_id: int, db: AsyncSession = Depends(get_db)):
     """
     Belirli bir işletmenin tüm detaylarını ve şubelerini döndürür.
     Bu endpoint herkese açıktır, kimlik doğrulaması gerektirmez.
     """
     try:
-        business_orm = service.get_business_details(db, business_id)
+        business_orm = await service.get_business_details(db, business_id)
 
         serialized_branches = []
         for branch in business_orm.branches:
-            location_schema = None
-            if branch.location is not None:
-                shapely_point = to_shape(branch.location)
-                location_schema = PointSchema(
-                    latitude=shapely_point.y,
-                    longitude=shapely_point.x
-                )
-
-            branch_data = branch.__dict__
-            branch_data['location'] = location_schema
+            branch_data = branch.__dict__.copy()
+            branch_data['location'] = service.location_schema(branch)
             serialized_branches.append(BranchCreateResponse.model_validate(branch_data))
 
         business_data = business_orm.__dict__
@@ -204,37 +249,46 @@ def get_business_detail_endpoint(business_id: int, db: Session = Depends(get_db)
         )
 
 @business_router.get("/branches/search", response_model=BranchSearchResponseList)
-def search_branches_endpoint(keyword: str, lat: Optional[float] = None, lon: Optional[float] = None, radius: Optional[int] = None, db: Session = Depends(get_db)):
+async def search_branches_endpoint(keyword: str, lat: Optional[float] = None, lon: Optional[float] = None, radius: Optional[int] = None,
+                                   limit: int = Query(DEFAULT_PAGE_SIZE, gt=0, le=MAX_PAGE_SIZE), cursor: Optional[str] = None,
+                                   open_now: bool = False, open_at: Optional[datetime] = None, db: AsyncSession = Depends(get_db)):
     """
     Anahtar kelime ve opsiyonel lokasyon ile şube arar.
-    - **keyword**: İşletme adı veya adreste aranacak metin.
-    - **lat, lon**: Arama yapılacak merkez noktanın enlem ve boylamı.
+    - **keyword**: İşletme adı veya adreste aranacak metin (büyük/küçük harf ve Türkçe karakter farkı gözetilmez).
+    - **lat, lon**: Arama yapılacak merkez noktanın enlem ve boylamı; verilirse yakın şubeler öne çıkar.
     - **radius**: Merkez noktadan itibaren aranacak alanın metre cinsinden yarıçapı.
+    - **limit / cursor**: Sayfa boyutu ve bir önceki cevabın next_cursor değeri.
+    - **open_now / open_at**: Yalnızca şu an / verilen anda açık olan şubeler.
     """
-    results = service.search_for_branches(
+    results, next_cursor = await service.search_for_branches(
         db=db,
         keyword=keyword,
         lat=lat,
         lon=lon,
-        radius=radius
+        radius=radius,
+        limit=limit,
+        cursor=cursor,
+        open_now=open_now,
+        open_at=open_at
     )
     if not results:
         return BranchSearchResponseList(success=True, message="No branches found matching your criteria.", branches=[])
     return BranchSearchResponseList(
         success=True,
         message=f"{len(results)} branches found.",
-        branches=results
+        branches=results,
+        next_cursor=next_cursor
     )
 
 @business_router.delete("/branches/{branch_id}", response_model=CustomSuccessResponse)
-def delete_branch_endpoint(branch_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def delete_branch_endpoint(branch_id: int, db: AsyncSession = Depends(get_db), current_user: User = Depends(get_current_user)):
     """
     Mevcut bir şubeyi siler.
     Kimlik doğrulaması gerektirir;
     Kullanıcı, şubenin ait olduğu işletmenin sahibi olmalıdır.
     """
     try:
-        return service.remove_branch(db=db, branch_id=branch_id, current_user=current_user)
+        return await service.remove_branch(db=db, branch_id=branch_id, current_user=current_user)
     except HTTPException as e:
         # Servis katmanından gelen bilinen hataları (404, 403) yansıt
         raise e
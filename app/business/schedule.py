@@ -0,0 +1,86 @@
+"""
+Şubelerin haftalık çalışma saatlerini bir kez derler; sonuç branch_card satırında saklanır.
+
+Her şubenin OpeningHour satırları haftanın saniyesi (Pazartesi 00:00 = 0) cinsinden sıralı,
+birleştirilmiş [başlangıç, bitiş) aralıklarına çevrilir; gece yarısını (ve Pazar -> Pazartesi'yi)
+aşan saatler iki aralığa bölünür. "Şu an açık mı?" sorusu bir ikili aramaya iner ve bir sonuç
+listesinin tamamı aynı saat değeriyle tek geçişte değerlendirilir. API'de dönen biçimlenmiş
+opening_hours listesi de aynı kayıtta tutulur, her cevapta strftime çalıştırılmaz.
+"""
+from bisect import bisect_right
+from datetime import datetime, time, timezone
+
+SECONDS_PER_DAY = 24 * 60 * 60
+SECONDS_PER_WEEK = 7 * SECONDS_PER_DAY
+
+
+def _seconds(value: time) -> float:
+    return value.hour * 3600 + value.minute * 60 + value.second + value.microsecond / 1_000_000
+
+
+def week_second(moment: datetime) -> float:
+    """ Verilen anın haftanın kaçıncı saniyesi olduğunu döner (Pazartesi 00:00 = 0). """
+    return moment.weekday() * SECONDS_PER_DAY + _seconds(moment.time())
+
+
+class CompiledSchedule:
+    """ Bir şubenin haftalık açık aralıkları ve API'de dönen biçimlenmiş saat listesi. """
+    __slots__ = ("starts", "ends", "opening_hours")
+
+    def __init__(self, intervals: list[tuple[float, float]], opening_hours: list[dict]):
+        self.starts = [start for start, _ in intervals]
+        self.ends = [end for _, end in intervals]
+        self.opening_hours = opening_hours
+
+    def is_open(self, second: float) -> bool:
+        i = bisect_right(self.starts, second) - 1
+        return i >= 0 and second < self.ends[i]
+
+
+def week_intervals(opening_hours) -> list[tuple[float, float]]:
+    """ OpeningHour satırlarını haftanın saniyesi cinsinden sıralı, birleştirilmiş aralıklara çevirir. """
+    intervals = []
+    for hour in opening_hours:
+        day_start = hour.day_of_week.value * SECONDS_PER_DAY
+        opens, closes = _seconds(hour.opens), _seconds(hour.closes)
+        if opens <= closes:
+            intervals.append((day_start + opens, day_start + closes))
+            continue
+        # Gece yarısını aşan saatler: ertesi günün kapanışına kadar, gerekirse haftanın başına sarar.
+        end = day_start + SECONDS_PER_DAY + closes
+        if end <= SECONDS_PER_WEEK:
+            intervals.append((day_start + opens, end))
+        else:
+            intervals.append((day_start + opens, SECONDS_PER_WEEK))
+            intervals.append((0.0, end - SECONDS_PER_WEEK))
+
+    merged: list[tuple[float, float]] = []
+    for start, end in sorted(interval for interval in intervals if interval[0] < interval[1]):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def compile_schedule(opening_hours) -> CompiledSchedule:
+    """ Açık aralıkları ve API'de dönen biçimlenmiş saat listesini bir kez hesaplar. """
+    formatted = [
+        {
+            "day_of_week": hour.day_of_week.name.lower(),
+            "opens": hour.opens.strftime("%H:%M:%S"),
+            "closes": hour.closes.strftime("%H:%M:%S")
+        } for hour in opening_hours
+    ]
+    return CompiledSchedule(week_intervals(opening_hours), formatted)
+
+
+def card_schedule(card) -> CompiledSchedule:
+    """ branch_card satırında derlenmiş olarak saklanan saatler; yeniden derleme gerekmez. """
+    return CompiledSchedule(card.open_intervals or [], card.opening_hours or [])
+
+
+def card_open_flags(cards, moment: datetime | None = None) -> list[bool]:
+    """ Sonuç listesindeki bütün kartların açık olup olmadığını aynı an için tek geçişte hesaplar. """
+    second = week_second(moment or datetime.now(timezone.utc))
+    return [card_schedule(card).is_open(second) for card in cards]
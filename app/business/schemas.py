@@ -61,6 +61,8 @@ class BranchNearMeItem(BaseModel):
     business_name: str  # JOIN ile business tablosundan
     location: PointSchema | None
     is_open: bool
+    review_count: int = 0  # onaylı yorumlar
+    average_rating: float | None = None  # yorum yoksa None
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -68,6 +70,7 @@ class BranchNearMeResponseList(BaseModel):
     success: bool
     message: str | None = None
     branches: list[BranchNearMeItem] | None = None
+    next_cursor: str | None = None  # "daha fazla yükle" için; son sayfada None
 
 
 class BranchListItem(BaseModel):
@@ -77,6 +80,8 @@ class BranchListItem(BaseModel):
     location: PointSchema | None
     distance: float
     is_open: bool
+    review_count: int = 0
+    average_rating: float | None = None
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -84,6 +89,7 @@ class BranchListResponse(BaseModel):
     success: bool
     message: str
     branches: list[BranchListItem] | None = None
+    next_cursor: str | None = None  # "daha fazla yükle" için; son sayfada None
 
 class BranchDetailSchema(BaseModel):
     # Şube (Branch)
@@ -99,6 +105,11 @@ class BranchDetailSchema(BaseModel):
     is_open: bool
     opening_hours: List[OpeningHourSchema] = []
     created_at: datetime | None = None
+    # Onaylı yorumlar
+    review_count: int = 0
+    average_rating: float | None = None
+    rating_histogram: dict[int, int] = {}  # yıldız (1-5) -> yorum sayısı
+    last_review_at: datetime | None = None
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -147,6 +158,60 @@ class BranchSearchResponseList(BaseModel):
     success: bool
     message: str | None = None
     branches: list[BranchNearMeItem] | None = None
+    next_cursor: str | None = None
+
+
+class NearMeSort(str, enum.Enum):
+    DISTANCE = "distance"
+    RATING = "rating"
+
+
+class InBoundsOrder(str, enum.Enum):
+    POPULARITY = "popularity"
+    RATING = "rating"
+    NEWEST = "newest"
+
+
+class BranchInBoundsResponse(BaseModel):
+    """
+    /in-bounds endpoint'i için yanıt
+    """
+    success: bool
+    message: str | None = None
+    branches: list[BranchNearMeItem] | None = None
+
+
+class BranchCluster(BaseModel):
+    latitude: float  # hücredeki şubelerin ortalaması
+    longitude: float
+    count: int
+    open_count: int
+
+
+class BranchClusterResponse(BaseModel):
+    """
+    /clusters endpoint'i için yanıt
+    """
+    success: bool
+    zoom: int
+    cell_degrees: float
+    clusters: list[BranchCluster] = []
+
+
+class AutocompleteItem(BaseModel):
+    branch_id: int
+    business_id: int
+    business_name: str
+    address_text: str | None = None
+    distance: float | None = None  # sadece lat/lon verildiyse
+
+
+class AutocompleteResponse(BaseModel):
+    """
+    /autocomplete endpoint'i için yanıt
+    """
+    success: bool
+    suggestions: list[AutocompleteItem] = []
 
 
 class CustomSuccessResponse(BaseModel):
@@ -188,3 +253,4 @@ class MyBusinessListResponse(BaseModel):
     """
     success: bool
     businesses: List[MyBusinessListItem] = []
+    next_cursor: Optional[str] = None
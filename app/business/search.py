@@ -0,0 +1,54 @@
+"""
+Şube araması: Türkçe'ye duyarlı normalizasyon ve veritabanına göre metin eşleştirme/sıralama.
+
+Her şubenin `search_text` kolonunda işletme adı ve adresinin normalize edilmiş hali tutulur
+(aramalar branch_card'daki kopyasında yapılır); arama metni de aynı fonksiyondan geçer. Böylece "İSTANBUL", "istanbul" ve "Istanbul",
+"Kadıköy" ve "kadikoy" aynı şekilde eşleşir.
+
+- PostgreSQL: search_text üzerindeki GIN (gin_trgm_ops) index'i hem alt metin (LIKE '%...%')
+  hem de kelime benzerliği (<%) filtresini karşılar; sıralama word_similarity ile yapılır.
+- Diğer veritabanları: branch_card (Geography kolonu nedeniyle) yalnızca PostgreSQL'de oluşturulduğundan
+  yalnızca düz LIKE filtresi kurulur, puan sabittir.
+"""
+import os
+import re
+import unicodedata
+
+from sqlalchemy import Float, func, literal, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import BranchCard
+
+# Konum verildiğinde yakın şubelere eklenen puan: SEARCH_DISTANCE_BOOST / (1 + mesafe / ölçek).
+SEARCH_DISTANCE_BOOST = float(os.getenv("SEARCH_DISTANCE_BOOST", "0.3"))
+SEARCH_DISTANCE_SCALE_METERS = float(os.getenv("SEARCH_DISTANCE_SCALE_METERS", "2000"))
+
+_WORDS = re.compile(r"[^\W_]+")
+
+
+def normalize_search_text(value: str | None) -> str:
+    """
+    Küçük harfe çevirir (Türkçe kuralıyla: I -> ı, İ -> i), aksanları ve ı/i farkını kaldırır,
+    harf ve rakam dışındaki her şeyi tek boşluğa indirir.
+    """
+    if not value:
+        return ""
+    value = value.replace("İ", "i").replace("I", "ı").lower().replace("ı", "i")
+    value = "".join(c for c in unicodedata.normalize("NFKD", value) if not unicodedata.combining(c))
+    return " ".join(_WORDS.findall(value))
+
+
+def branch_search_text(business_name: str | None, address_text: str | None) -> str:
+    """ Bir şubenin search_text kolonuna yazılan değer. """
+    return normalize_search_text(f"{business_name or ''} {address_text or ''}")
+
+
+def text_match(db: AsyncSession, keyword: str):
+    """ branch_card üzerinde anahtar kelime için (WHERE koşulu, puan ifadesi) döner. """
+    normalized = normalize_search_text(keyword)
+    if db.get_bind().dialect.name == "postgresql":
+        return or_(
+            BranchCard.search_text.like(f"%{normalized}%"),
+            literal(normalized).op("<%")(BranchCard.search_text)
+        ), func.word_similarity(normalized, BranchCard.search_text, type_=Float)
+    return BranchCard.search_text.like(f"%{normalized}%"), literal(0.0, type_=Float)
@@ -1,123 +1,270 @@
 from datetime import datetime, timezone
 import logging
+import os
 from typing import Optional
 
 from fastapi import HTTPException
-from geoalchemy2.functions import ST_MakePoint
-from geoalchemy2.shape import to_shape
-from shapely import Point
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
 from app.auth.models import User
+from app.core.pagination import decode_cursor, split_page
 from app.business import crud
-from app.business.crud import business_near_point, find_nearest_businesses_ordered
-from app.business.models import Business, Branch
+from app.business.cards import write_branch_card
+from app.business.geo import Point, geometry_point
+from app.business.models import Business, Branch, BranchCard
+from app.business.schedule import card_open_flags, card_schedule, week_second
+from app.business.search import branch_search_text
+from app.business.spatial import spatial_index, index_branch, unindex_branch
+from app.business.tile_cache import TILE_CACHE_ENABLED, tile_cache, invalidate_branch_tiles
+from app.business.autocomplete import autocomplete_index, autocomplete_branch, unautocomplete_branch
 from app.business.schemas import BusinessCreateResponse, BusinessCreateSchema, PointSchema, BranchNearMeResponseList, \
-    BranchListResponse, BranchListItem, BranchNearMeItem, BranchDetailSchema, BranchUpdateSchema, CustomSuccessResponse
+    BranchListResponse, BranchListItem, BranchNearMeItem, BranchDetailSchema, BranchUpdateSchema, CustomSuccessResponse, \
+    AutocompleteItem, InBoundsOrder, BranchCluster, NearMeSort
 
+# /list cursor'ının ilk alanı: mesafelerin hangi kaynaktan geldiği. "i": bellekten (spatial index ya da
+# harita karesi önbelleği, küre mesafesi), "p": PostGIS (sferoid mesafesi).
+INDEX_CURSOR = "i"
+POSTGIS_CURSOR = "p"
 
-def create_business(business_data: BusinessCreateSchema, db: Session) -> Business | None:
+# /clusters: 256 piksellik bir harita karosu kaç hücreye bölünür (4 -> ~64 piksellik kümeler) ve
+# bir cevapta en fazla kaç hücre döner. Cevabın boyutu şube sayısından bağımsızdır.
+CLUSTER_CELLS_PER_TILE = int(os.getenv("CLUSTER_CELLS_PER_TILE", "4"))
+CLUSTER_MAX_CELLS = int(os.getenv("CLUSTER_MAX_CELLS", "500"))
+
+
+async def create_business(business_data: BusinessCreateSchema, db: AsyncSession) -> Business | None:
     try:
         db_business = Business(**business_data.model_dump())
         db.add(db_business)
-        db.commit()
-        db.refresh(db_business)
+        await db.commit()
+        await db.refresh(db_business)
         return db_business
     except Exception as e:
         # Always rollback in case of an error to prevent a broken transaction
-        db.rollback()
+        await db.rollback()
         logging.error(f"Error creating business: {e}")
         # Raise an HTTPException to provide a clear error message to the client
         return None
 
 
-def create_branch(branch_data, db):
+async def create_branch(branch_data, db):
     try: # TODO: Frontend için WKT mi iyi yoksa Point(float, float) mı?
-        # Location verisini WKT formatına dönüştürmek için ST_MakePoint
-        location_point = ST_MakePoint(branch_data.location.longitude, branch_data.location.latitude)
+        # Location verisini SRID 4326 noktaya dönüştürmek için ST_MakePoint
+        location_point = geometry_point(branch_data.location.latitude, branch_data.location.longitude)
         # Diğer veriler model_dump ile
         branch_data_dict = branch_data.model_dump(exclude={"location"})
         # location'ı düzeltilmiş değerle güncelle
-        db_branch = Branch(**branch_data_dict, location=location_point)
+        business = await db.get(Business, branch_data.business_id)
+        db_branch = Branch(**branch_data_dict, location=location_point,
+                           search_text=branch_search_text(business.name if business else None,
+                                                          branch_data.address_text))
         db.add(db_branch)
-        db.commit()
-        db.refresh(db_branch)
+        await db.flush()
+        # Yeni şubenin saati henüz yok; kart aynı transaction'da yazılır.
+        await write_branch_card(db, db_branch.id, [])
+        await db.commit()
+        await db.refresh(db_branch)
+        # Kartla aynı kural: pasif işletmenin şubesi index'lerde de görünmez.
+        visible = bool(db_branch.is_active and business is not None and business.is_active)
+        index_branch(db_branch.id, visible, branch_data.location.latitude, branch_data.location.longitude)
+        invalidate_branch_tiles((branch_data.location.latitude, branch_data.location.longitude))
+        if business is not None:
+            autocomplete_branch(db_branch.id, visible, business.id, business.name,
+                                db_branch.address_text, branch_data.location.latitude, branch_data.location.longitude)
         return db_branch
     except Exception as e:
         # Always rollback in case of an error to prevent a broken transaction
-        db.rollback()
+        await db.rollback()
         logging.error(f"Error creating business: {e}")
         # Raise an HTTPException to provide a clear error message to the client
         return None
 
 
-def business_near_me(location: Point, radius: int, db: Session):
+def _open_second(open_now: bool, open_at: Optional[datetime]) -> Optional[float]:
+    """
+    open_at (saat dilimi yoksa UTC kabul edilir) ya da open_now için şimdiki an haftanın saniyesine
+    çevrilir; ikisi de verilmediyse None (filtre yok). open_at verildiyse open_now'a bakılmaz.
+    """
+    if open_at is not None:
+        if open_at.tzinfo is None:
+            open_at = open_at.replace(tzinfo=timezone.utc)
+        return week_second(open_at.astimezone(timezone.utc))
+    if open_now:
+        return week_second(datetime.now(timezone.utc))
+    return None
+
+
+async def business_near_me(location: Point, radius: int, limit: int, db: AsyncSession, cursor: Optional[str] = None,
+                           open_now: bool = False, open_at: Optional[datetime] = None,
+                           sort: NearMeSort = NearMeSort.DISTANCE):
     """
     Takes in a Point(float longtitude, float latitude) and the radius and
     returns a list of businesses near the point.
+    Yarıçap içindekiler yakından uzağa (sort=rating ise en yüksek ortalama puandan başlayarak) sayfa sayfa
+    döner: (şubeler, sonraki sayfanın cursor'ı).
     """
-    branches_orm = crud.business_near_point(point=location, radius=radius, db=db)
-    if not branches_orm:
-        return None
+    open_second = _open_second(open_now, open_at)
+    if sort == NearMeSort.RATING:
+        after = tuple(decode_cursor(cursor, float, int, int)) if cursor else None
+        cards = await crud.find_top_rated_within(db, location.y, location.x, radius, limit + 1, after, open_second)
+        cards, next_cursor = split_page(cards, limit, lambda card: [_average(card) or 0.0, card.review_count,
+                                                                    card.branch_id])
+    else:
+        branches_with_distance, next_cursor = await _nearest_page(location, limit, db, radius, cursor, open_second)
+        cards = [card for card, _ in branches_with_distance]
+    if not cards:
+        return None, None
 
     result_list = []
-    for branch in branches_orm:
-        formatted_data = _calculate_is_open_and_format_branch(branch)
+    for card, is_open in zip(cards, card_open_flags(cards)):
+        formatted_data = _calculate_is_open_and_format_branch(card, is_open)
         result_list.append(BranchNearMeItem.model_validate(formatted_data))
 
-    return result_list
+    return result_list, next_cursor
 
 
-def branch_list(location: Point, limit: int, db: Session):
-    branches_with_distance = crud.find_nearest_businesses_ordered(lat=location.y, lon=location.x, limit=limit, db=db)
+async def branch_list(location: Point, limit: int, db: AsyncSession, max_distance: Optional[float] = None,
+                      cursor: Optional[str] = None, open_now: bool = False, open_at: Optional[datetime] = None):
+    """ En yakın şubeleri ve sonraki sayfa için cursor'ı döner. """
+    branches_with_distance, next_cursor = await _nearest_page(location, limit, db, max_distance, cursor,
+                                                              _open_second(open_now, open_at))
     if not branches_with_distance:
-        return None
+        return None, None
 
     result_list = []
-    for branch, distance in branches_with_distance:
-        formatted_data = _calculate_is_open_and_format_branch(branch)
+    flags = card_open_flags([card for card, _ in branches_with_distance])
+    for (card, distance), is_open in zip(branches_with_distance, flags):
+        formatted_data = _calculate_is_open_and_format_branch(card, is_open)
         formatted_data['distance'] = distance
         result_list.append(BranchListItem.model_validate(formatted_data))
 
-    return result_list
+    return result_list, next_cursor
 
 
-def get_branch_details(db: Session, branch_id: int):
-    branch_orm = crud.get_branch_by_id(db=db, branch_id=branch_id)
-    if not branch_orm or not branch_orm.is_active or not branch_orm.business.is_active:
+async def _nearest_page(location: Point, limit: int, db: AsyncSession, max_distance: Optional[float],
+                        cursor: Optional[str], open_second: Optional[float]):
+    """
+    /near-me ve /list'in ortak sayfası: en yakın limit şube (kart, mesafe) ve sonraki sayfanın cursor'ı.
+    Cursor, mesafenin hangi kaynaktan (index: küre, PostGIS: sferoid) geldiğini de taşır; aynı listenin
+    sayfaları aynı ölçüyle devam eder. Bellekteki index çalışma saatlerini bilmez; açıklık filtresi
+    istenirse ya da index hazır değilse harita karesi önbelleği, o da cevap veremezse PostGIS kullanılır.
+    """
+    source, after = None, None
+    if cursor:
+        source, after_distance, after_id = decode_cursor(cursor, str, float, int)
+        if source not in (INDEX_CURSOR, POSTGIS_CURSOR):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+        after = (after_distance, after_id)
+
+    branches_with_distance = None
+    if spatial_index.ready and source != POSTGIS_CURSOR and open_second is None:
+        branches_with_distance = await _nearest_from_index(location, limit + 1, db, max_distance, after)
+        source = INDEX_CURSOR
+    if branches_with_distance is None and TILE_CACHE_ENABLED and source != POSTGIS_CURSOR:
+        branches_with_distance = await _nearest_from_tiles(location, limit + 1, db, max_distance, after, open_second)
+        source = INDEX_CURSOR
+    if branches_with_distance is None:
+        # Index'ten başlayan bir liste burada devam ederse sınırdaki birkaç şube tekrar edebilir
+        # ya da atlanabilir (küre ve sferoid mesafeleri arasındaki küçük fark); kabul edilebilir.
+        branches_with_distance = await crud.find_nearest_businesses_ordered(
+            lat=location.y, lon=location.x, limit=limit + 1, db=db, max_distance=max_distance, after=after,
+            open_second=open_second)
+        source = POSTGIS_CURSOR
+    return split_page(branches_with_distance, limit, lambda row: [source, row[1], row[0].branch_id])
+
+
+async def _nearest_from_index(location: Point, limit: int, db: AsyncSession, max_distance: Optional[float] = None,
+                              after: Optional[tuple[float, int]] = None):
+    """
+    En yakın şubeleri bellekteki index'ten bulur. Index cevap veremezse ya da adaylardan biri
+    bu arada pasifleşmişse (diğer worker'da değişmiş olabilir) None döner ve PostGIS kullanılır.
+    """
+    hits = spatial_index.nearest(location.y, location.x, limit, max_distance, after)
+    if hits is None:
         return None
+    cards = await crud.get_branch_cards_by_ids(db, [branch_id for branch_id, _ in hits])
+    if len(cards) != len(hits):
+        return None
+    return [(card, distance) for card, (_, distance) in zip(cards, hits)]
+
 
-    formatted_data = _calculate_is_open_and_format_branch(branch_orm)
+async def _nearest_from_tiles(location: Point, limit: int, db: AsyncSession, max_distance: Optional[float],
+                              after: Optional[tuple[float, int]], open_second: Optional[float]):
+    """
+    En yakın şubeleri harita karesi önbelleğindeki adaylardan bulur. Yarıçap en büyük kovayı aşıyorsa ya da
+    max_distance verilmemişken kova içinde yeterli şube yoksa None döner ve PostGIS kullanılır.
+    """
+    radius = max_distance if max_distance is not None else tile_cache.buckets[-1]
+    entry = await tile_cache.candidates(db, location.y, location.x, radius)
+    if entry is None:
+        return None
+    hits = entry.within(location.y, location.x, radius)
+    if after is not None:
+        hits = [(branch_id, distance) for branch_id, distance in hits if (distance, branch_id) > after]
+
+    # Aday id'leri sırayla yüklenir; pasifleşen (ve istenirse kapalı olan) şubeler bu sırada elenir.
+    result = []
+    position = 0
+    while len(result) < limit and position < len(hits):
+        chunk = hits[position:position + (limit - len(result)) * (4 if open_second is not None else 1)]
+        position += len(chunk)
+        cards = await crud.get_branch_cards_by_ids(db, [branch_id for branch_id, _ in chunk], open_second)
+        distances = dict(chunk)
+        result.extend((card, distances[card.branch_id]) for card in cards)
+    if len(result) < limit and max_distance is None:
+        return None # en yakın limit şubenin bir kısmı kovanın dışında olabilir
+    return result[:limit]
+
+
+async def get_branch_details(db: AsyncSession, branch_id: int):
+    card = await crud.get_branch_card(db, branch_id)
+    if card is None:
+        return None # yok ya da şube / işletme aktif değil
+
+    formatted_data = _calculate_is_open_and_format_branch(card)
     return BranchDetailSchema.model_validate(formatted_data)
 
-def edit_branch(db: Session, branch_id: int, update_data: BranchUpdateSchema, current_user: User):
+async def edit_branch(db: AsyncSession, branch_id: int, update_data: BranchUpdateSchema, current_user: User):
     """
     Bir şubeyi düzenlemek için iş mantığını ve yetkilendirmeyi yönetir.
     """
-    db_branch = crud.get_branch_by_id(db, branch_id)
+    db_branch = await crud.get_branch_by_id(db, branch_id)
 
     if not db_branch:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Branch not found")
     if db_branch.business.owner_id != current_user.userid:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to edit this branch")
     # Yetki varsa düzenlemeyi yap ve bildir
-    return crud.update_branch(db, db_branch, update_data)
-
-def get_my_businesses(db: Session, current_user: User):
+    business_active = db_branch.business.is_active # refresh sonrası ilişki yeniden yüklenmesin
+    business_name = db_branch.business.name
+    old_point = _coordinates(db_branch)
+    updated = await crud.update_branch(db, db_branch, update_data)
+    index_branch(updated.id, updated.is_active and business_active, updated.latitude, updated.longitude)
+    autocomplete_branch(updated.id, updated.is_active and business_active, updated.business_id, business_name,
+                        updated.address_text, updated.latitude, updated.longitude)
+    if {"location", "is_active"} & update_data.model_fields_set:
+        # Eski konumu kapsayan kareler (taşındıysa) ve yeni konumu kapsayanlar.
+        invalidate_branch_tiles(old_point, _coordinates(updated))
+    return updated
+
+async def get_my_businesses(db: AsyncSession, current_user: User, limit: int, cursor: Optional[str] = None):
     """
     Oturum açmış kullanıcının sahip olduğu işletmeleri listelemek için iş mantığını yönetir. Auth gerekli
+    (işletmeler, sonraki sayfanın cursor'ı) döner.
     """
-    businesses = crud.get_businesses_by_owner_id(db, owner_id=current_user.userid)
-    return businesses
+    after_id = decode_cursor(cursor, int)[0] if cursor else None
+    businesses = await crud.get_businesses_by_owner_id(db, owner_id=current_user.userid, limit=limit + 1,
+                                                       after_id=after_id)
+    return split_page(businesses, limit, lambda business: [business.id])
 
 
 
-def get_business_details(db: Session, business_id: int):
+async def get_business_details(db: AsyncSession, business_id: int):
     """
     İşletme detaylarını getir (şubeleriyle birlikte)
     """
-    business = crud.get_business_with_branches_by_id(db, business_id)
+    business = await crud.get_business_with_branches_by_id(db, business_id)
 
     if not business:
         raise HTTPException(
@@ -129,32 +276,100 @@ def get_business_details(db: Session, business_id: int):
     return business
 
 
-def search_for_branches(db: Session, keyword: str, lat: Optional[float], lon: Optional[float], radius: Optional[int]) \
-        -> list[BranchNearMeItem]:
+async def search_for_branches(db: AsyncSession, keyword: str, lat: Optional[float], lon: Optional[float], radius: Optional[int],
+                              limit: int, cursor: Optional[str] = None, open_now: bool = False,
+                              open_at: Optional[datetime] = None):
     """
     Arama parametrelerini işler, CRUD'u çağırır ve sonucu formatlar.
+    (şubeler, sonraki sayfanın cursor'ı) döner; cursor (puan, id) taşır.
     """
     point = None
     if lat is not None and lon is not None:
         point = Point(lon, lat)
 
-    branches = crud.search_branches(db, keyword=keyword, point=point, radius=radius)
-    if not branches:
-        return None
+    after = None
+    if cursor:
+        after = tuple(decode_cursor(cursor, float, int))
+    rows = await crud.search_branches(db, keyword=keyword, limit=limit + 1, point=point, radius=radius,
+                                      open_second=_open_second(open_now, open_at), after=after)
+    rows, next_cursor = split_page(rows, limit, lambda row: [row[1], row[0].branch_id])
+    if not rows:
+        return None, None
 
+    cards = [card for card, _ in rows]
     result_list = []
-    for branch in branches:
-        formatted_data = _calculate_is_open_and_format_branch(branch)
+    for card, is_open in zip(cards, card_open_flags(cards)):
+        formatted_data = _calculate_is_open_and_format_branch(card, is_open)
         result_list.append(BranchNearMeItem.model_validate(formatted_data))
 
-    return result_list
+    return result_list, next_cursor
 
-def remove_branch(db: Session, branch_id: int, current_user: User) -> CustomSuccessResponse :
+async def branches_in_bounds(db: AsyncSession, min_lat: float, min_lon: float, max_lat: float, max_lon: float,
+                             limit: int, order: InBoundsOrder = InBoundsOrder.POPULARITY) -> list[BranchNearMeItem]:
+    """
+    Harita ekranında görünen dikdörtgendeki şubeler, öncelik sırasına göre en fazla limit tane.
+    ±180° boylam çizgisini aşan dikdörtgen desteklenmez (min_lon > max_lon).
+    """
+    _check_bounds(min_lat, min_lon, max_lat, max_lon)
+    cards = await crud.find_branches_in_bounds(db, min_lat, min_lon, max_lat, max_lon, limit, order.value)
+    return [
+        BranchNearMeItem.model_validate(_calculate_is_open_and_format_branch(card, is_open))
+        for card, is_open in zip(cards, card_open_flags(cards))
+    ]
+
+def _check_bounds(min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> None:
+    if min_lat > max_lat or min_lon > max_lon:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail="min_lat/min_lon must not be greater than max_lat/max_lon")
+
+
+def cluster_cell_degrees(zoom: int) -> float:
+    """ Web haritasında zoom seviyesindeki bir karonun genişliği (derece) / CLUSTER_CELLS_PER_TILE. """
+    return 360.0 / (2 ** zoom * CLUSTER_CELLS_PER_TILE)
+
+
+async def branch_clusters(db: AsyncSession, zoom: int, min_lat: float, min_lon: float, max_lat: float,
+                          max_lon: float, open_at: Optional[datetime] = None) -> tuple[float, list[BranchCluster]]:
+    """
+    Uzaklaştırılmış harita için dikdörtgendeki şubeleri zoom'a göre grid hücrelerinde toplar.
+    (hücre boyutu, kümeler) döner; open_count open_at'te (verilmezse şu an) açık olan şube sayısıdır.
+    """
+    _check_bounds(min_lat, min_lon, max_lat, max_lon)
+    cell_degrees = cluster_cell_degrees(zoom)
+    rows = await crud.cluster_branches(db, min_lat, min_lon, max_lat, max_lon, cell_degrees,
+                                       _open_second(True, open_at), CLUSTER_MAX_CELLS)
+    return cell_degrees, [
+        BranchCluster(latitude=latitude, longitude=longitude, count=count, open_count=open_count)
+        for latitude, longitude, count, open_count in rows
+    ]
+
+async def autocomplete(db: AsyncSession, q: str, limit: int, lat: Optional[float] = None,
+                       lon: Optional[float] = None) -> list[AutocompleteItem]:
+    """
+    Arama kutusu önerileri. Index hazırsa veritabanına gidilmez; değilse (ilk yükleme bitmeden ya da
+    index kapalıyken) /branches/search'ün sorgusu kullanılır.
+    """
+    if autocomplete_index.ready:
+        return [
+            AutocompleteItem(branch_id=entry.branch_id, business_id=entry.business_id,
+                             business_name=entry.business_name, address_text=entry.address_text,
+                             distance=distance)
+            for entry, distance in autocomplete_index.suggest(q, limit, lat, lon)
+        ]
+    point = Point(lon, lat) if lat is not None and lon is not None else None
+    rows = await crud.search_branches(db, keyword=q, limit=limit, point=point)
+    return [
+        AutocompleteItem(branch_id=card.branch_id, business_id=card.business_id, business_name=card.business_name,
+                         address_text=card.address_text)
+        for card, _ in rows
+    ]
+
+async def remove_branch(db: AsyncSession, branch_id: int, current_user: User) -> CustomSuccessResponse :
     """
     Bir şubeyi silmek için iş mantığını ve yetkilendirmeyi yönetir.
     """
     # Şube var mı? (get_branch_by_id)
-    db_branch = crud.get_branch_by_id(db, branch_id)
+    db_branch = await crud.get_branch_by_id(db, branch_id)
     if not db_branch:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -167,73 +382,64 @@ def remove_branch(db: Session, branch_id: int, current_user: User) -> CustomSucc
             detail="You do not have permission to delete this branch"
         )
     #Yetki varsa, sil.
-    crud.delete_branch(db, db_branch)
+    point = _coordinates(db_branch)
+    await crud.delete_branch(db, db_branch)
+    invalidate_branch_tiles(point)
+    unindex_branch(branch_id)
+    unautocomplete_branch(branch_id)
     return CustomSuccessResponse(success=True, message="Branch deleted")
 
 
-def _calculate_is_open_and_format_branch(branch: Branch):
+def _calculate_is_open_and_format_branch(card: BranchCard, is_open: Optional[bool] = None):
     """
-    Bir Branch ORM nesnesi alır, anlık 'is_open' durumunu hesaplar
-    ve Pydantic şemasına uygun bir dict döndürür.
+    Bir branch_card satırı alır, anlık 'is_open' durumunu hesaplar
+    ve Pydantic şemasına uygun bir dict döndürür; saatler kartta derlenmiş durur.
+    Liste cevaplarında is_open, card_open_flags ile bütün sonuç için önceden hesaplanıp verilir.
     """
-    now_utc = datetime.now(timezone.utc)
-    current_weekday = now_utc.weekday()  # Monday is 0, Sunday is 6
-    previous_weekday = (current_weekday - 1) % 7
-    current_time = now_utc.time()
-
-    is_open = False
-
-    # IS_OPEN Calculation
-    for hour in branch.opening_hours:
-        hour_weekday = hour.day_of_week.value
-
-        # Skip if this day is not relevant
-        if hour_weekday != current_weekday and hour_weekday != previous_weekday:
-            continue
-
-        # Case 1: Normal hours on current day (opens <= closes)
-        if hour_weekday == current_weekday and hour.opens <= hour.closes:
-            if hour.opens <= current_time < hour.closes:
-                is_open = True
-                break
-
-        # Case 2: Overnight hours starting today (opens > closes)
-        elif hour_weekday == current_weekday and hour.opens > hour.closes:
-            if current_time >= hour.opens:
-                is_open = True
-                break
-
-        # Case 3: Overnight hours from previous day
-        elif hour_weekday == previous_weekday and hour.opens > hour.closes:
-            if current_time < hour.closes:
-                is_open = True
-                break
+    schedule = card_schedule(card)
+    if is_open is None:
+        is_open = schedule.is_open(week_second(datetime.now(timezone.utc)))
 
-    # Format opening hours for API response
-    formatted_opening_hours = [
-        {
-            "day_of_week": hour.day_of_week.name.lower(),
-            "opens": hour.opens.strftime("%H:%M:%S"),
-            "closes": hour.closes.strftime("%H:%M:%S")
-        } for hour in branch.opening_hours
-    ]
     # Format branch data for API response
     branch_data = {
-        'id': branch.id,
-        'business_id': branch.business_id,
-        'business_name': branch.business.name,
+        'id': card.branch_id,
+        'business_id': card.business_id,
+        'business_name': card.business_name,
         'is_open': is_open,
-        'address_text': branch.address_text,
-        'phone': branch.phone,
-        'is_active': branch.is_active,
-        'business_description': branch.business.description,
-        'created_at': branch.created_at,
-        'opening_hours': formatted_opening_hours,
-        'location': None
+        'address_text': card.address_text,
+        'phone': card.phone,
+        'is_active': True, # kartı olan şube ve işletmesi aktiftir
+        'business_description': card.business_description,
+        'created_at': card.created_at,
+        'opening_hours': schedule.opening_hours,
+        'location': location_schema(card),
+        'review_count': card.review_count,
+        'average_rating': _average(card),
+        'rating_histogram': {rating: getattr(card, f"rating_{rating}") for rating in range(1, 6)},
+        'last_review_at': card.last_review_at
     }
+    return branch_data
 
-    if branch.location:
-        shapely_point = to_shape(branch.location)
-        branch_data['location'] = PointSchema(latitude=shapely_point.y, longitude=shapely_point.x)
 
-    return branch_data
+def _average(card: BranchCard) -> Optional[float]:
+    """ Kartın sayaçlarından ortalama puan (crud.average_rating ile aynı); yorum yoksa None. """
+    if not card.review_count:
+        return None
+    return card.rating_sum / card.review_count
+
+
+def _coordinates(branch: Branch | BranchCard) -> Optional[tuple[float, float]]:
+    if branch.latitude is None or branch.longitude is None:
+        return None
+    return branch.latitude, branch.longitude
+
+
+def location_schema(branch: Branch | BranchCard) -> Optional[PointSchema]:
+    """
+    Şubenin konumu; koordinatlar şube yüklenirken sorguda ST_Y / ST_X ile okunmuştur (Branch.latitude)
+    ya da kartta hazırdır, WKB çözülmez. Konumu olmayan şube için None.
+    """
+    coordinates = _coordinates(branch)
+    if coordinates is None:
+        return None
+    return PointSchema(latitude=coordinates[0], longitude=coordinates[1])
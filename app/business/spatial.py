@@ -0,0 +1,286 @@
+import logging
+import math
+import os
+import random
+import time
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.business.crud import find_nearest_businesses_ordered
+from app.business.models import BranchCard
+from app.core.database import SessionLocal
+
+logger = logging.getLogger('uvicorn.error')
+
+# true ise aktif şubelerin koordinatları her worker'da bellekte tutulur ve near-me / list
+# sorguları PostGIS yerine buradan cevaplanır. Index hazır değilse PostGIS kullanılır.
+SPATIAL_INDEX_ENABLED = os.getenv("SPATIAL_INDEX_ENABLED", "false").lower() == "true"
+SPATIAL_INDEX_CELL_DEGREES = float(os.getenv("SPATIAL_INDEX_CELL_DEGREES", "0.01")) # ~1.1 km
+# Diğer worker'lardaki değişiklikler bu aralıkla tablodan yeniden okunarak alınır.
+SPATIAL_INDEX_REFRESH_SECONDS = float(os.getenv("SPATIAL_INDEX_REFRESH_SECONDS", "60"))
+# Her yenilemede PostGIS ile karşılaştırılacak örnek nokta sayısı (0: karşılaştırma yok).
+SPATIAL_INDEX_VERIFY_SAMPLES = int(os.getenv("SPATIAL_INDEX_VERIFY_SAMPLES", "3"))
+
+# Bu mesafe içinde k şube bulunamazsa index cevap vermez, sorgu PostGIS'e düşer.
+SPATIAL_INDEX_KNN_LIMIT_METERS = float(os.getenv("SPATIAL_INDEX_KNN_LIMIT_METERS", "50000"))
+
+EARTH_RADIUS_METERS = 6371008.8
+METERS_PER_DEGREE = math.pi * EARTH_RADIUS_METERS / 180
+RADIANS = math.pi / 180
+
+
+def haversine(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """ İki nokta arasındaki büyük daire mesafesi (metre). """
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_METERS * math.asin(min(1.0, math.sqrt(a)))
+
+
+def haversine_term(distance: float) -> float:
+    """ Mesafeyi haversine ara değerine (a) çevirir; a mesafeyle birlikte artar, karşılaştırmada asin gerekmez. """
+    return math.sin(min(distance / EARTH_RADIUS_METERS, math.pi) / 2) ** 2
+
+
+def term_to_distance(a: float) -> float:
+    """ haversine_term'in tersi: ara değerden metre cinsinden mesafe. """
+    return 2 * EARTH_RADIUS_METERS * math.asin(min(1.0, math.sqrt(a)))
+
+
+class BranchSpatialIndex:
+    """
+    Aktif şubeler için sabit boyutlu enlem/boylam hücrelerinden oluşan grid index.
+    Yarıçap sorgusu sadece sınır kutusuyla kesişen hücrelere, en yakın k sorgusu ise merkez hücreden
+    halka halka dışarı bakar. Mesafeler küre üzerinde haversine ile hesaplanır; PostGIS'in sferoid
+    mesafesinden en fazla ~%0.5 farklıdır. ±180° boylam çizgisinde sarma yapılmaz.
+    """
+
+    def __init__(self, cell_degrees: float = SPATIAL_INDEX_CELL_DEGREES,
+                 knn_limit_meters: float = SPATIAL_INDEX_KNN_LIMIT_METERS):
+        self.cell_degrees = cell_degrees
+        self.knn_limit_meters = knn_limit_meters
+        # branch_id -> (lat, lon, cos(lat)); cos her sorguda yeniden hesaplanmasın diye saklanır.
+        self._points: dict[int, tuple[float, float, float]] = {}
+        self._cells: dict[tuple[int, int], set[int]] = {}
+        self.ready = False
+        self.loaded_at: float | None = None
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    def __contains__(self, branch_id: int) -> bool:
+        return branch_id in self._points
+
+    def _cell(self, lat: float, lon: float) -> tuple[int, int]:
+        return math.floor(lat / self.cell_degrees), math.floor(lon / self.cell_degrees)
+
+    def upsert(self, branch_id: int, lat: float, lon: float) -> None:
+        self.remove(branch_id)
+        self._points[branch_id] = (lat, lon, math.cos(lat * RADIANS))
+        self._cells.setdefault(self._cell(lat, lon), set()).add(branch_id)
+
+    def remove(self, branch_id: int) -> None:
+        point = self._points.pop(branch_id, None)
+        if point is None:
+            return
+        cell = self._cell(point[0], point[1])
+        members = self._cells.get(cell)
+        if members is not None:
+            members.discard(branch_id)
+            if not members:
+                del self._cells[cell]
+
+    def replace_all(self, points: dict[int, tuple[float, float]]) -> dict:
+        """ Index'i verilen anlık görüntüyle eşitler; eklenen/silinen/taşınan şube sayısını döner. """
+        added = removed = moved = 0
+        for branch_id in list(self._points):
+            if branch_id not in points:
+                self.remove(branch_id)
+                removed += 1
+        for branch_id, point in points.items():
+            current = self._points.get(branch_id)
+            if current is not None and current[:2] == point:
+                continue
+            if current is None:
+                added += 1
+            else:
+                moved += 1
+            self.upsert(branch_id, *point)
+        self.ready = True
+        self.loaded_at = time.time()
+        return {"added": added, "removed": removed, "moved": moved}
+
+    def _terms(self, lat: float, lon: float, branch_ids):
+        """ Verilen şubeler için (a, branch_id) üretir; a haversine ara değeridir. """
+        points = self._points
+        sin = math.sin
+        cos_lat = math.cos(lat * RADIANS)
+        for branch_id in branch_ids:
+            p_lat, p_lon, p_cos = points[branch_id]
+            yield (sin((p_lat - lat) * RADIANS * 0.5) ** 2
+                   + cos_lat * p_cos * sin((p_lon - lon) * RADIANS * 0.5) ** 2), branch_id
+
+    @staticmethod
+    def _after(terms, after: tuple[float, int] | None):
+        """ after'dan (mesafe, id) önce ya da ona eşit olan adayları eler. """
+        if after is None:
+            yield from terms
+            return
+        floor = haversine_term(after[0]) * (1 - 1e-9) # bunun altındakiler kesin daha yakın
+        for a, branch_id in terms:
+            if a >= floor and (term_to_distance(a), branch_id) > after:
+                yield a, branch_id
+
+    def within(self, lat: float, lon: float, radius: float) -> list[tuple[int, float]]:
+        """ radius metre içindeki şubeleri (id, mesafe) olarak yakından uzağa döner. """
+        lat_span = radius / METERS_PER_DEGREE
+        cos_lat = math.cos(math.radians(min(abs(lat) + lat_span, 90.0)))
+        lon_span = 360.0 if cos_lat < 1e-9 else min(radius / (METERS_PER_DEGREE * cos_lat), 360.0)
+        min_x, min_y = self._cell(lat - lat_span, lon - lon_span)
+        max_x, max_y = self._cell(lat + lat_span, lon + lon_span)
+
+        if (max_x - min_x + 1) * (max_y - min_y + 1) > len(self._cells):
+            # Kutu index'ten büyükse hücreleri gezmek yerine bütün noktalara bak.
+            candidates = self._points.keys()
+        else:
+            cells = self._cells
+            candidates = [
+                branch_id
+                for x in range(min_x, max_x + 1)
+                for y in range(min_y, max_y + 1)
+                for branch_id in cells.get((x, y), ())
+            ]
+        limit = haversine_term(radius)
+        hits = sorted(hit for hit in self._terms(lat, lon, candidates) if hit[0] <= limit)
+        return [(branch_id, term_to_distance(a)) for a, branch_id in hits]
+
+    def nearest(self, lat: float, lon: float, k: int, max_distance: float | None = None,
+                after: tuple[float, int] | None = None) -> list[tuple[int, float]] | None:
+        """
+        En yakın k şubeyi (id, mesafe) olarak yakından uzağa döner. Bunun için knn_limit_meters'ın
+        (ve varsa max_distance'ın) ötesine bakmak gerekirse None döner; çağıran PostGIS'e düşmelidir.
+        after verilirse yalnızca (mesafe, id) sırasında ondan sonra gelen şubeler döner (sayfalama).
+        """
+        if k <= 0 or not self._points:
+            return []
+        center_x, center_y = self._cell(lat, lon)
+        best: list[tuple[float, int]] = []
+        ring = 0
+        seen = 0
+        while True:
+            if (2 * ring + 1) ** 2 > len(self._cells):
+                # Boş hücreleri gezmek noktaları tek tek ölçmekten pahalıya geliyor (seyrek veri).
+                best = sorted(self._after(self._terms(lat, lon, self._points.keys()), after))[:k]
+                break
+            ring_ids = [branch_id for cell in self._ring_cells(center_x, center_y, ring)
+                        for branch_id in self._cells.get(cell, ())]
+            seen += len(ring_ids)
+            best.extend(self._after(self._terms(lat, lon, ring_ids), after))
+            if len(best) >= k:
+                # Aşağıdaki erken çıkış best[-1]'in k. en yakın olmasına dayanır; tam k'da da sıralanmalı.
+                best.sort()
+                del best[k:]
+            # Henüz bakılmamış halkalardaki her nokta en az bu kadar uzakta.
+            bound = self._ring_lower_bound(lat, ring)
+            if len(best) == k and best[-1][0] <= haversine_term(bound):
+                break
+            if seen == len(self._points):
+                break
+            if max_distance is not None and bound > max_distance:
+                break # max_distance'tan uzak olanlar zaten istenmiyor
+            if bound > self.knn_limit_meters:
+                return None # k. şube sınırın ötesinde; bu sorgu PostGIS'e bırakılır
+            ring += 1
+        hits = [(branch_id, term_to_distance(a)) for a, branch_id in sorted(best)[:k]]
+        if max_distance is not None:
+            hits = [hit for hit in hits if hit[1] <= max_distance]
+        return hits
+
+    def _ring_cells(self, center_x: int, center_y: int, ring: int):
+        if ring == 0:
+            yield center_x, center_y
+            return
+        for y in range(center_y - ring, center_y + ring + 1):
+            yield center_x - ring, y
+            yield center_x + ring, y
+        for x in range(center_x - ring + 1, center_x + ring):
+            yield x, center_y - ring
+            yield x, center_y + ring
+
+    def _ring_lower_bound(self, lat: float, ring: int) -> float:
+        """ Merkez hücreden ring halka uzaktaki hücrelerin dışındaki noktalara olan en küçük mesafe. """
+        reach = ring * self.cell_degrees # merkez hücre içindeki konumdan bağımsız güvenli alt sınır
+        cos_lat = math.cos(math.radians(min(abs(lat) + reach + self.cell_degrees, 90.0)))
+        return reach * METERS_PER_DEGREE * max(cos_lat, 0.0) * 0.99 # büyük daire, paralelden biraz kısa
+
+    def sample_points(self, count: int) -> list[tuple[float, float]]:
+        if not self._points:
+            return []
+        return [(lat, lon) for lat, lon, _ in random.sample(list(self._points.values()), min(count, len(self._points)))]
+
+
+spatial_index = BranchSpatialIndex()
+
+
+def index_branch(branch_id: int, is_active: bool, lat: float | None, lon: float | None) -> None:
+    """ Şube kaydedildikten (commit) sonra çağrılır; bu worker'ın index'ini hemen günceller. """
+    if not SPATIAL_INDEX_ENABLED:
+        return
+    if is_active and lat is not None and lon is not None:
+        spatial_index.upsert(branch_id, lat, lon)
+    else:
+        spatial_index.remove(branch_id)
+
+
+def unindex_branch(branch_id: int) -> None:
+    if SPATIAL_INDEX_ENABLED:
+        spatial_index.remove(branch_id)
+
+
+async def load_active_branch_points(db: AsyncSession) -> dict[int, tuple[float, float]]:
+    """ Görünür şubelerin (branch_card) koordinatlarını tek sorguda okur. """
+    result = await db.execute(
+        select(BranchCard.branch_id, BranchCard.latitude, BranchCard.longitude)
+        .where(BranchCard.latitude.is_not(None))
+    )
+    return {branch_id: (lat, lon) for branch_id, lat, lon in result.all()}
+
+
+async def compare_with_postgis(db: AsyncSession, samples: int, k: int = 10) -> dict:
+    """
+    Rastgele noktalar için index'in en yakın k sonucunu PostGIS'inkilerle karşılaştırır.
+    Mesafeleri %1'den yakın olan şubelerin sırası farklı olabilir, bunlar hata sayılmaz. Index'in
+    knn_limit_meters içinde cevaplayamadığı (seyrek bölgedeki) noktalar istekte de PostGIS'e düştüğünden
+    karşılaştırılmaz, "deferred" olarak sayılır.
+    """
+    mismatches = deferred = 0
+    points = spatial_index.sample_points(samples)
+    for lat, lon in points:
+        actual = spatial_index.nearest(lat, lon, k)
+        if actual is None:
+            deferred += 1
+            continue
+        expected = [(card.branch_id, distance) for card, distance in await find_nearest_businesses_ordered(lat, lon, k, db)]
+        if not expected:
+            mismatches += bool(actual)
+            continue
+        cutoff = expected[-1][1] * 0.99 # sınırdaki eşit uzaklıktaki şubeler hariç
+        must_have = {branch_id for branch_id, distance in expected if distance < cutoff}
+        if not must_have <= {branch_id for branch_id, _ in actual}:
+            mismatches += 1
+    return {"samples": len(points), "mismatches": mismatches, "deferred": deferred}
+
+
+async def refresh_spatial_index() -> dict:
+    """ Zamanlayıcı görevi: index'i tablodaki aktif şubelerle eşitler ve PostGIS ile karşılaştırır. """
+    async with SessionLocal() as db:
+        changes = spatial_index.replace_all(await load_active_branch_points(db))
+        if SPATIAL_INDEX_VERIFY_SAMPLES > 0:
+            report = await compare_with_postgis(db, SPATIAL_INDEX_VERIFY_SAMPLES)
+            if report["mismatches"]:
+                logger.warning(f"Spatial index differs from PostGIS: {report}")
+            changes.update(report)
+    changes["branches"] = len(spatial_index)
+    return changes
@@ -0,0 +1,186 @@
+"""
+/near-me ve /list için harita karesi (tile) önbelleği.
+
+Yakındaki şube istekleri birkaç şehir merkezinde toplanır ve her telefonun koordinatı biraz farklıdır.
+Nokta sabit boyutlu bir enlem/boylam karesine, yarıçap da bir kovaya yuvarlanır; (kare, kova) için
+karenin her noktasından kova yarıçapı içinde kalabilecek bütün aktif şubeler (id, enlem, boylam)
+bir kez PostGIS'ten okunur. Her istek bu adayları kendi noktası ve yarıçapıyla tam olarak süzüp
+sıralar. Mesafeler bellekteki spatial index'teki gibi küre üzerinde hesaplanır.
+
+Bir şube eklendiğinde, taşındığında, pasifleştiğinde ya da silindiğinde yalnızca o noktayı
+kapsayan kayıtlar silinir. Diğer worker'lardaki değişiklikler TILE_CACHE_TTL_SECONDS içinde görünür;
+pasifleşen şubeler zaten sonuç yüklenirken elenir.
+
+Varsayılan olarak kapalıdır (TILE_CACHE_ENABLED=true ile açılır). Açıldığında spatial index hazır değilken
+ya da açıklık filtresi istendiğinde /near-me ve /list mesafeleri PostGIS'in sferoid mesafesi yerine küre
+(haversine) mesafesi olur ve sonuçlar TILE_CACHE_TTL_SECONDS'a kadar eski olabilir.
+"""
+import math
+import os
+import time
+from array import array
+from collections import OrderedDict
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.business import crud
+from app.business.spatial import METERS_PER_DEGREE, RADIANS, haversine_term, haversine, term_to_distance
+
+TILE_CACHE_ENABLED = os.getenv("TILE_CACHE_ENABLED", "false").lower() == "true"
+TILE_CACHE_TILE_DEGREES = float(os.getenv("TILE_CACHE_TILE_DEGREES", "0.01")) # ~1.1 km
+# İstenen yarıçap bu kovalardan ilk yeterli olana yuvarlanır; en büyüğünü aşan istekler önbelleğe girmez.
+TILE_CACHE_RADIUS_BUCKETS = sorted(
+    float(bucket) for bucket in os.getenv("TILE_CACHE_RADIUS_BUCKETS", "500,1000,2000,5000,10000").split(",")
+)
+TILE_CACHE_TTL_SECONDS = float(os.getenv("TILE_CACHE_TTL_SECONDS", "60"))
+# Adayların kapladığı toplam bellek (şube başına 24 bayt: id + enlem + boylam); aşılırsa LRU ile atılır.
+TILE_CACHE_MAX_BYTES = int(os.getenv("TILE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+CANDIDATE_BYTES = 3 * 8
+
+
+class TileEntry:
+    __slots__ = ("center_lat", "center_lon", "reach", "ids", "lats", "lons", "loaded_at")
+
+    def __init__(self, center_lat: float, center_lon: float, reach: float, points, loaded_at: float):
+        self.center_lat = center_lat
+        self.center_lon = center_lon
+        self.reach = reach
+        self.ids = array("q", (branch_id for branch_id, _, _ in points))
+        self.lats = array("d", (lat for _, lat, _ in points))
+        self.lons = array("d", (lon for _, _, lon in points))
+        self.loaded_at = loaded_at
+
+    @property
+    def size(self) -> int:
+        return len(self.ids) * CANDIDATE_BYTES
+
+    def within(self, lat: float, lon: float, radius: float) -> list[tuple[int, float]]:
+        """ radius metre içindeki adaylar (id, mesafe) olarak, yakından uzağa. """
+        limit = haversine_term(radius)
+        lat_span = radius / METERS_PER_DEGREE
+        sin = math.sin
+        cos_lat = math.cos(lat * RADIANS)
+        hits = []
+        for branch_id, p_lat, p_lon in zip(self.ids, self.lats, self.lons):
+            if abs(p_lat - lat) > lat_span:
+                continue # enlem farkı tek başına yarıçaptan büyük
+            a = (sin((p_lat - lat) * RADIANS * 0.5) ** 2
+                 + cos_lat * math.cos(p_lat * RADIANS) * sin((p_lon - lon) * RADIANS * 0.5) ** 2)
+            if a <= limit:
+                hits.append((a, branch_id))
+        hits.sort()
+        return [(branch_id, term_to_distance(a)) for a, branch_id in hits]
+
+
+class TileCache:
+    """ (kare, yarıçap kovası) -> TileEntry, toplam aday belleğiyle sınırlı LRU. """
+
+    def __init__(self, tile_degrees: float = TILE_CACHE_TILE_DEGREES, buckets: list[float] = TILE_CACHE_RADIUS_BUCKETS,
+                 ttl_seconds: float = TILE_CACHE_TTL_SECONDS, max_bytes: int = TILE_CACHE_MAX_BYTES):
+        self.tile_degrees = tile_degrees
+        self.buckets = buckets
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[tuple[int, int, float], TileEntry] = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        # Her silmede artar; yükleme sürerken bir silme olduysa yüklenen adaylar saklanmaz.
+        self.generation = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def bucket(self, radius: float) -> float | None:
+        for bucket in self.buckets:
+            if radius <= bucket:
+                return bucket
+        return None
+
+    def key(self, lat: float, lon: float, bucket: float) -> tuple[int, int, float]:
+        return math.floor(lat / self.tile_degrees), math.floor(lon / self.tile_degrees), bucket
+
+    def _tile_reach(self, bucket: float) -> float:
+        """ Karenin merkezinden, karenin herhangi bir noktasının bucket yarıçapına kadar olan mesafe. """
+        half_diagonal = self.tile_degrees * METERS_PER_DEGREE * math.sqrt(2) / 2 # boylam derecesi en fazla bu kadar
+        return bucket + half_diagonal
+
+    async def candidates(self, db: AsyncSession, lat: float, lon: float, radius: float) -> TileEntry | None:
+        """
+        Noktanın karesi ve yarıçapının kovası için adayları döner; yarıçap en büyük kovayı aşıyorsa None.
+        Kayıt yoksa ya da süresi dolmuşsa PostGIS'ten (ST_DWithin) yüklenir.
+        """
+        bucket = self.bucket(radius)
+        if bucket is None:
+            return None
+        key = self.key(lat, lon, bucket)
+        entry = self._entries.get(key)
+        now = time.monotonic()
+        if entry is not None and now - entry.loaded_at < self.ttl_seconds:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+        self.misses += 1
+        center_lat = (key[0] + 0.5) * self.tile_degrees
+        center_lon = (key[1] + 0.5) * self.tile_degrees
+        reach = self._tile_reach(bucket)
+        generation = self.generation
+        points = await crud.get_active_branch_points_within(db, center_lat, center_lon, reach)
+        entry = TileEntry(center_lat, center_lon, reach, points, now)
+        if generation == self.generation:
+            self._store(key, entry)
+        return entry
+
+    def _store(self, key, entry: TileEntry) -> None:
+        self._drop(key)
+        self._entries[key] = entry
+        self.bytes += entry.size
+        while self.bytes > self.max_bytes and len(self._entries) > 1:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self.evictions += 1
+
+    def _drop(self, key) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry.size
+
+    def invalidate_point(self, lat: float | None, lon: float | None) -> int:
+        """ Komşuluğu (lat, lon)'u kapsayan kayıtları siler; silinen kayıt sayısını döner. """
+        if lat is None or lon is None:
+            return 0
+        self.generation += 1
+        stale = [
+            key for key, entry in self._entries.items()
+            if haversine(entry.center_lat, entry.center_lon, lat, lon) <= entry.reach
+        ]
+        for key in stale:
+            self._drop(key)
+        self.invalidations += len(stale)
+        return len(stale)
+
+    def clear(self) -> None:
+        self.generation += 1
+        self._entries.clear()
+        self.bytes = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {"entries": len(self._entries), "bytes": self.bytes, "hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0, "evictions": self.evictions,
+                "invalidations": self.invalidations}
+
+
+tile_cache = TileCache()
+
+
+def invalidate_branch_tiles(*points: tuple[float, float] | None) -> None:
+    """ Şube yazıldıktan (commit) sonra eski ve yeni konumu için çağrılır. """
+    if not TILE_CACHE_ENABLED:
+        return
+    for point in points:
+        if point is not None:
+            tile_cache.invalidate_point(*point)
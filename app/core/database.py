@@ -1,22 +1,62 @@
-from sqlalchemy import create_engine
-from sqlalchemy.ext.mypy.plugin import SQLAlchemyPlugin
+from geoalchemy2 import Geography, Geometry
+from sqlalchemy import Table
+from sqlalchemy.engine import make_url, URL
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import declarative_base
-from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
 import os
 
 load_dotenv()
 
+# DB_URL senkron sürücüyle yazılır (alembic de onu kullanır), uygulama async sürücüye geçer.
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def to_async_url(url: str) -> URL:
+    """
+    postgresql:// -> postgresql+asyncpg://, sqlite:// -> sqlite+aiosqlite://
+    Zaten async sürücü verilmişse olduğu gibi bırakır.
+    """
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend in ASYNC_DRIVERS and not parsed.drivername.endswith(("asyncpg", "aiosqlite")):
+        parsed = parsed.set(drivername=ASYNC_DRIVERS[backend])
+    return parsed
+
+
 DB_URL = os.getenv("DB_URL")
-engine = create_engine(DB_URL, echo=True, plugins=["geoalchemy2"])
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ASYNC_DB_URL = to_async_url(DB_URL)
+# geoalchemy2 eklentisi SQLite bağlantılarında SpatiaLite yüklemeye çalışır; SQLite'ta spatial tablolar
+# zaten oluşturulmadığından (creatable_tables) yalnızca PostgreSQL'de kullanılır.
+engine = create_async_engine(ASYNC_DB_URL, echo=True,
+                             plugins=["geoalchemy2"] if ASYNC_DB_URL.get_backend_name() == "postgresql" else [])
+# expire_on_commit=False: commit sonrası nesnelere erişim lazy-load (ve dolayısıyla senkron IO) tetiklemesin.
+SessionLocal = async_sessionmaker(bind=engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
 
 Base = declarative_base()
 
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+
+def creatable_tables(dialect_name: str) -> list[Table] | None:
+    """
+    create_all'a verilecek tablolar. PostgreSQL'de hepsi (None); PostGIS'i olmayan veritabanında (SQLite)
+    Geography/Geometry kolonlu tablolar oluşturulamadığından atlanır, konum endpoint'leri orada çalışmaz.
+    """
+    if dialect_name == "postgresql":
+        return None
+    return [
+        table for table in Base.metadata.sorted_tables
+        if not any(isinstance(column.type, (Geography, Geometry)) for column in table.columns)
+    ]
+
+
+def create_tables(connection) -> None:
+    """ Uygulama açılışında run_sync ile çağrılır. """
+    Base.metadata.create_all(connection, tables=creatable_tables(connection.dialect.name))
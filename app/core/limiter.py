@@ -1,13 +1,35 @@
+import os
+
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 from starlette.requests import Request
 
+from app.core.rate_limit import SQLCounterStorage
+
+# "sqlcounter://": sayaçlar tüm worker'larda ortak (rate_limit_counter tablosu), "memory://": worker başına
+RATE_LIMIT_STORAGE_URI = os.getenv("RATE_LIMIT_STORAGE_URI", "sqlcounter://")
+
 
 def get_request_identifier(request: Request) -> str:
-    if hasattr(request.state, "user") and request.state.user:
-        return str(request.state.user.id)
+    # user_id, IdentityMiddleware tarafından limiter'dan önce doldurulur.
+    user_id = getattr(request.state, "user_id", None)
+    if user_id is not None:
+        return f"user:{user_id}"
     else:
         return get_remote_address(request)
 
 
-limiter = Limiter(key_func=get_request_identifier, default_limits=["15/minute"])
+limiter = Limiter(key_func=get_request_identifier, default_limits=["15/minute"],
+                  strategy="sliding-window-counter", storage_uri=RATE_LIMIT_STORAGE_URI)
+
+
+def uses_shared_storage() -> bool:
+    return isinstance(limiter.limiter.storage, SQLCounterStorage)
+
+
+async def flush_rate_limit_counters() -> dict:
+    """ Zamanlayıcı görevi: bu worker'ın sayaçlarını ortak tabloyla eşitler. """
+    storage = limiter.limiter.storage
+    if not isinstance(storage, SQLCounterStorage): # storage çöktüyse slowapi bellek yedeğine geçer
+        return {}
+    return await storage.flush()
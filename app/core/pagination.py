@@ -0,0 +1,50 @@
+"""
+Listeleme endpoint'leri için keyset (cursor) sayfalama yardımcıları.
+
+Her sayfa, sıralama anahtarının son değerinden (ör. (mesafe, id) ya da (created_at, id)) sonra
+gelen limit + 1 satırı ister; fazladan satır varsa bir sonraki sayfanın cursor'ı üretilir.
+OFFSET kullanılmadığından her sayfa, sıralamaya uygun index üzerinde bir aralık taramasıdır.
+"""
+import base64
+import json
+import os
+from typing import Any, Callable, Sequence
+
+from fastapi import HTTPException
+from starlette import status
+
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", "20"))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "100"))
+
+
+def encode_cursor(values: list) -> str:
+    """ Sıralama anahtarını (ör. [mesafe, id]) istemciye opak bir metin olarak verir. """
+    raw = json.dumps(values, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str, *converters: Callable[[Any], Any]) -> list:
+    """
+    encode_cursor'ın tersi; her alan sırasıyla verilen dönüştürücüden geçirilir (ör. float, int,
+    datetime.fromisoformat). Bozuk ya da beklenen biçimde olmayan cursor için 400 döner.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if isinstance(values, list) and len(values) == len(converters):
+            return [convert(value) for convert, value in zip(converters, values)]
+    except (ValueError, TypeError):
+        pass
+    raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def split_page(rows: Sequence, limit: int, key: Callable[[Any], list]) -> tuple[list, str | None]:
+    """
+    limit + 1 satırla çalıştırılan sorgunun sonucunu sayfaya ve sonraki sayfanın cursor'ına ayırır.
+    Son sayfada cursor None'dır.
+    """
+    rows = list(rows)
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(key(rows[-1]))
@@ -0,0 +1,154 @@
+import os
+import time
+from datetime import datetime, timezone
+
+from limits.storage import MemoryStorage
+from sqlalchemy import Column, String, Integer, DateTime, select, delete
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.core.database import Base, SessionLocal, engine
+
+# Sayaçların veritabanına yazılma / diğer worker'ların sayaçlarının okunma aralığı.
+# Worker'lar arası limit en fazla bu kadar gecikmeyle tutarlı hale gelir.
+RATE_LIMIT_FLUSH_SECONDS = float(os.getenv("RATE_LIMIT_FLUSH_SECONDS", "1"))
+RATE_LIMIT_FLUSH_CHUNK = 500 # Tek sorgudaki en fazla anahtar
+
+
+class RateLimitCounter(Base):
+    """ Tüm worker'ların ortak rate limit sayaçları; anahtar limits'in pencere anahtarıdır. """
+    __tablename__ = 'rate_limit_counter'
+    key = Column(String(255), primary_key=True)
+    count = Column(Integer, nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+
+class SQLCounterStorage(MemoryStorage):
+    """
+    limits için paylaşımlı depolama: "sqlcounter://".
+
+    İstek yolunda hiçbir zaman veritabanına gidilmez. Sayaçlar MemoryStorage'da tutulur,
+    bu process'te biriken artışlar flush() ile toplu olarak rate_limit_counter tablosuna
+    eklenir ve aynı anda diğer worker'ların katkısı geri okunur. sliding-window-counter
+    stratejisi sadece incr/decr/get kullandığından bu üçü üzerinden çalışır.
+    """
+
+    STORAGE_SCHEME = ["sqlcounter"]
+
+    def __init__(self, uri: str | None = None, wrap_exceptions: bool = False, **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        self._pending: dict[str, int] = {} # henüz yazılmamış artışlar
+        self._pending_expiry: dict[str, float] = {}
+        self._watched: set[str] = set() # son flush'tan beri okunan anahtarlar
+
+    def incr(self, key: str, expiry: float, amount: int = 1) -> int:
+        count = super().incr(key, expiry, amount)
+        self._pending[key] = self._pending.get(key, 0) + amount
+        self._pending_expiry.setdefault(key, self.expirations.get(key, time.time() + expiry))
+        return count
+
+    def decr(self, key: str, amount: int = 1) -> int:
+        count = super().decr(key, amount)
+        self._pending[key] = self._pending.get(key, 0) - amount
+        return count
+
+    def get(self, key: str) -> int:
+        self._watched.add(key)
+        return super().get(key)
+
+    def clear(self, key: str) -> None:
+        super().clear(key)
+        self._pending.pop(key, None)
+        self._pending_expiry.pop(key, None)
+
+    def reset(self) -> int | None:
+        self._pending.clear()
+        self._pending_expiry.clear()
+        self._watched.clear()
+        return super().reset()
+
+    async def flush(self) -> dict:
+        """ Biriken artışları yazar, izlenen anahtarların ortak toplamlarını belleğe alır. """
+        pending, self._pending = self._pending, {}
+        pending_expiry, self._pending_expiry = self._pending_expiry, {}
+        watched, self._watched = self._watched, set()
+        deltas = {key: amount for key, amount in pending.items() if amount}
+        try:
+            async with SessionLocal() as db:
+                await _add_counts(db, deltas, pending_expiry)
+                # Bellekteki sayaçlar ve bu arada okunan (örn. önceki pencere) anahtarlar tazelenir.
+                totals = await _read_counts(db, watched | deltas.keys() | self.storage.keys())
+                await db.commit()
+        except Exception:
+            # Yazılamayan artışlar kaybolmasın, bir sonraki flush'ta tekrar denenir.
+            for key, amount in pending.items():
+                self._pending[key] = self._pending.get(key, 0) + amount
+            for key, expires in pending_expiry.items():
+                self._pending_expiry.setdefault(key, expires)
+            self._watched |= watched
+            raise
+
+        # Buradan sonra await yok; istek yolundaki incr'ler araya giremez.
+        for key, (count, expires_at) in totals.items():
+            with self.locks[key]:
+                # Flush sürerken gelen artışlar henüz tabloda değil, onları da ekle.
+                self.storage[key] = count + self._pending.get(key, 0)
+                self.expirations[key] = expires_at
+        return {"flushed": len(deltas), "refreshed": len(totals)}
+
+
+def _chunks(keys: list[str]):
+    for i in range(0, len(keys), RATE_LIMIT_FLUSH_CHUNK):
+        yield keys[i:i + RATE_LIMIT_FLUSH_CHUNK]
+
+
+async def _add_counts(db, deltas: dict[str, int], expiries: dict[str, float]) -> None:
+    if not deltas:
+        return
+    dialect = postgresql if engine.dialect.name == "postgresql" else sqlite
+    now = time.time()
+    rows = [
+        {"key": key, "count": amount,
+         "expires_at": datetime.fromtimestamp(expiries.get(key, now), timezone.utc)}
+        for key, amount in deltas.items()
+    ]
+    for i in range(0, len(rows), RATE_LIMIT_FLUSH_CHUNK):
+        stmt = dialect.insert(RateLimitCounter).values(rows[i:i + RATE_LIMIT_FLUSH_CHUNK])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[RateLimitCounter.key],
+            set_={"count": RateLimitCounter.count + stmt.excluded.count},
+        )
+        await db.execute(stmt)
+
+
+async def _read_counts(db, keys: set[str]) -> dict[str, tuple[int, float]]:
+    now = datetime.now(timezone.utc)
+    totals = {}
+    for chunk in _chunks(sorted(keys)):
+        result = await db.execute(
+            select(RateLimitCounter.key, RateLimitCounter.count, RateLimitCounter.expires_at)
+            .where(RateLimitCounter.key.in_(chunk), RateLimitCounter.expires_at > now)
+        )
+        for key, count, expires_at in result.all():
+            if expires_at.tzinfo is None: # SQLite
+                expires_at = expires_at.replace(tzinfo=timezone.utc)
+            totals[key] = (count, expires_at.timestamp())
+    return totals
+
+
+async def purge_expired_counters(batch_size: int = 1000, max_batches: int = 50) -> dict:
+    """ Süresi dolmuş sayaçları siler; pencere anahtarları zamanla değiştiği için eskiler birikir. """
+    total = 0
+    for _ in range(max_batches):
+        async with SessionLocal() as db:
+            expired_keys = (
+                select(RateLimitCounter.key)
+                .where(RateLimitCounter.expires_at <= datetime.now(timezone.utc))
+                .limit(batch_size)
+                .scalar_subquery()
+            )
+            result = await db.execute(delete(RateLimitCounter).where(RateLimitCounter.key.in_(expired_keys)))
+            await db.commit()
+        total += result.rowcount
+        if result.rowcount < batch_size:
+            break
+    return {"rate_limit_counter": total}
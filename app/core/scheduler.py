@@ -0,0 +1,155 @@
+import asyncio
+import logging
+import time
+import zlib
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+
+from sqlalchemy import text
+
+from app.core.database import engine
+
+logger = logging.getLogger('uvicorn.error')
+
+
+@dataclass
+class JobStats:
+    runs: int = 0
+    failures: int = 0
+    skipped_not_leader: int = 0
+    last_started_at: float | None = None
+    last_duration_ms: float | None = None
+    last_result: dict = field(default_factory=dict)
+
+
+@dataclass
+class PeriodicJob:
+    name: str
+    interval: float
+    func: Callable[[], Awaitable[dict]]
+    # True ise birden fazla worker varsa sadece leader lock'u alan worker çalıştırır.
+    leader_only: bool = True
+    stats: JobStats = field(default_factory=JobStats)
+
+
+class LeaderLock:
+    """
+    PostgreSQL session-level advisory lock ile process'ler arası leader seçimi. Lock'u alan worker onu
+    kendine ayrılmış bir bağlantıda process boyunca tutar; diğerleri her denemede reddedilir. Bağlantı
+    koparsa (ya da leader worker kapanırsa) lock PostgreSQL tarafından bırakılır ve bir sonraki denemede
+    başka bir worker alır. SQLite'ta (tek process geliştirme ortamı) her zaman leader sayılır.
+    """
+
+    def __init__(self, name: str, bind=None):
+        self.key = zlib.crc32(name.encode())
+        self._bind = bind if bind is not None else engine
+        self._conn = None
+        self._mutex = asyncio.Lock()
+
+    async def is_leader(self) -> bool:
+        if self._bind.dialect.name != "postgresql":
+            return True
+        async with self._mutex:
+            if self._conn is not None:
+                try:
+                    await self._conn.execute(text("SELECT 1"))
+                    return True
+                except Exception as e:
+                    logger.warning(f"Leader lock connection lost, re-acquiring: {e}")
+                    await self._discard()
+            return await self._try_acquire()
+
+    async def _try_acquire(self) -> bool:
+        conn = await self._bind.connect()
+        try:
+            # Boşta bekleyen açık transaction kalmasın (idle_in_transaction_session_timeout); lock
+            # transaction'a değil session'a bağlı.
+            await conn.execution_options(isolation_level="AUTOCOMMIT")
+            acquired = (await conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": self.key})).scalar()
+        except Exception:
+            await conn.close()
+            raise
+        if not acquired:
+            await conn.close()
+            return False
+        self._conn = conn
+        return True
+
+    async def _discard(self) -> None:
+        # Lock tutan bağlantı havuza geri dönmesin; kapanınca kilit de bırakılır.
+        conn, self._conn = self._conn, None
+        try:
+            await conn.invalidate()
+            await conn.close()
+        except Exception:
+            pass
+
+    async def release(self) -> None:
+        """ Kapanışta çağrılır; leader'lık bir sonraki denemede diğer worker'lara geçer. """
+        async with self._mutex:
+            if self._conn is None:
+                return
+            try:
+                await self._conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": self.key})
+                await self._conn.close()
+                self._conn = None
+            except Exception:
+                await self._discard()
+
+
+class Scheduler:
+    """
+    Uygulama ile aynı event loop'ta çalışan basit periyodik iş zamanlayıcısı.
+    main.py'deki lifespan içinde başlatılır ve durdurulur.
+    """
+
+    def __init__(self, leader: LeaderLock | None = None):
+        self.jobs: dict[str, PeriodicJob] = {}
+        self._tasks: list[asyncio.Task] = []
+        # leader_only işlerin hepsi aynı lock'u paylaşır: process başına tek ayrılmış bağlantı.
+        self.leader = leader if leader is not None else LeaderLock("scheduler:leader")
+
+    def add_job(self, name: str, interval: float, func: Callable[[], Awaitable[dict]], leader_only: bool = True) -> None:
+        self.jobs[name] = PeriodicJob(name=name, interval=interval, func=func, leader_only=leader_only)
+
+    def start(self) -> None:
+        for job in self.jobs.values():
+            self._tasks.append(asyncio.create_task(self._loop(job), name=f"scheduler:{job.name}"))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        await self.leader.release()
+
+    async def run_job(self, job: PeriodicJob) -> None:
+        if job.leader_only and not await self.leader.is_leader():
+            job.stats.skipped_not_leader += 1
+            return
+        job.stats.last_started_at = time.time()
+        started = time.perf_counter()
+        try:
+            job.stats.last_result = await job.func() or {}
+            job.stats.runs += 1
+        except Exception as e:
+            job.stats.failures += 1
+            logger.error(f"Scheduled job {job.name} failed: {e}")
+        finally:
+            job.stats.last_duration_ms = (time.perf_counter() - started) * 1000
+        logger.info(f"Scheduled job {job.name} finished in {job.stats.last_duration_ms:.1f} ms: {job.stats.last_result}")
+
+    async def _loop(self, job: PeriodicJob) -> None:
+        while True:
+            try:
+                await self.run_job(job)
+            except Exception as e: # ör. leader lock için DB'ye bağlanılamadı
+                job.stats.failures += 1
+                logger.error(f"Scheduled job {job.name} could not run: {e}")
+            await asyncio.sleep(job.interval)
+
+    def stats(self) -> dict:
+        return {name: job.stats for name, job in self.jobs.items()}
+
+
+scheduler = Scheduler()
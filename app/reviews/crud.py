@@ -1,12 +1,16 @@
-from typing import List, Optional
+from datetime import datetime
+from typing import List, Optional, Tuple
 
-from sqlalchemy.orm import Session
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.business.cards import REVIEW_COLUMNS, count_card_review
+from app.business.models import BranchCard
 from app.reviews.models import Review
 from app.reviews.schemas import ReviewCreateSchema, ReviewUpdateSchema
 
 
-def create_review(db: Session, review_data: ReviewCreateSchema, user_id: int) -> Review:
+async def create_review(db: AsyncSession, review_data: ReviewCreateSchema, user_id: int) -> Review:
     """
     Creates a new review in the database.
     All reviews with a status for moderation (in dev all 'approved')
@@ -20,59 +24,101 @@ def create_review(db: Session, review_data: ReviewCreateSchema, user_id: int) ->
         status='approved'  # Default status for new reviews
     )
     db.add(db_review)
-    db.commit()
-    db.refresh(db_review)
+    if db_review.status == 'approved':
+        # Şube kartının yorum sayaçları aynı transaction'da (created_at flush'ta dolar).
+        await db.flush()
+        await count_card_review(db, db_review, 1)
+    await db.commit()
+    await db.refresh(db_review)
     return db_review
 
 
-def get_reviews_by_branch_id(db: Session, branch_id: int) -> List[Review]:
+def _newest_first(query, limit: int, after: Optional[Tuple[datetime, int]]):
     """
-    Retrieves all 'approved' reviews for a specific branch, newest first.
+    (created_at, id) sırasıyla yeniden eskiye, en fazla limit yorum. after önceki sayfanın son
+    yorumudur; (branch_id | user_id, ..., created_at, id) index'leri her sayfayı aralık taramasına indirir.
+    """
+    if after is not None:
+        query = query.where(tuple_(Review.created_at, Review.id) < tuple_(*after))
+    return query.order_by(Review.created_at.desc(), Review.id.desc()).limit(limit)
+
+
+async def get_reviews_by_branch_id(db: AsyncSession, branch_id: int, limit: int,
+                                   after: Optional[Tuple[datetime, int]] = None) -> List[Review]:
+    """
+    Retrieves 'approved' reviews for a specific branch, newest first, one page at a time.
     for public view
     """
-    return (
-        db.query(Review)
-        .filter(Review.branch_id == branch_id, Review.status == 'approved')
-        .order_by(Review.created_at.desc())
-        .all()
-    )
+    result = await db.execute(_newest_first(
+        select(Review).where(Review.branch_id == branch_id, Review.status == 'approved'), limit, after
+    ))
+    return result.scalars().all()
 
 
-def get_reviews_by_user_id(db: Session, user_id: int) -> List[Review]:
+async def get_branch_review_count(db: AsyncSession, branch_id: int) -> int:
     """
-    Retrieves all reviews written by a specific user, newest first.
+    Number of approved reviews of a branch, read from its branch_card counter instead of COUNT(*).
+    0 for branches without a card (inactive or unknown).
     """
-    return (
-        db.query(Review)
-        .filter(Review.user_id == user_id)
-        .order_by(Review.created_at.desc())
-        .all()
+    result = await db.execute(select(BranchCard.review_count).where(BranchCard.branch_id == branch_id))
+    return result.scalar() or 0
+
+
+async def get_branch_review_stats(db: AsyncSession, branch_id: int):
+    """
+    The approved-review counters (REVIEW_COLUMNS) of a branch's card, or None if the branch has no card.
+    """
+    result = await db.execute(
+        select(*(getattr(BranchCard, name) for name in REVIEW_COLUMNS)).where(BranchCard.branch_id == branch_id)
     )
+    return result.first()
+
+
+async def get_reviews_by_user_id(db: AsyncSession, user_id: int, limit: int,
+                                 after: Optional[Tuple[datetime, int]] = None) -> List[Review]:
+    """
+    Retrieves reviews written by a specific user, newest first, one page at a time.
+    """
+    result = await db.execute(_newest_first(
+        select(Review).where(Review.user_id == user_id), limit, after
+    ))
+    return result.scalars().all()
 
-def get_review_by_id(db: Session, review_id: int) -> Optional[Review]:
+async def get_review_by_id(db: AsyncSession, review_id: int) -> Optional[Review]:
     """
     Retrieves a single review by its ID.
     """
-    return db.query(Review).filter(Review.id == review_id).first()
+    result = await db.execute(select(Review).where(Review.id == review_id))
+    return result.scalars().first()
 
 
-def update_review(db: Session, review: Review, update_data: ReviewUpdateSchema) -> Review:
+async def update_review(db: AsyncSession, review: Review, update_data: ReviewUpdateSchema) -> Review:
     """
     Updates a review's rating and/or comment in the database.
     The 'updated_at' timestamp will be handled automatically by the model.
     """
     update_dict = update_data.model_dump(exclude_unset=True)
+    counted_before = review.rating if review.status == 'approved' else None
     for key, value in update_dict.items():
         setattr(review, key, value)
-    db.commit()
-    db.refresh(review)
+    counted_after = review.rating if review.status == 'approved' else None
+    # Şube kartının sayaçları: önceki hali sayımdan çıkar, yeni hali girer (aynı transaction).
+    if counted_before != counted_after:
+        if counted_before is not None:
+            await count_card_review(db, review, -1, counted_before)
+        if counted_after is not None:
+            await count_card_review(db, review, 1, counted_after)
+    await db.commit()
+    await db.refresh(review)
     return review
 
 
-def delete_review(db: Session, review: Review) -> None:
+async def delete_review(db: AsyncSession, review: Review) -> None:
     """
     Deletes a review from the database.
     """
-    db.delete(review)
-    db.commit()
+    if review.status == 'approved':
+        await count_card_review(db, review, -1)
+    await db.delete(review)
+    await db.commit()
     return
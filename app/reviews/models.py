@@ -1,6 +1,6 @@
 from datetime import datetime, timezone
 
-from sqlalchemy import (Column, ForeignKey, Integer, String, DateTime,
+from sqlalchemy import (Column, ForeignKey, Index, Integer, String, DateTime,
                         Boolean, Text, SmallInteger)
 from sqlalchemy.orm import relationship, backref
 
@@ -11,16 +11,25 @@ class Review(Base):
     __tablename__ = 'reviews'
 
     id = Column(Integer, primary_key=True, index=True)
-    branch_id = Column(Integer, ForeignKey('branch.id', ondelete='CASCADE'), nullable=False, index=True)
-    user_id = Column(Integer, ForeignKey('users.userid', ondelete='CASCADE'), nullable=False, index=True)
+    # branch_id / user_id are the leading columns of the keyset indexes below, which also serve the FK lookups.
+    branch_id = Column(Integer, ForeignKey('branch.id', ondelete='CASCADE'), nullable=False)
+    user_id = Column(Integer, ForeignKey('users.userid', ondelete='CASCADE'), nullable=False)
 
-    rating = Column(SmallInteger, nullable=False, index=True)
+    rating = Column(SmallInteger, nullable=False)
     comment = Column(Text, nullable=True)
     is_anonymous = Column(Boolean, default=False, nullable=False)
     # Status for moderation: 'pending', 'approved', 'rejected'
-    status = Column(String(15), default='pending', nullable=False, index=True)
+    status = Column(String(15), default='pending', nullable=False)
     created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
     updated_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+
+    # Keyset pagination: each page of a branch's / user's reviews (newest first) is an index range scan.
+    # Counts and averages come from branch_card, so no other index is needed on this table.
+    __table_args__ = (
+        Index('ix_reviews_branch_id_status_created_at_id', 'branch_id', 'status', 'created_at', 'id'),
+        Index('ix_reviews_user_id_created_at_id', 'user_id', 'created_at', 'id'),
+    )
+
     # Relationships
     # The user who wrote the review. A backref creates the 'reviews' collection on the User model.
     user = relationship("User", backref=backref("reviews", cascade="all, delete-orphan"))
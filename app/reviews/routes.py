@@ -1,16 +1,18 @@
 import logging
+from typing import Optional
 
-from fastapi import APIRouter, Depends, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.auth.models import User
 from app.auth.service import get_current_user
 from app.core.database import get_db
+from app.core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 from app.reviews import service
 from app.reviews.schemas import (
     ReviewCreateSchema,
     CustomReviewResponse,
-    CustomReviewListResponse, CustomSuccessResponse, ReviewUpdateSchema
+    CustomReviewListResponse, CustomReviewSummaryResponse, CustomSuccessResponse, ReviewUpdateSchema
 )
 
 logger = logging.getLogger('uvicorn.error')
@@ -18,13 +20,13 @@ reviews_router = APIRouter(prefix="/reviews", tags=["Reviews"])
 
 
 @reviews_router.post("/new", response_model=CustomReviewResponse, status_code=status.HTTP_201_CREATED)
-def create_review_endpoint(review_data: ReviewCreateSchema, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def create_review_endpoint(review_data: ReviewCreateSchema, db: AsyncSession = Depends(get_db), current_user: User = Depends(get_current_user)):
     """
     Create a new review for a business branch.
     - Requires authentication.
     - The new review will be 'pending' until approved.
     """
-    new_review = service.create_new_review(db, review_data, current_user)
+    new_review = await service.create_new_review(db, review_data, current_user)
     return {
         "success": True,
         "message": "Review submitted, pending approval.",
@@ -33,37 +35,61 @@ def create_review_endpoint(review_data: ReviewCreateSchema, db: Session = Depend
 
 
 @reviews_router.get("/branch/{branch_id}", response_model=CustomReviewListResponse)
-def get_reviews_for_branch_endpoint(branch_id: int, db: Session = Depends(get_db)):
+async def get_reviews_for_branch_endpoint(branch_id: int, limit: int = Query(DEFAULT_PAGE_SIZE, gt=0, le=MAX_PAGE_SIZE),
+                                          cursor: Optional[str] = None, db: AsyncSession = Depends(get_db)):
     """
-    Get all approved reviews for a specific branch.
+    Get approved reviews for a specific branch, newest first.
     - This is a public endpoint and does not require authentication.
+    - Pass the previous response's next_cursor as cursor to load more.
+    - total is the number of approved reviews of the branch across all pages.
     """
-    reviews = service.get_all_reviews_for_branch(db, branch_id)
+    reviews, next_cursor = await service.get_all_reviews_for_branch(db, branch_id, limit, cursor)
+    total = await service.get_branch_review_total(db, branch_id)
     return {
         "success": True,
         "message": "Reviews retrieved successfully",
-        "reviews": reviews
+        "reviews": reviews,
+        "next_cursor": next_cursor,
+        "total": total
+    }
+
+
+@reviews_router.get("/branch/{branch_id}/summary", response_model=CustomReviewSummaryResponse)
+async def get_review_summary_for_branch_endpoint(branch_id: int, db: AsyncSession = Depends(get_db)):
+    """
+    Get the review count, average rating and per-star histogram of a branch.
+    - This is a public endpoint and does not require authentication.
+    - Served from precomputed counters; the reviews themselves are not read.
+    """
+    summary = await service.get_branch_rating_summary(db, branch_id)
+    return {
+        "success": True,
+        "message": "Review summary retrieved successfully",
+        "summary": summary
     }
 
 
 @reviews_router.get("/me", response_model=CustomReviewListResponse)
-def get_my_reviews_endpoint(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def get_my_reviews_endpoint(limit: int = Query(DEFAULT_PAGE_SIZE, gt=0, le=MAX_PAGE_SIZE),
+                                  cursor: Optional[str] = None, db: AsyncSession = Depends(get_db),
+                                  current_user: User = Depends(get_current_user)):
     """
-    Get all reviews written by the currently logged-in user.
+    Get reviews written by the currently logged-in user, newest first.
     Requires auth
     """
-    reviews = service.get_my_reviews(db, current_user)
+    reviews, next_cursor = await service.get_my_reviews(db, current_user, limit, cursor)
     return {
         "success": True,
         "message": "reviews retrieved successfully",
-        "reviews": reviews
+        "reviews": reviews,
+        "next_cursor": next_cursor
     }
 
 @reviews_router.put("/{review_id}", response_model=CustomReviewResponse)
-def update_review_endpoint(
+async def update_review_endpoint(
     review_id: int,
     review_data: ReviewUpdateSchema,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -71,7 +97,7 @@ def update_review_endpoint(
     - Requires authentication.
     - User can only update their own reviews.
     """
-    updated_review = service.update_user_review(db, review_id, review_data, current_user)
+    updated_review = await service.update_user_review(db, review_id, review_data, current_user)
     return {
         "success": True,
         "message": "Review updated successfully.",
@@ -80,9 +106,9 @@ def update_review_endpoint(
 
 
 @reviews_router.delete("/{review_id}", response_model=CustomSuccessResponse)
-def delete_review_endpoint(
+async def delete_review_endpoint(
     review_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -90,7 +116,7 @@ def delete_review_endpoint(
     - Requires authentication.
     - User can only delete their own reviews.
     """
-    service.delete_user_review(db, review_id, current_user)
+    await service.delete_user_review(db, review_id, current_user)
     return {
         "success": True,
         "message": "Review deleted successfully."
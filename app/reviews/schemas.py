@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Optional, List
+from typing import Dict, Optional, List
 
 from pydantic import BaseModel, ConfigDict, Field
 
@@ -36,6 +36,26 @@ class CustomReviewListResponse(BaseModel):
     success: bool
     message: str
     reviews: List[ReviewResponseSchema] = []
+    next_cursor: Optional[str] = None
+    # Only on /reviews/branch/{id}: approved reviews of the branch across all pages.
+    total: Optional[int] = None
+
+class ReviewSummarySchema(BaseModel):
+    """
+    Approved-review statistics of a branch, read from its precomputed counters.
+    """
+    branch_id: int
+    review_count: int = 0
+    average_rating: Optional[float] = None  # None when the branch has no reviews
+    rating_histogram: Dict[int, int] = {}  # star (1-5) -> number of reviews
+    last_review_at: Optional[datetime] = None
+
+
+class CustomReviewSummaryResponse(BaseModel):
+    success: bool
+    message: str
+    summary: Optional[ReviewSummarySchema] = None
+
 
 class ReviewUpdateSchema(BaseModel):
     """
@@ -1,11 +1,15 @@
-from typing import List
+from datetime import datetime
+from typing import List, Optional, Tuple
 import logging
 
 from fastapi import HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
 from app.auth.models import User
+from app.business.autocomplete import count_branch_review
+from app.business.cards import RATINGS
+from app.core.pagination import decode_cursor, split_page
 from app.reviews import crud
 from app.reviews.models import Review
 from app.reviews.schemas import ReviewCreateSchema, ReviewUpdateSchema
@@ -13,30 +17,47 @@ from app.reviews.schemas import ReviewCreateSchema, ReviewUpdateSchema
 logger = logging.getLogger('uvicorn.error')
 
 
-def create_new_review(db: Session, review_data: ReviewCreateSchema, current_user: User) -> Review:
+async def create_new_review(db: AsyncSession, review_data: ReviewCreateSchema, current_user: User) -> Review:
     """
     Business logic for creating a new review.
     """
     try:
         # Here you could add more logic in the future, like checking if the
         # user has visited the branch before allowing a review.
-        review = crud.create_review(db, review_data, current_user.userid)
+        review = await crud.create_review(db, review_data, current_user.userid)
+        if review.status == 'approved':
+            count_branch_review(review.branch_id, 1)
         return review
     except Exception as e:
         logger.error(f"Error creating review: {e}")
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="An error occurred while creating the review."
         )
 
 
-def get_all_reviews_for_branch(db: Session, branch_id: int) -> List[Review]:
+def _decode_review_cursor(cursor: Optional[str]) -> Optional[Tuple[datetime, int]]:
+    """ Yorum listelerinin cursor'ı önceki sayfanın son (created_at, id) değerini taşır. """
+    if not cursor:
+        return None
+    created_at, review_id = decode_cursor(cursor, datetime.fromisoformat, int)
+    return created_at, review_id
+
+
+def _review_page(reviews: List[Review], limit: int) -> Tuple[List[Review], Optional[str]]:
+    return split_page(reviews, limit, lambda review: [review.created_at.isoformat(), review.id])
+
+
+async def get_all_reviews_for_branch(db: AsyncSession, branch_id: int, limit: int,
+                                     cursor: Optional[str] = None) -> Tuple[List[Review], Optional[str]]:
     """
     Business logic for fetching reviews for a specific branch.
+    Returns one page of reviews and the cursor of the next page.
     """
+    after = _decode_review_cursor(cursor)
     try:
-        return crud.get_reviews_by_branch_id(db, branch_id)
+        return _review_page(await crud.get_reviews_by_branch_id(db, branch_id, limit + 1, after), limit)
     except Exception as e:
         logger.error(f"Error fetching reviews for branch {branch_id}: {e}")
         raise HTTPException(
@@ -45,12 +66,53 @@ def get_all_reviews_for_branch(db: Session, branch_id: int) -> List[Review]:
         )
 
 
-def get_my_reviews(db: Session, current_user: User) -> List[Review]:
+async def get_branch_review_total(db: AsyncSession, branch_id: int) -> int:
+    """
+    Total number of approved reviews of a branch for the list header; a primary key lookup on the
+    branch card, so it costs the same for every page.
+    """
+    try:
+        return await crud.get_branch_review_count(db, branch_id)
+    except Exception as e:
+        logger.error(f"Error counting reviews for branch {branch_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An error occurred while fetching reviews."
+        )
+
+
+async def get_branch_rating_summary(db: AsyncSession, branch_id: int) -> dict:
+    """
+    Count, average and per-star histogram of a branch's approved reviews. Read from the branch card
+    counters that review writes keep up to date, so the cost does not grow with the number of reviews.
+    """
+    try:
+        stats = await crud.get_branch_review_stats(db, branch_id)
+    except Exception as e:
+        logger.error(f"Error fetching review summary for branch {branch_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An error occurred while fetching the review summary."
+        )
+    if stats is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Branch not found.")
+    return {
+        "branch_id": branch_id,
+        "review_count": stats.review_count,
+        "average_rating": stats.rating_sum / stats.review_count if stats.review_count else None,
+        "rating_histogram": {rating: getattr(stats, f"rating_{rating}") for rating in RATINGS},
+        "last_review_at": stats.last_review_at,
+    }
+
+
+async def get_my_reviews(db: AsyncSession, current_user: User, limit: int,
+                         cursor: Optional[str] = None) -> Tuple[List[Review], Optional[str]]:
     """
-    Business logic for fetching all reviews written by the current user.
+    Business logic for fetching reviews written by the current user, one page at a time.
     """
+    after = _decode_review_cursor(cursor)
     try:
-        return crud.get_reviews_by_user_id(db, current_user.userid)
+        return _review_page(await crud.get_reviews_by_user_id(db, current_user.userid, limit + 1, after), limit)
     except Exception as e:
         logger.error(f"Error fetching reviews for user {current_user.userid}: {e}")
         raise HTTPException(
@@ -58,11 +120,11 @@ def get_my_reviews(db: Session, current_user: User) -> List[Review]:
             detail="An error occurred while fetching your reviews."
         )
 
-def update_user_review(db: Session, review_id: int, review_data: ReviewUpdateSchema, current_user: User) -> Review:
+async def update_user_review(db: AsyncSession, review_id: int, review_data: ReviewUpdateSchema, current_user: User) -> Review:
     """
     Business logic for updating a review. Ensures the user owns the review.
     """
-    review = crud.get_review_by_id(db, review_id)
+    review = await crud.get_review_by_id(db, review_id)
 
     if not review:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Review not found.")
@@ -72,21 +134,21 @@ def update_user_review(db: Session, review_id: int, review_data: ReviewUpdateSch
                             detail="You do not have permission to edit this review.")
 
     try:
-        return crud.update_review(db, review, review_data)
+        return await crud.update_review(db, review, review_data)
     except Exception as e:
         logger.error(f"Error updating review {review_id}: {e}")
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="An error occurred while updating the review."
         )
 
 
-def delete_user_review(db: Session, review_id: int, current_user: User) -> None:
+async def delete_user_review(db: AsyncSession, review_id: int, current_user: User) -> None:
     """
     Business logic for deleting a review. Ensures the user owns the review.
     """
-    review = crud.get_review_by_id(db, review_id)
+    review = await crud.get_review_by_id(db, review_id)
 
     if not review:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Review not found.")
@@ -96,11 +158,14 @@ def delete_user_review(db: Session, review_id: int, current_user: User) -> None:
                             detail="You do not have permission to delete this review.")
 
     try:
-        crud.delete_review(db, review)
+        approved = review.status == 'approved'
+        await crud.delete_review(db, review)
+        if approved:
+            count_branch_review(review.branch_id, -1)
         return
     except Exception as e:
         logger.error(f"Error deleting review {review_id}: {e}")
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="An error occurred while deleting the review."
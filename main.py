@@ -7,19 +7,57 @@ from starlette.middleware.cors import CORSMiddleware
 from starlette.responses import RedirectResponse
 from uvicorn.middleware.proxy_headers import ProxyHeadersMiddleware
 
-from app.core.database import engine, Base
+from app.core.database import engine, Base, create_tables
 from app.auth.routes import auth_router
-from app.core.limiter import limiter
+from app.auth.hashing import password_hasher
+from app.auth.maintenance import sweep_expired_auth_rows, sync_revocation_list, sync_login_throttle, MAINTENANCE_INTERVAL_SECONDS
+from app.auth.outbox import drain_outbox, OUTBOX_POLL_SECONDS
+from app.auth.revocation import REVOCATION_SYNC_SECONDS
+from app.auth.security import SESSION_TOKEN_MODE
+from app.auth.throttle import THROTTLE_SHARED, THROTTLE_SYNC_SECONDS
+from app.core.scheduler import scheduler
+from app.core.limiter import limiter, uses_shared_storage, flush_rate_limit_counters
+from app.core.rate_limit import purge_expired_counters, RATE_LIMIT_FLUSH_SECONDS
+from app.auth.middleware import IdentityMiddleware
 
 from app.business.routes import business_router
+from app.business.cards import reconcile_branch_cards, CARD_RECONCILE_SECONDS
+from app.business.spatial import SPATIAL_INDEX_ENABLED, SPATIAL_INDEX_REFRESH_SECONDS, refresh_spatial_index
+from app.business.autocomplete import AUTOCOMPLETE_INDEX_ENABLED, AUTOCOMPLETE_REFRESH_SECONDS, refresh_autocomplete_index
 from app.reviews.routes import reviews_router
 
 
 @asynccontextmanager
 async def lifespan(app_instance: FastAPI):
-    #Base.metadata.drop_all(bind=engine)
-    Base.metadata.create_all(bind=engine)
+    async with engine.begin() as conn:
+        #await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(create_tables)
+    scheduler.add_job("sweep_expired_auth_rows", MAINTENANCE_INTERVAL_SECONDS, sweep_expired_auth_rows)
+    scheduler.add_job("drain_email_outbox", OUTBOX_POLL_SECONDS, drain_outbox)
+    if engine.dialect.name == "postgresql":
+        # branch_card (Geography kolonu) SQLite'ta oluşturulmaz; düzeltilecek kart yok.
+        scheduler.add_job("reconcile_branch_cards", CARD_RECONCILE_SECONDS, reconcile_branch_cards)
+    if SESSION_TOKEN_MODE == "signed":
+        # Her worker kendi iptal listesini tutar, bu yüzden leader lock gerekmez.
+        scheduler.add_job("sync_revocation_list", REVOCATION_SYNC_SECONDS, sync_revocation_list, leader_only=False)
+    if THROTTLE_SHARED:
+        scheduler.add_job("sync_login_throttle", THROTTLE_SYNC_SECONDS, sync_login_throttle, leader_only=False)
+    if uses_shared_storage():
+        # Her worker kendi biriken sayaçlarını yazar; süresi dolanları tek worker temizler.
+        scheduler.add_job("flush_rate_limit_counters", RATE_LIMIT_FLUSH_SECONDS, flush_rate_limit_counters, leader_only=False)
+        scheduler.add_job("purge_rate_limit_counters", MAINTENANCE_INTERVAL_SECONDS, purge_expired_counters)
+    if SPATIAL_INDEX_ENABLED:
+        # İlk çalıştırma index'i doldurur; o zamana kadar sorgular PostGIS'e gider.
+        scheduler.add_job("refresh_spatial_index", SPATIAL_INDEX_REFRESH_SECONDS, refresh_spatial_index, leader_only=False)
+    if AUTOCOMPLETE_INDEX_ENABLED:
+        # Aynı şekilde ilk yükleme bitene kadar öneriler arama sorgusundan gelir.
+        scheduler.add_job("refresh_autocomplete_index", AUTOCOMPLETE_REFRESH_SECONDS, refresh_autocomplete_index,
+                          leader_only=False)
+    scheduler.start()
     yield
+    await scheduler.stop()
+    password_hasher.shutdown()
+    await engine.dispose()
 
 app = FastAPI(lifespan=lifespan)
 
@@ -43,8 +81,10 @@ app.add_middleware(
 
 app.state.limiter = limiter
 
-app.add_middleware(ProxyHeadersMiddleware, trusted_hosts="*")
+# Son eklenen en dışta çalışır: önce gerçek istemci IP'si, sonra kullanıcı kimliği, en son limit.
 app.add_middleware(SlowAPIMiddleware)
+app.add_middleware(IdentityMiddleware)
+app.add_middleware(ProxyHeadersMiddleware, trusted_hosts="*")
 
 @app.get("/", include_in_schema=False)
 def root_redirect():
@@ -8,6 +8,8 @@ from alembic import context
 from app.core.database import Base
 import app.auth.models
 import app.business.models
+import app.reviews.models
+import app.core.rate_limit
 
 
 # this is the Alembic Config object, which provides
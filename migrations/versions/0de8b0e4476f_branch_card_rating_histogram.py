@@ -0,0 +1,46 @@
+"""Add rating histogram and last review time to branch_card
+
+Revision ID: 0de8b0e4476f
+Revises: 60cc23f60c12
+Create Date: 2026-10-17 21:14:05.402117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0de8b0e4476f'
+down_revision: Union[str, None] = '60cc23f60c12'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+RATINGS = range(1, 6)
+
+
+def upgrade() -> None:
+    for rating in RATINGS:
+        op.add_column('branch_card', sa.Column(f'rating_{rating}', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('branch_card', sa.Column('last_review_at', sa.DateTime(timezone=True), nullable=True))
+
+    # Sayaçlar onaylı yorumlardan yeniden hesaplanır (app.business.cards.review_stats).
+    reviews = sa.table('reviews', sa.column('branch_id'), sa.column('rating'), sa.column('status'),
+                       sa.column('created_at'))
+    card = sa.table('branch_card', sa.column('branch_id'), sa.column('review_count'), sa.column('rating_sum'),
+                    *[sa.column(f'rating_{rating}') for rating in RATINGS], sa.column('last_review_at'))
+    approved = sa.and_(reviews.c.branch_id == card.c.branch_id, reviews.c.status == 'approved')
+    op.get_bind().execute(sa.update(card).values({
+        'review_count': sa.select(sa.func.count()).where(approved).scalar_subquery(),
+        'rating_sum': sa.select(sa.func.coalesce(sa.func.sum(reviews.c.rating), 0)).where(approved).scalar_subquery(),
+        **{f'rating_{rating}': sa.select(sa.func.count()).where(approved, reviews.c.rating == rating).scalar_subquery()
+           for rating in RATINGS},
+        'last_review_at': sa.select(sa.func.max(reviews.c.created_at)).where(approved).scalar_subquery(),
+    }))
+
+
+def downgrade() -> None:
+    op.drop_column('branch_card', 'last_review_at')
+    for rating in reversed(RATINGS):
+        op.drop_column('branch_card', f'rating_{rating}')
@@ -0,0 +1,32 @@
+"""Drop single-column review indexes covered by the keyset indexes
+
+Revision ID: 13d855bf19f2
+Revises: 0de8b0e4476f
+Create Date: 2026-10-17 21:52:44.760193
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '13d855bf19f2'
+down_revision: Union[str, None] = '0de8b0e4476f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = ['branch_id', 'user_id', 'rating', 'status']
+
+
+def upgrade() -> None:
+    # branch_id / user_id: (branch_id, status, created_at, id) ve (user_id, created_at, id) index'lerinin ilk
+    # kolonu. rating / status: tek başına seçici değil, sayılar branch_card'dan okunuyor.
+    for column in COLUMNS:
+        op.drop_index(op.f(f'ix_reviews_{column}'), table_name='reviews', if_exists=True)
+
+
+def downgrade() -> None:
+    for column in reversed(COLUMNS):
+        op.create_index(op.f(f'ix_reviews_{column}'), 'reviews', [column], unique=False)
@@ -0,0 +1,31 @@
+"""Keyset pagination indexes
+
+Revision ID: 292b31923958
+Revises: c94b1c274d71
+Create Date: 2026-10-17 16:48:19.527106
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '292b31923958'
+down_revision: Union[str, None] = 'c94b1c274d71'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_reviews_branch_id_status_created_at_id', 'reviews',
+                    ['branch_id', 'status', 'created_at', 'id'], unique=False)
+    op.create_index('ix_reviews_user_id_created_at_id', 'reviews', ['user_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_business_owner_id_id', 'business', ['owner_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_business_owner_id_id', table_name='business')
+    op.drop_index('ix_reviews_user_id_created_at_id', table_name='reviews')
+    op.drop_index('ix_reviews_branch_id_status_created_at_id', table_name='reviews')
@@ -0,0 +1,177 @@
+"""Add branch_card read table
+
+Revision ID: 60cc23f60c12
+Revises: d04b71126f2e
+Create Date: 2026-10-17 19:02:37.118204
+
+"""
+from collections import defaultdict
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from geoalchemy2 import Geography, Geometry
+
+
+# revision identifiers, used by Alembic.
+revision: str = '60cc23f60c12'
+down_revision: Union[str, None] = 'd04b71126f2e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+DAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+
+FTS_TRIGGERS = ('branch_search_au', 'branch_search_ad', 'branch_search_ai')
+
+
+def _fts(table: str, key: str) -> list[str]:
+    """ SQLite FTS5 arama tablosu ve tetikleyicileri, verilen tablo ve anahtar kolon için. """
+    return [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS branch_search USING fts5("
+        f"search_text, content='{table}', content_rowid='{key}', tokenize='trigram')",
+        f"CREATE TRIGGER IF NOT EXISTS branch_search_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO branch_search(rowid, search_text) VALUES (new.{key}, new.search_text); END",
+        f"CREATE TRIGGER IF NOT EXISTS branch_search_ad AFTER DELETE ON {table} BEGIN "
+        "INSERT INTO branch_search(branch_search, rowid, search_text) "
+        f"VALUES ('delete', old.{key}, old.search_text); END",
+        f"CREATE TRIGGER IF NOT EXISTS branch_search_au AFTER UPDATE OF search_text ON {table} BEGIN "
+        "INSERT INTO branch_search(branch_search, rowid, search_text) "
+        f"VALUES ('delete', old.{key}, old.search_text); "
+        f"INSERT INTO branch_search(rowid, search_text) VALUES (new.{key}, new.search_text); END",
+    ]
+
+
+def _drop_fts() -> None:
+    for trigger in FTS_TRIGGERS:
+        op.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+    op.execute('DROP TABLE IF EXISTS branch_search')
+
+
+def _time(value) -> str:
+    if isinstance(value, str): # SQLite TIME değerlerini metin olarak döner
+        return value[:8]
+    return value.strftime('%H:%M:%S')
+
+
+def _day(value) -> str:
+    return DAYS[int(value)] if str(value).isdigit() else str(value).lower()
+
+
+def _merged(intervals: list[tuple[int, int]]) -> list[list[int]]:
+    """ app.business.schedule.week_intervals'ın birleştirme adımı. """
+    merged: list[list[int]] = []
+    for start, end in sorted(interval for interval in intervals if interval[0] < interval[1]):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    postgresql = bind.dialect.name == 'postgresql'
+    op.create_table('branch_card',
+    sa.Column('branch_id', sa.Integer(), nullable=False),
+    sa.Column('business_id', sa.Integer(), nullable=False),
+    sa.Column('business_name', sa.String(length=50), nullable=True),
+    sa.Column('business_description', sa.String(length=255), nullable=True),
+    sa.Column('address_text', sa.String(length=255), nullable=True),
+    sa.Column('phone', sa.String(length=16), nullable=True),
+    sa.Column('location', Geography(geometry_type='POINT', srid=4326, spatial_index=False), nullable=True),
+    sa.Column('latitude', sa.Float(), nullable=True),
+    sa.Column('longitude', sa.Float(), nullable=True),
+    sa.Column('search_text', sa.Text(), server_default='', nullable=False),
+    sa.Column('opening_hours', sa.JSON(), nullable=False),
+    sa.Column('open_intervals', sa.JSON(), nullable=False),
+    sa.Column('review_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('rating_sum', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['branch_id'], ['branch.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('branch_id')
+    )
+    op.create_index('ix_branch_card_business_id', 'branch_card', ['business_id'], unique=False)
+
+    # Aramanın index'i şube tablosundan karta taşınır.
+    if postgresql:
+        op.create_index('idx_branch_card_location', 'branch_card', ['location'], unique=False,
+                        postgresql_using='gist')
+        op.drop_index('ix_branch_search_text_trgm', table_name='branch')
+        op.create_index('ix_branch_card_search_text_trgm', 'branch_card', ['search_text'], unique=False,
+                        postgresql_using='gin', postgresql_ops={'search_text': 'gin_trgm_ops'})
+    else:
+        _drop_fts()
+        op.drop_index('ix_branch_search_text_trgm', table_name='branch')
+        op.create_index('ix_branch_card_search_text_trgm', 'branch_card', ['search_text'], unique=False)
+        for statement in _fts('branch_card', 'branch_id'):
+            op.execute(statement)
+
+    # Kartlar: aktif işletmelerin aktif şubeleri, onaylı yorum sayaçlarıyla.
+    branch = sa.table('branch', sa.column('id'), sa.column('business_id'), sa.column('address_text'),
+                      sa.column('phone'), sa.column('location'), sa.column('is_active'),
+                      sa.column('search_text'), sa.column('created_at'))
+    business = sa.table('business', sa.column('id'), sa.column('name'), sa.column('description'),
+                        sa.column('is_active'))
+    reviews = sa.table('reviews', sa.column('branch_id'), sa.column('rating'), sa.column('status'))
+    card = sa.table('branch_card', *[sa.column(name) for name in (
+        'branch_id', 'business_id', 'business_name', 'business_description', 'address_text', 'phone', 'location',
+        'latitude', 'longitude', 'search_text', 'opening_hours', 'open_intervals', 'review_count', 'rating_sum',
+        'created_at')])
+    point = sa.cast(branch.c.location, Geometry(geometry_type='POINT', srid=4326))
+    approved = sa.and_(reviews.c.branch_id == branch.c.id, reviews.c.status == 'approved')
+    bind.execute(sa.insert(card).from_select(
+        [c.name for c in card.c],
+        sa.select(
+            branch.c.id, branch.c.business_id, business.c.name, business.c.description, branch.c.address_text,
+            branch.c.phone, branch.c.location, sa.func.ST_Y(point), sa.func.ST_X(point), branch.c.search_text,
+            sa.literal('[]'), sa.literal('[]'),
+            sa.select(sa.func.count()).where(approved).scalar_subquery(),
+            sa.select(sa.func.coalesce(sa.func.sum(reviews.c.rating), 0)).where(approved).scalar_subquery(),
+            branch.c.created_at
+        ).join(business, business.c.id == branch.c.business_id)
+        .where(branch.c.is_active == sa.true(), business.c.is_active == sa.true())
+    ))
+
+    # Derlenmiş saatler: API'deki liste opening_hours'tan, aralıklar branch_open_interval'dan.
+    opening_hours = sa.table('opening_hours', sa.column('id'), sa.column('branch_id'), sa.column('day_of_week'),
+                             sa.column('opens'), sa.column('closes'))
+    open_interval = sa.table('branch_open_interval', sa.column('branch_id'), sa.column('opens_at'),
+                             sa.column('closes_at'))
+    formatted, intervals = defaultdict(list), defaultdict(list)
+    for row in bind.execute(sa.select(opening_hours).order_by(opening_hours.c.id)):
+        formatted[row.branch_id].append(
+            {'day_of_week': _day(row.day_of_week), 'opens': _time(row.opens), 'closes': _time(row.closes)})
+    for row in bind.execute(sa.select(open_interval)):
+        intervals[row.branch_id].append((row.opens_at, row.closes_at))
+
+    json_card = sa.table('branch_card', sa.column('branch_id'),
+                         sa.column('opening_hours', sa.JSON()), sa.column('open_intervals', sa.JSON()))
+    update = sa.update(json_card).where(json_card.c.branch_id == sa.bindparam('b_id')).values(
+        opening_hours=sa.bindparam('b_hours'), open_intervals=sa.bindparam('b_intervals'))
+    rows = [
+        {'b_id': branch_id, 'b_hours': hours, 'b_intervals': _merged(intervals[branch_id])}
+        for branch_id, hours in formatted.items()
+    ]
+    for start in range(0, len(rows), BATCH_SIZE):
+        bind.execute(update, rows[start:start + BATCH_SIZE])
+
+    if not postgresql:
+        op.execute("INSERT INTO branch_search(branch_search) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_index('ix_branch_card_search_text_trgm', table_name='branch_card')
+        op.drop_index('idx_branch_card_location', table_name='branch_card')
+        op.create_index('ix_branch_search_text_trgm', 'branch', ['search_text'], unique=False,
+                        postgresql_using='gin', postgresql_ops={'search_text': 'gin_trgm_ops'})
+    else:
+        _drop_fts()
+        op.drop_index('ix_branch_card_search_text_trgm', table_name='branch_card')
+        op.create_index('ix_branch_search_text_trgm', 'branch', ['search_text'], unique=False)
+        for statement in _fts('branch', 'id'):
+            op.execute(statement)
+        op.execute("INSERT INTO branch_search(branch_search) VALUES ('rebuild')")
+    op.drop_index('ix_branch_card_business_id', table_name='branch_card')
+    op.drop_table('branch_card')
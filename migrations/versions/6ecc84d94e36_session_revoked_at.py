@@ -0,0 +1,26 @@
+"""Session revoked_at for signed token revocation
+
+Revision ID: 6ecc84d94e36
+Revises: f7461836fe0f
+Create Date: 2026-10-17 10:12:41.503118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6ecc84d94e36'
+down_revision: Union[str, None] = 'f7461836fe0f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('session', sa.Column('revoked_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('session', 'revoked_at')
@@ -0,0 +1,34 @@
+"""Add auth throttle table
+
+Revision ID: a5ff39e38595
+Revises: 9b167911426d
+Create Date: 2026-10-17 14:47:10.288431
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a5ff39e38595'
+down_revision: Union[str, None] = '9b167911426d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('auth_throttle',
+    sa.Column('key_hash', sa.LargeBinary(length=16), nullable=False),
+    sa.Column('failures', sa.Integer(), nullable=False),
+    sa.Column('last_failure_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('valid_until', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('key_hash')
+    )
+    op.create_index(op.f('ix_auth_throttle_valid_until'), 'auth_throttle', ['valid_until'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_auth_throttle_valid_until'), table_name='auth_throttle')
+    op.drop_table('auth_throttle')
@@ -0,0 +1,76 @@
+"""Add branch open interval table
+
+Revision ID: c94b1c274d71
+Revises: a5ff39e38595
+Create Date: 2026-10-17 16:05:42.913207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c94b1c274d71'
+down_revision: Union[str, None] = 'a5ff39e38595'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+DAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+SECONDS_PER_DAY = 24 * 60 * 60
+SECONDS_PER_WEEK = 7 * SECONDS_PER_DAY
+
+
+def _seconds(value) -> int:
+    if isinstance(value, str): # SQLite TIME değerlerini metin olarak döner
+        hours, minutes, seconds = value.split(':')
+        return int(hours) * 3600 + int(minutes) * 60 + int(float(seconds))
+    return value.hour * 3600 + value.minute * 60 + value.second
+
+
+def _intervals(day_of_week, opens, closes) -> list[tuple[int, int]]:
+    """ app.business.schedule.week_intervals'ın tek satırlık hali (birleştirme yapılmaz). """
+    day = int(day_of_week) if str(day_of_week).isdigit() else DAYS.index(str(day_of_week).lower())
+    day_start = day * SECONDS_PER_DAY
+    opens, closes = _seconds(opens), _seconds(closes)
+    if opens <= closes:
+        return [(day_start + opens, day_start + closes)] if opens < closes else []
+    end = day_start + SECONDS_PER_DAY + closes
+    if end <= SECONDS_PER_WEEK:
+        return [(day_start + opens, end)]
+    return [(day_start + opens, SECONDS_PER_WEEK), (0, end - SECONDS_PER_WEEK)]
+
+
+def upgrade() -> None:
+    op.create_table('branch_open_interval',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('branch_id', sa.Integer(), nullable=False),
+    sa.Column('opens_at', sa.Integer(), nullable=False),
+    sa.Column('closes_at', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['branch_id'], ['branch.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_branch_open_interval_branch_id_opens_at', 'branch_open_interval',
+                    ['branch_id', 'opens_at', 'closes_at'], unique=False)
+
+    # Mevcut çalışma saatlerinden doldur. Örtüşen aralıklar birleştirilmez; EXISTS için fark etmez,
+    # şube saatleri bir sonraki güncellemede birleştirilmiş haliyle yeniden yazılır.
+    opening_hours = sa.table('opening_hours',
+                             sa.column('branch_id'), sa.column('day_of_week'),
+                             sa.column('opens'), sa.column('closes'))
+    branch_open_interval = sa.table('branch_open_interval',
+                                    sa.column('branch_id'), sa.column('opens_at'), sa.column('closes_at'))
+    rows = op.get_bind().execute(sa.select(opening_hours)).all()
+    intervals = [
+        {'branch_id': row.branch_id, 'opens_at': opens_at, 'closes_at': closes_at}
+        for row in rows
+        for opens_at, closes_at in _intervals(row.day_of_week, row.opens, row.closes)
+    ]
+    if intervals:
+        op.bulk_insert(branch_open_interval, intervals)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_branch_open_interval_branch_id_opens_at', table_name='branch_open_interval')
+    op.drop_table('branch_open_interval')
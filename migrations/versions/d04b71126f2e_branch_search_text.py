@@ -0,0 +1,81 @@
+"""Add branch search text with trigram / FTS5 index
+
+Revision ID: d04b71126f2e
+Revises: 292b31923958
+Create Date: 2026-10-17 17:21:08.604113
+
+"""
+import re
+import unicodedata
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd04b71126f2e'
+down_revision: Union[str, None] = '292b31923958'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+_WORDS = re.compile(r"[^\W_]+")
+
+SQLITE_FTS = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS branch_search USING fts5("
+    "search_text, content='branch', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS branch_search_ai AFTER INSERT ON branch BEGIN "
+    "INSERT INTO branch_search(rowid, search_text) VALUES (new.id, new.search_text); END",
+    "CREATE TRIGGER IF NOT EXISTS branch_search_ad AFTER DELETE ON branch BEGIN "
+    "INSERT INTO branch_search(branch_search, rowid, search_text) VALUES ('delete', old.id, old.search_text); END",
+    "CREATE TRIGGER IF NOT EXISTS branch_search_au AFTER UPDATE OF search_text ON branch BEGIN "
+    "INSERT INTO branch_search(branch_search, rowid, search_text) VALUES ('delete', old.id, old.search_text); "
+    "INSERT INTO branch_search(rowid, search_text) VALUES (new.id, new.search_text); END",
+]
+
+
+def _search_text(business_name, address_text) -> str:
+    """ app.business.search.branch_search_text'in migration anındaki hali. """
+    value = f"{business_name or ''} {address_text or ''}"
+    value = value.replace("İ", "i").replace("I", "ı").lower().replace("ı", "i")
+    value = "".join(c for c in unicodedata.normalize("NFKD", value) if not unicodedata.combining(c))
+    return " ".join(_WORDS.findall(value))
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    op.add_column('branch', sa.Column('search_text', sa.Text(), server_default='', nullable=False))
+
+    branch = sa.table('branch', sa.column('id'), sa.column('business_id'),
+                      sa.column('address_text'), sa.column('search_text'))
+    business = sa.table('business', sa.column('id'), sa.column('name'))
+    rows = bind.execute(
+        sa.select(branch.c.id, business.c.name, branch.c.address_text)
+        .join(business, business.c.id == branch.c.business_id)
+    ).all()
+    update = sa.update(branch).where(branch.c.id == sa.bindparam('b_id')).values(search_text=sa.bindparam('b_text'))
+    for start in range(0, len(rows), BATCH_SIZE):
+        bind.execute(update, [
+            {'b_id': row.id, 'b_text': _search_text(row.name, row.address_text)}
+            for row in rows[start:start + BATCH_SIZE]
+        ])
+
+    if bind.dialect.name == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        op.create_index('ix_branch_search_text_trgm', 'branch', ['search_text'], unique=False,
+                        postgresql_using='gin', postgresql_ops={'search_text': 'gin_trgm_ops'})
+    else:
+        op.create_index('ix_branch_search_text_trgm', 'branch', ['search_text'], unique=False)
+        for statement in SQLITE_FTS:
+            op.execute(statement)
+        op.execute("INSERT INTO branch_search(branch_search) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        for trigger in ('branch_search_au', 'branch_search_ad', 'branch_search_ai'):
+            op.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+        op.execute('DROP TABLE IF EXISTS branch_search')
+    op.drop_index('ix_branch_search_text_trgm', table_name='branch')
+    op.drop_column('branch', 'search_text')
@@ -0,0 +1,30 @@
+"""Index valid_until on expiring auth tables
+
+Revision ID: d4843e07ec6b
+Revises: d949e51bd0c4
+Create Date: 2026-10-17 12:20:05.114372
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4843e07ec6b'
+down_revision: Union[str, None] = 'd949e51bd0c4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(op.f('ix_session_valid_until'), 'session', ['valid_until'], unique=False)
+    op.create_index(op.f('ix_recovery_code_valid_until'), 'recovery_code', ['valid_until'], unique=False)
+    op.create_index(op.f('ix_email_verification_code_valid_until'), 'email_verification_code', ['valid_until'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_email_verification_code_valid_until'), table_name='email_verification_code')
+    op.drop_index(op.f('ix_recovery_code_valid_until'), table_name='recovery_code')
+    op.drop_index(op.f('ix_session_valid_until'), table_name='session')
@@ -0,0 +1,37 @@
+"""Store sessions under SHA-256 token digest
+
+Revision ID: d949e51bd0c4
+Revises: 6ecc84d94e36
+Create Date: 2026-10-17 11:03:27.918240
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd949e51bd0c4'
+down_revision: Union[str, None] = '6ecc84d94e36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('session', sa.Column('token_hash', sa.LargeBinary(length=32), nullable=True))
+    # Mevcut token'lar özetlenir, böylece kimsenin oturumu kapanmaz. (sha256() PostgreSQL 11+)
+    op.execute("UPDATE session SET token_hash = sha256(convert_to(session_id, 'UTF8'))")
+    op.drop_constraint('session_pkey', 'session', type_='primary')
+    op.drop_column('session', 'session_id')
+    op.alter_column('session', 'token_hash', nullable=False)
+    op.create_primary_key('session_pkey', 'session', ['token_hash'])
+
+
+def downgrade() -> None:
+    # Özetten token geri elde edilemez; geri dönüşte tüm oturumlar kapatılır.
+    op.execute("DELETE FROM session")
+    op.drop_constraint('session_pkey', 'session', type_='primary')
+    op.drop_column('session', 'token_hash')
+    op.add_column('session', sa.Column('session_id', sa.String(length=255), nullable=False))
+    op.create_primary_key('session_pkey', 'session', ['session_id'])
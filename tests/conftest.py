@@ -1,34 +1,56 @@
+import os
+
+os.environ.setdefault("DB_URL", "sqlite:///./user.db")
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+os.environ.setdefault("POSTMARK_API_KEY", "POSTMARK_API_TEST")
+os.environ.setdefault("EMAIL_TRANSPORT", "memory")
+
 import pytest
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 from fastapi.testclient import TestClient
 
-from app.auth.routes import app
-from app.core.database import Base, get_db
+from main import app
+from app.core.database import Base, creatable_tables, get_db
+from app.core.scheduler import scheduler
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///./user.db"
+ASYNC_SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///./user.db"
 
+# Testlerdeki hazırlık/kontrol sorguları senkron, uygulama ise aynı dosyaya aiosqlite ile bağlanır.
 engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={'check_same_thread': False})
+# NullPool: her TestClient kendi event loop'unu açar, bağlantılar testler arasında açık kalıp dosyayı kilitlemesin.
+async_engine = create_async_engine(ASYNC_SQLALCHEMY_DATABASE_URL, poolclass=NullPool)
 
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncTestingSessionLocal = async_sessionmaker(bind=async_engine, class_=AsyncSession, autoflush=False,
+                                              expire_on_commit=False)
+
+# SQLite'ta SpatiaLite olmadan Geography kolonlu tablolar (branch, branch_card) oluşturulamaz; auth testleri
+# onlara dokunmaz. Konum sorguları kendi testlerinde SQL'i derlenerek doğrulanır.
+TEST_TABLES = creatable_tables(engine.dialect.name)
 
 @pytest.fixture()
 def db_session():
-    Base.metadata.create_all(bind=engine)
+    Base.metadata.create_all(bind=engine, tables=TEST_TABLES)
     db = TestingSessionLocal()
     try:
         yield db
     finally:
         db.close()
-        Base.metadata.drop_all(bind=engine)
+        Base.metadata.drop_all(bind=engine, tables=TEST_TABLES)
 
 @pytest.fixture()
-def client(db_session):
-    def override_get_db():
-        try:
-            yield db_session
-        finally:
-            pass  # db_session zaten yönetiliyor
+def client(db_session, monkeypatch):
+    # Arka plan görevleri (süre dolumu, outbox, index yenileme) aynı SQLite dosyasına yazıp testlerin
+    # tablolarını kilitlemesin; kendi testlerinde doğrudan çağrılırlar.
+    monkeypatch.setattr(scheduler, "start", lambda: None)
+
+    async def override_get_db():
+        async with AsyncTestingSessionLocal() as db:
+            yield db
 
     if not hasattr(app, 'dependency_overrides'):
         app.dependency_overrides = {}
@@ -45,7 +67,7 @@ def mock_email_sending(monkeypatch):
     """
     Tüm testler boyunca e-posta gönderimini otomatik olarak devre dışı bırakır.
 
-    Bu fixture, 'app.email.send_email' fonksiyonunu, hiçbir şey yapmayan
+    Bu fixture, 'app.auth.email.send_email' fonksiyonunu, hiçbir şey yapmayan
     ve hiçbir değer döndürmeyen sahte bir fonksiyonla değiştirir.
     `autouse=True` sayesinde her testten önce otomatik olarak çalışır.
     """
@@ -59,4 +81,4 @@ def mock_email_sending(monkeypatch):
         pass
 
     #gerçek send_email fonksiyonunu değiştir.
-    monkeypatch.setattr("app.email.send_email", fake_send_email)
\ No newline at end of file
+    monkeypatch.setattr("app.auth.email.send_email", fake_send_email)
@@ -1,5 +1,11 @@
+import hashlib
+
 import pytest
+from sqlalchemy import text
+
+from app.auth import service
 from app.auth.models import User
+from app.auth.revocation import revocation_list
 
 
 class TestDataFactory:
@@ -25,8 +31,11 @@ def user_data():
 @pytest.fixture
 def registered_user(client, user_data, db_session):
     """Veritabanına kaydedilmiş ama e-postası doğrulanmamış bir kullanıcı oluşturur."""
-    client.post("/register", json=user_data, params={"encrypted": False})
+    client.post("/auth/register", json=user_data, params={"encrypted": False})
     user = db_session.query(User).filter(User.email == user_data["email"]).first()
+    # Geliştirme ortamında kayıt e-postayı doğrulanmış işaretliyor; bu fixture doğrulanmamış kullanıcıyı temsil eder.
+    user.email_status = False
+    db_session.commit()
     return user
 
 @pytest.fixture
@@ -40,7 +49,7 @@ def verified_user(registered_user, db_session):
 def logged_in_user(client, verified_user):
     """Giriş yapmış bir kullanıcı ve oturum bilgisini döndürür."""
     login_data = {"email": verified_user.email, "password": "123456"}
-    response = client.post("/login", json=login_data)
+    response = client.post("/auth/login", json=login_data)
     return {"user": verified_user, "session": response.json()["session"]}
 
 
@@ -49,18 +58,23 @@ def logged_in_user(client, verified_user):
 class TestUserRegistration:
     """Kullanıcı kayıt (/register) endpoint'i ile ilgili testler."""
 
-    def test_register_user_successfully(self, client, user_data):
-        """Başarılı bir kullanıcı kaydının gerçekleştiğini doğrular."""
-        response = client.post("/register", json=user_data, params={"encrypted": "false"})
+    def test_register_user_successfully(self, client, user_data, db_session):
+        """Başarılı bir kullanıcı kaydının gerçekleştiğini ve doğrulama e-postasının outbox'a yazıldığını doğrular."""
+        response = client.post("/auth/register", json=user_data, params={"encrypted": "false"})
         assert response.status_code == 200
         data = response.json()
         assert data["success"] is True
         assert data["message"] == "Email Validation Required"
         assert data["user"]["email"] == user_data["email"]
 
+        code = db_session.execute(text("SELECT verification_code FROM email_verification_code")).scalar_one()
+        outbox = db_session.execute(text("SELECT dedupe_key, to_email, html_body, status FROM email_outbox")).one()
+        assert outbox.dedupe_key == f"verify:{data['user']['userid']}:{code}"
+        assert outbox.to_email == user_data["email"] and code in outbox.html_body and outbox.status == "pending"
+
     def test_register_with_existing_email_fails(self, client, registered_user, user_data):
         """Aynı e-posta ile tekrar kayıt olunamayacağını doğrular."""
-        response = client.post("/register", json=user_data, params={"encrypted": "false"})
+        response = client.post("/auth/register", json=user_data, params={"encrypted": "false"})
         assert response.status_code == 200
         data = response.json()
         assert data["success"] is False
@@ -80,7 +94,7 @@ class TestUserRegistration:
         # Test edilecek geçersiz veriyi ayarla
         user_data[field_to_invalidate] = invalid_value
 
-        response = client.post("/register", json=user_data, params={"encrypted": "false"})
+        response = client.post("/auth/register", json=user_data, params={"encrypted": "false"})
         data = response.json()
 
         assert response.status_code == 200
@@ -93,7 +107,7 @@ class TestUserLogin:
     def test_login_successfully(self, client, verified_user):
         """Doğrulanmış bir kullanıcının başarıyla giriş yapabildiğini test eder."""
         login_data = {"email": verified_user.email, "password": "123456"}
-        response = client.post("/login", json=login_data)
+        response = client.post("/auth/login", json=login_data)
         data = response.json()
         assert response.status_code == 200
         assert data["success"] is True
@@ -103,7 +117,7 @@ class TestUserLogin:
     def test_login_with_unverified_email_fails(self, client, registered_user):
         """E-postası doğrulanmamış bir kullanıcının giriş yapamadığını test eder."""
         login_data = {"email": registered_user.email, "password": "123456"}
-        response = client.post("/login", json=login_data)
+        response = client.post("/auth/login", json=login_data)
         data = response.json()
         assert response.status_code == 200
         assert data["success"] is False
@@ -112,8 +126,63 @@ class TestUserLogin:
     def test_login_with_wrong_password_fails(self, client, verified_user):
         """Yanlış şifre ile giriş yapılamadığını test eder."""
         login_data = {"email": verified_user.email, "password": "wrongpassword"}
-        response = client.post("/login", json=login_data)
+        response = client.post("/auth/login", json=login_data)
         data = response.json()
         assert response.status_code == 200
         assert data["success"] is False
         assert data["message"] == "Invalid credentials"
+
+
+class TestSessionStorage:
+    """Session'ların token'ın kendisi yerine SHA-256 özetiyle saklanması ile ilgili testler."""
+
+    def _session_rows(self, db_session):
+        db_session.expire_all()
+        return db_session.execute(text("SELECT token_hash, user_id, valid_until, revoked_at FROM session")).all()
+
+    def test_session_is_stored_under_digest(self, client, logged_in_user, db_session):
+        """Tabloda token'ın 32 byte'lık özeti bulunmalı, token'ın kendisi hiçbir kolonda olmamalı."""
+        token = logged_in_user["session"]["session_id"]
+        rows = self._session_rows(db_session)
+
+        assert len(rows) == 1
+        assert rows[0].token_hash == hashlib.sha256(token.encode()).digest()
+        assert token.encode() not in rows[0].token_hash and all(token not in str(value) for value in rows[0])
+
+        response = client.post("/auth/verify-session", json=logged_in_user["session"])
+        assert response.json()["success"] is True
+
+    def test_logout_deletes_session_by_digest(self, client, logged_in_user, db_session):
+        """Çıkış özetle bulunan satırı silmeli; aynı token ile ikinci çıkış başarısız olmalı."""
+        session = logged_in_user["session"]
+        logout = {"session_id": session["session_id"], "user_id": session["user_id"]}
+
+        assert client.post("/auth/logout", json=logout).json()["success"] is True
+        assert self._session_rows(db_session) == []
+        assert client.post("/auth/logout", json=logout).json()["message"] == "Session does not exist"
+
+    def test_signed_logout_revokes_row_by_digest(self, client, verified_user, db_session, monkeypatch):
+        """İmzalı token'la çıkışta özetle bulunan satır iptal edilmiş işaretlenmeli ve token iptal listesine girmeli."""
+        monkeypatch.setattr(service, "SESSION_TOKEN_MODE", "signed")
+        session = client.post("/auth/login", json={"email": verified_user.email, "password": "123456"}).json()["session"]
+        token = session["session_id"]
+
+        assert client.post("/auth/logout", json={"session_id": token, "user_id": session["user_id"]}).json()["success"]
+        rows = self._session_rows(db_session)
+        assert len(rows) == 1 and rows[0].token_hash == hashlib.sha256(token.encode()).digest()
+        assert rows[0].revoked_at is not None
+        assert revocation_list.is_revoked(token)
+
+    def test_deleted_user_signed_token_is_rejected(self, client, verified_user, db_session, monkeypatch):
+        """Kullanıcı silinince imzalı token'ı iptal edilmeli; satır revoked_at ile kalmalı, doğrulama reddetmeli."""
+        monkeypatch.setattr(service, "SESSION_TOKEN_MODE", "signed")
+        session = client.post("/auth/login", json={"email": verified_user.email, "password": "123456"}).json()["session"]
+        token = session["session_id"]
+
+        response = client.post("/auth/delete-user", params={"session": token}, headers={"Authorization": f"Bearer {token}"})
+        assert response.json()["success"] is True
+
+        assert revocation_list.is_revoked(token)
+        rows = self._session_rows(db_session)
+        assert len(rows) == 1 and rows[0].revoked_at is not None and rows[0].user_id is None
+        assert client.post("/auth/verify-session", json=session).json()["success"] is False
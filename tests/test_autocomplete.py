@@ -0,0 +1,51 @@
+from app.business.autocomplete import AutocompleteEntry, AutocompleteIndex
+
+
+def entry(branch_id, name, address, popularity=0, lat=41.0, lon=29.0):
+    return AutocompleteEntry(branch_id, branch_id, name, address, lat, lon, popularity)
+
+
+def ids(hits):
+    return [hit.branch_id for hit, _ in hits]
+
+
+class TestAutocompleteIndex:
+    """Bellek içi önek tamamlama index'i ile ilgili testler."""
+
+    def test_prefix_match_is_case_and_accent_insensitive(self):
+        """Her kelime bir önekle eşleşmeli; Türkçe büyük harf ve aksan farkı gözetilmemeli."""
+        index = AutocompleteIndex()
+        index.replace_all([entry(1, "Kahve Dünyası", "Kadıköy"), entry(2, "Kahve Evi", "Beşiktaş"),
+                           entry(3, "Simit Sarayı", "Kadıköy")])
+
+        assert ids(index.suggest("KAHVE", 10)) == [1, 2]
+        assert ids(index.suggest("kahve dun", 10)) == [1]
+        assert ids(index.suggest("KADIK", 10)) == [1, 3]
+        assert index.suggest("ka zz", 10) == []
+
+    def test_ranked_by_popularity_then_proximity(self):
+        """Popüler şube önde olmalı; konum verilince yakındaki az yorumlu şube öne geçebilmeli."""
+        index = AutocompleteIndex()
+        index.replace_all([entry(1, "Pide Salonu", None, popularity=3, lat=41.0, lon=29.0),
+                           entry(2, "Pideci", None, popularity=10, lat=40.0, lon=29.0)])
+
+        assert ids(index.suggest("pid", 10)) == [2, 1]
+        hits = index.suggest("pid", 10, lat=41.0, lon=29.0)
+        assert ids(hits) == [1, 2]
+        assert hits[0][1] == 0.0
+
+    def test_incremental_writes(self):
+        """Ekleme, güncelleme, silme ve yeni yorum index'e yeniden yükleme olmadan yansımalı."""
+        index = AutocompleteIndex()
+        index.replace_all([entry(1, "Börekçi", "Moda", popularity=5), entry(2, "Börek Evi", "Moda", popularity=1)])
+
+        index.upsert(entry(3, "Börek Dünyası", "Moda"))
+        index.upsert(entry(1, "Börekçi", "Bağdat Caddesi", popularity=5))
+        assert ids(index.suggest("borek", 10)) == [1, 2, 3]
+        assert ids(index.suggest("moda", 10)) == [2, 3]
+
+        for _ in range(10):
+            index.add_popularity(3, 1)
+        index.remove(2)
+        assert ids(index.suggest("bor", 10)) == [3, 1]
+        assert len(index._keys) == sum(len(e.tokens) for e in index._entries.values())
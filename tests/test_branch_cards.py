@@ -0,0 +1,184 @@
+import asyncio
+from datetime import datetime, time, timedelta, timezone
+
+from sqlalchemy import select, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from app.auth import service as auth_service
+from app.auth.models import SessionModel, User
+from app.auth.security import session_token_digest
+from app.business.cards import REVIEW_COLUMNS, count_card_review, reconcile_card_reviews, refresh_card_reviews, \
+    write_branch_cards
+from app.business.models import BranchCard, DayOfWeekEnum, OpeningHour
+from app.business.schedule import SECONDS_PER_DAY, card_schedule
+from app.business.service import _calculate_is_open_and_format_branch
+from app.reviews.models import Review, ReviewResponse
+
+
+class RecordingSession:
+    """ Çalıştırılan ifadeleri PostgreSQL SQL'i ve parametreleriyle saklar. """
+
+    def __init__(self):
+        self.statements = []
+
+    async def flush(self):
+        pass
+
+    async def execute(self, statement, params=None):
+        self.statements.append((str(statement.compile(dialect=postgresql.dialect())), params))
+
+
+class TestWriteBranchCards:
+    """Kartların yazma yollarında yeniden üretilmesi ile ilgili testler."""
+
+    def test_rewrites_cards_from_visible_branches_with_compiled_hours(self):
+        """Kart silinip aktif şube/işletmeden yeniden seçilmeli, saatler derlenmiş olarak yazılmalı."""
+        db = RecordingSession()
+        hours = [OpeningHour(day_of_week=DayOfWeekEnum.monday, opens=time(9), closes=time(17))]
+        asyncio.run(write_branch_cards(db, {1: hours, 2: []}))
+
+        (delete_sql, _), (insert_sql, _), (update_sql, schedules) = db.statements
+        assert delete_sql.startswith("DELETE FROM branch_card WHERE branch_card.branch_id IN")
+        assert insert_sql.startswith("INSERT INTO branch_card (branch_id, business_id, business_name")
+        assert "FROM branch JOIN business ON business.id = branch.business_id" in insert_sql
+        assert "branch.is_active = true AND business.is_active = true" in insert_sql
+        assert update_sql.startswith("UPDATE branch_card SET opening_hours=")
+        assert schedules == [{
+            "card_id": 1,
+            "card_hours": [{"day_of_week": "monday", "opens": "09:00:00", "closes": "17:00:00"}],
+            "card_intervals": [[9 * 3600.0, 17 * 3600.0]],
+        }]
+
+    def test_review_counters_are_updated_in_place(self):
+        """Yorum sayaçları okunup yazılmadan tek UPDATE ile artırılmalı."""
+        db = RecordingSession()
+        review = Review(id=1, branch_id=7, rating=4, created_at=datetime(2026, 10, 1, tzinfo=timezone.utc))
+        asyncio.run(count_card_review(db, review, 1))
+
+        sql, _ = db.statements[0]
+        assert "review_count=(branch_card.review_count + %(review_count_1)s)" in sql
+        assert "rating_sum=(branch_card.rating_sum + %(rating_sum_1)s)" in sql
+        assert "rating_4=(branch_card.rating_4 + %(rating_4_1)s)" in sql
+        assert "last_review_at=CASE WHEN" in sql
+
+
+class TestCardReviewCounters:
+    """Yorum sayaçlarının yerinde güncellenmesi ve reviews tablosuyla uzlaştırılması ile ilgili testler."""
+
+    def test_counters_follow_reviews_and_drift_is_repaired(self, tmp_path):
+        """Sayaçlar yorum eklenip çıkarıldıkça doğru kalmalı; elle bozulan kart reconcile ile düzeltilmeli."""
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'cards.db'}")
+        session_factory = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+        start = datetime(2026, 10, 1, tzinfo=timezone.utc)
+
+        async def counters(db):
+            row = (await db.execute(
+                select(*(getattr(BranchCard, name) for name in REVIEW_COLUMNS)).order_by(BranchCard.branch_id)
+            )).all()
+            return [tuple(values) for values in row]
+
+        async def run():
+            async with engine.begin() as conn:
+                await conn.run_sync(Review.__table__.create)
+                await conn.run_sync(ReviewResponse.__table__.create)
+                # Geography kolonu SQLite'ta oluşturulamadığından yalnızca sayaç kolonları.
+                await conn.execute(text(
+                    "CREATE TABLE branch_card (branch_id INTEGER PRIMARY KEY, review_count INTEGER DEFAULT 0, "
+                    "rating_sum INTEGER DEFAULT 0, rating_1 INTEGER DEFAULT 0, rating_2 INTEGER DEFAULT 0, "
+                    "rating_3 INTEGER DEFAULT 0, rating_4 INTEGER DEFAULT 0, rating_5 INTEGER DEFAULT 0, "
+                    "last_review_at DATETIME)"
+                ))
+                await conn.execute(text("INSERT INTO branch_card (branch_id) VALUES (1), (2)"))
+            async with session_factory() as db:
+                reviews = [
+                    Review(branch_id=1, user_id=i, rating=rating, status='approved',
+                           created_at=start + timedelta(hours=i))
+                    for i, rating in enumerate([5, 4, 5], start=1)
+                ]
+                db.add_all(reviews)
+                await db.flush()
+                for review in reviews:
+                    await count_card_review(db, review, 1)
+                # En yeni yorum silinince last_review_at bir öncekine döner.
+                await db.delete(reviews[-1])
+                await count_card_review(db, reviews[-1], -1)
+                await db.commit()
+                after_writes = await counters(db)
+
+                await db.execute(text("UPDATE branch_card SET review_count = 9, rating_1 = 1 WHERE branch_id = 1"))
+                await db.execute(text("UPDATE branch_card SET rating_sum = 3 WHERE branch_id = 2"))
+                await db.commit()
+                report = await reconcile_card_reviews(db, batch_size=1)
+                repaired = await counters(db)
+                second = await reconcile_card_reviews(db)
+            await engine.dispose()
+            return after_writes, report, repaired, second
+
+        after_writes, report, repaired, second = asyncio.run(run())
+        expected = [(2, 9, 0, 0, 0, 1, 1, start.replace(tzinfo=None) + timedelta(hours=2)),
+                    (0, 0, 0, 0, 0, 0, 0, None)]
+        assert [values[:7] for values in after_writes] == [values[:7] for values in expected]
+        assert after_writes[0][7].replace(tzinfo=None) == expected[0][7] and after_writes[1][7] is None
+        assert report == {"checked": 2, "repaired": 2}
+        assert [values[:7] for values in repaired] == [values[:7] for values in expected]
+        assert second == {"checked": 2, "repaired": 0}
+
+
+class TestCardResponse:
+    """Public cevabın yalnızca karttan üretilmesi ile ilgili testler."""
+
+    def test_formats_card_without_relations(self):
+        """Cevap işletme ve saat ilişkileri yüklenmeden kart kolonlarından oluşmalı."""
+        card = BranchCard(branch_id=3, business_id=1, business_name="Kahve", business_description="Çekirdek",
+                          address_text="Moda", phone="555", latitude=41.0, longitude=29.0,
+                          opening_hours=[{"day_of_week": "monday", "opens": "09:00:00", "closes": "17:00:00"}],
+                          open_intervals=[[9 * 3600, 17 * 3600]])
+        data = _calculate_is_open_and_format_branch(card, is_open=True)
+
+        assert data["id"] == 3 and data["business_name"] == "Kahve" and data["is_active"] is True
+        assert data["location"].model_dump() == {"latitude": 41.0, "longitude": 29.0}
+        assert card_schedule(card).is_open(10 * 3600)
+        assert not card_schedule(card).is_open(SECONDS_PER_DAY + 10 * 3600)
+
+    def test_deleting_user_refreshes_card_counters(self, tmp_path):
+        """Kullanıcı silinince yorumları sayaçlardan düşmeli, diğer kullanıcıların yorumları kalmalı."""
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'delete.db'}")
+        session_factory = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+        start = datetime(2026, 10, 1, tzinfo=timezone.utc)
+        token = "opaque-token"
+
+        async def run():
+            async with engine.begin() as conn:
+                for table in (User, SessionModel, Review, ReviewResponse):
+                    await conn.run_sync(table.__table__.create)
+                await conn.execute(text(
+                    "CREATE TABLE branch_card (branch_id INTEGER PRIMARY KEY, review_count INTEGER DEFAULT 0, "
+                    "rating_sum INTEGER DEFAULT 0, rating_1 INTEGER DEFAULT 0, rating_2 INTEGER DEFAULT 0, "
+                    "rating_3 INTEGER DEFAULT 0, rating_4 INTEGER DEFAULT 0, rating_5 INTEGER DEFAULT 0, "
+                    "last_review_at DATETIME)"
+                ))
+                await conn.execute(text("INSERT INTO branch_card (branch_id) VALUES (1)"))
+            async with session_factory() as db:
+                users = [User(userid=i, username=f"u{i}", email=f"u{i}@example.com") for i in (1, 2)]
+                db.add_all(users)
+                db.add(SessionModel(token_hash=session_token_digest(token), user_id=1,
+                                    valid_until=start + timedelta(days=3650)))
+                db.add_all([Review(branch_id=1, user_id=user_id, rating=rating, status='approved',
+                                   created_at=start + timedelta(hours=hours))
+                            for user_id, rating, hours in [(1, 1, 3), (2, 5, 1), (1, 2, 2)]])
+                await db.flush()
+                await refresh_card_reviews(db, [1])
+                await db.commit()
+
+                result = await auth_service.delete_user(users[0], token, db)
+                row = (await db.execute(
+                    select(*(getattr(BranchCard, name) for name in REVIEW_COLUMNS))
+                )).one()
+            await engine.dispose()
+            return result, tuple(row)
+
+        result, row = asyncio.run(run())
+        assert result["success"] is True
+        assert row[:7] == (1, 5, 0, 0, 0, 0, 1)
+        assert row[7].replace(tzinfo=None) == datetime(2026, 10, 1, 1)
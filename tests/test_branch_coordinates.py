@@ -0,0 +1,26 @@
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+from app.business.models import Branch
+from app.business.service import location_schema
+
+
+class TestBranchCoordinates:
+    """Şube koordinatlarının WKB çözülmeden sorguda okunması ile ilgili testler."""
+
+    def test_branch_query_selects_coordinates_not_wkb(self):
+        """Şube sorgusu ST_Y / ST_X'i seçmeli, location'ın WKB'sini yüklememeli."""
+        sql = str(select(Branch).compile(dialect=postgresql.dialect()))
+
+        assert "ST_Y(CAST(branch.location AS geometry(POINT,4326)))" in sql
+        assert "ST_X(CAST(branch.location AS geometry(POINT,4326)))" in sql
+        assert "ST_AsBinary" not in sql
+
+    def test_location_schema(self):
+        """Koordinatı olan şube için PointSchema, olmayan için None dönmeli."""
+        branch = Branch(id=1)
+        branch.latitude, branch.longitude = 41.0, 29.0
+        assert location_schema(branch).model_dump() == {"latitude": 41.0, "longitude": 29.0}
+
+        branch.latitude = None
+        assert location_schema(branch) is None
@@ -0,0 +1,62 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.dialects import postgresql
+
+from app.business import crud, service
+
+
+class CompilingSession:
+    """ Sorguyu çalıştırmak yerine PostgreSQL SQL'ine çevirip saklar. """
+
+    def __init__(self):
+        self.sql = None
+
+    async def execute(self, query):
+        self.sql = str(query.compile(dialect=postgresql.dialect()))
+        return SimpleNamespace(scalars=lambda: SimpleNamespace(all=lambda: []), all=lambda: [])
+
+
+class TestBranchesInBounds:
+    """Harita ekranı (dikdörtgen) sorgusu ile ilgili testler."""
+
+    def test_uses_envelope_filter_and_priority_order(self):
+        """Sorgu location üzerinde && ile süzmeli ve istenen önceliğe göre sıralamalı."""
+        db = CompilingSession()
+        asyncio.run(service.branches_in_bounds(db, 40.9, 28.9, 41.1, 29.1, 20, service.InBoundsOrder.RATING))
+
+        assert "branch_card.location && CAST(ST_MakeEnvelope(" in db.sql
+        assert "ST_DWithin" not in db.sql
+        assert "JOIN" not in db.sql and "reviews" not in db.sql
+        assert "nullif(branch_card.review_count" in db.sql and "DESC, branch_card.review_count DESC" in db.sql
+
+        asyncio.run(crud.find_branches_in_bounds(db, 40.9, 28.9, 41.1, 29.1, 20, "newest"))
+        assert "ORDER BY branch_card.created_at DESC, branch_card.branch_id" in db.sql
+
+    def test_rejects_inverted_bounds(self):
+        """Güney sınırı kuzeyden büyük olan dikdörtgen 400 ile reddedilmeli."""
+        with pytest.raises(HTTPException) as error:
+            asyncio.run(service.branches_in_bounds(CompilingSession(), 41.1, 28.9, 40.9, 29.1, 20))
+        assert error.value.status_code == 400
+
+
+class TestBranchClusters:
+    """Uzaklaştırılmış harita için grid kümeleri ile ilgili testler."""
+
+    def test_cell_size_halves_per_zoom(self):
+        """Her zoom seviyesinde hücre boyutu yarıya inmeli."""
+        assert service.cluster_cell_degrees(0) == 360.0 / service.CLUSTER_CELLS_PER_TILE
+        assert service.cluster_cell_degrees(11) == service.cluster_cell_degrees(10) / 2
+
+    def test_groups_by_snapped_cell_in_sql(self):
+        """Kümeleme SQL'de ST_SnapToGrid ile yapılmalı ve hücre sayısı sınırlı olmalı."""
+        db = CompilingSession()
+        cell_degrees, clusters = asyncio.run(service.branch_clusters(db, 10, 40.0, 28.0, 42.0, 30.0))
+
+        assert cell_degrees == service.cluster_cell_degrees(10)
+        assert clusters == []
+        assert "GROUP BY ST_SnapToGrid(CAST(branch_card.location AS geometry(POINT,4326))" in db.sql
+        assert "count(*) FILTER (WHERE EXISTS" in db.sql
+        assert "LIMIT" in db.sql
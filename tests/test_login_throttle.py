@@ -0,0 +1,57 @@
+import pytest
+from fastapi import HTTPException
+
+from app.auth import throttle
+from app.auth.throttle import LoginThrottle, throttle_key
+
+
+class TestLoginThrottle:
+    """Hesap başına hatalı deneme sınırlaması ile ilgili testler."""
+
+    def test_backoff_starts_after_free_attempts_and_doubles(self):
+        """Serbest denemelerden sonra bekleme süresi her hatada iki katına çıkmalı."""
+        limiter = LoginThrottle(free_attempts=2, base_seconds=1, max_seconds=4, reset_seconds=3600)
+        key = throttle_key("login", "a@example.com", None)
+
+        limiter.record_failure(key, now=100)
+        limiter.record_failure(key, now=100)
+        assert limiter.retry_after(key, now=100) == 0
+
+        limiter.record_failure(key, now=100)
+        assert limiter.retry_after(key, now=100) == 1
+        limiter.record_failure(key, now=100)
+        assert limiter.retry_after(key, now=100) == 2
+        for _ in range(5):
+            limiter.record_failure(key, now=100)
+        assert limiter.retry_after(key, now=100) == 4
+
+    def test_success_and_reset_window_clear_failures(self):
+        """Başarılı giriş ya da sıfırlama süresi sayacı temizlemeli."""
+        limiter = LoginThrottle(free_attempts=0, base_seconds=10, max_seconds=60, reset_seconds=30)
+        key = throttle_key("login", "a@example.com", None)
+
+        limiter.record_failure(key, now=0)
+        assert limiter.retry_after(key, now=0) == 10
+        assert limiter.retry_after(key, now=31) == 0
+
+        limiter.record_failure(key, now=40)
+        limiter.record_success(key)
+        assert limiter.retry_after(key, now=40) == 0
+
+    def test_key_is_case_insensitive_and_scoped(self):
+        """Aynı e-posta büyük/küçük harf farkıyla aynı, farklı kapsamda farklı anahtar üretmeli."""
+        assert throttle_key("login", "A@Example.com ", None) == throttle_key("login", "a@example.com", None)
+        assert throttle_key("login", "a@example.com", None) != throttle_key("verify_email", "a@example.com", None)
+        assert throttle_key("login", None, None) is None
+
+    def test_throttled_identifier_gets_429_with_retry_after(self, monkeypatch):
+        """Bekleme süresindeki tanımlayıcı 429 ve Retry-After başlığı almalı."""
+        limiter = LoginThrottle(free_attempts=0, base_seconds=30, max_seconds=60, reset_seconds=3600)
+        monkeypatch.setattr(throttle, "login_throttle", limiter)
+        key = throttle_key("login", "a@example.com", None)
+        limiter.record_failure(key)
+
+        with pytest.raises(HTTPException) as exc:
+            throttle.ensure_not_throttled(key)
+        assert exc.value.status_code == 429
+        assert 0 < int(exc.value.headers["Retry-After"]) <= 31
@@ -0,0 +1,25 @@
+from datetime import timedelta
+
+from app.auth import outbox
+from app.auth.email import MemoryTransport, build_message
+
+
+class TestEmailOutbox:
+    """E-posta outbox'ının yeniden deneme ve taşıyıcı davranışı ile ilgili testler."""
+
+    def test_retry_delay_is_exponential_and_capped(self, monkeypatch):
+        """Her denemede bekleme iki katına çıkmalı ama üst sınırı aşmamalı."""
+        monkeypatch.setattr(outbox, "OUTBOX_RETRY_BASE_SECONDS", 30)
+        monkeypatch.setattr(outbox, "OUTBOX_RETRY_MAX_SECONDS", 100)
+
+        assert outbox.retry_delay(1) == timedelta(seconds=30)
+        assert outbox.retry_delay(2) == timedelta(seconds=60)
+        assert outbox.retry_delay(3) == timedelta(seconds=100)
+
+    def test_memory_transport_reports_success_per_message(self):
+        """Bellek taşıyıcısı her mesaj için başarı (None) dönmeli ve mesajları saklamalı."""
+        transport = MemoryTransport()
+        messages = [build_message("Konu", f"user{i}@example.com", "<p>x</p>") for i in range(3)]
+
+        assert transport.send_batch(messages) == [None, None, None]
+        assert [m["To"] for m in transport.sent] == [f"user{i}@example.com" for i in range(3)]
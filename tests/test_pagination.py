@@ -0,0 +1,32 @@
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.pagination import decode_cursor, encode_cursor, split_page
+
+
+class TestCursor:
+    """Opak sayfalama cursor'ı ile ilgili testler."""
+
+    def test_roundtrip_keeps_exact_values(self):
+        """Mesafe ve zaman gibi değerler cursor'dan birebir geri okunmalı."""
+        created_at = datetime(2026, 10, 17, 9, 30, 15, 123456, tzinfo=timezone.utc)
+        cursor = encode_cursor(["p", 1234.5678901234567, created_at.isoformat(), 42])
+
+        assert decode_cursor(cursor, str, float, datetime.fromisoformat, int) == ["p", 1234.5678901234567, created_at, 42]
+
+    @pytest.mark.parametrize("cursor", ["bozuk!", encode_cursor([1, 2]), encode_cursor({"id": 1}), encode_cursor(["x", 1, 2])])
+    def test_invalid_cursor_is_rejected(self, cursor):
+        """Çözülemeyen, beklenen uzunlukta ya da tipte olmayan cursor 400 ile reddedilmeli."""
+        with pytest.raises(HTTPException) as exc:
+            decode_cursor(cursor, float, float, int)
+        assert exc.value.status_code == 400
+
+    def test_split_page_only_returns_cursor_when_more_rows_exist(self):
+        """limit + 1 satır geldiyse son gösterilen satırın cursor'ı dönmeli, gelmediyse None."""
+        rows, cursor = split_page([1, 2, 3], 2, lambda row: [row])
+        assert rows == [1, 2]
+        assert decode_cursor(cursor, int) == [2]
+
+        assert split_page([1, 2], 2, lambda row: [row]) == ([1, 2], None)
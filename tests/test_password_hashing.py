@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+from app.auth import calibrate
+from app.auth.hashing import PasswordHasher
+from app.auth.security import BCRYPT_ROUNDS, hash_password, password_needs_rehash
+
+
+class TestPasswordHasher:
+    """bcrypt işlemlerini event loop dışına taşıyan PasswordHasher ile ilgili testler."""
+
+    def test_hash_and_verify_roundtrip(self):
+        """Hash'lenen şifre doğru şifreyle doğrulanmalı, yanlışla doğrulanmamalı."""
+        hasher = PasswordHasher(workers=0, max_queue=4)
+
+        async def run():
+            hashed = await hasher.hash("123456")
+            return await hasher.verify("123456", hashed), await hasher.verify("yanlis", hashed)
+
+        assert asyncio.run(run()) == (True, False)
+        assert hasher.stats()["completed"] == 3
+
+    def test_rejects_when_queue_is_full(self):
+        """Sıra doluyken gelen istek beklemeden 503 ile reddedilmeli."""
+        hasher = PasswordHasher(workers=0, max_queue=0)
+
+        async def run():
+            return await asyncio.gather(hasher.hash("a"), hasher.hash("b"), return_exceptions=True)
+
+        results = asyncio.run(run())
+        rejected = [r for r in results if isinstance(r, HTTPException)]
+        assert len(rejected) == 1
+        assert rejected[0].status_code == 503
+        assert hasher.stats()["rejected"] == 1
+
+
+class TestBcryptCost:
+    """bcrypt maliyeti kalibrasyonu ve yeniden hash kararı ile ilgili testler."""
+
+    def test_hash_with_different_cost_needs_rehash(self):
+        """BCRYPT_ROUNDS'tan farklı maliyetli hash yenilenmeli, güncel olan yenilenmemeli."""
+        old_rounds = 10 if BCRYPT_ROUNDS != 10 else 11
+        old_hash = CryptContext(schemes=["bcrypt"], bcrypt__rounds=old_rounds).hash("123456")
+
+        assert password_needs_rehash(old_hash)
+        assert not password_needs_rehash(hash_password("123456"))
+
+    def test_calibrate_picks_highest_rounds_within_target(self, monkeypatch):
+        """Hedef süreyi aşmayan en yüksek maliyet seçilmeli, aşan ilk maliyette ölçüm durmalı."""
+        monkeypatch.setattr(calibrate, "measure_verify_ms", lambda rounds, samples: 2 ** (rounds - 4))
+
+        chosen, timings = calibrate.calibrate(target_ms=200, min_rounds=10, max_rounds=16)
+
+        assert chosen == 11
+        assert list(timings) == [10, 11, 12]
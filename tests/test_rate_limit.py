@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+from limits import parse
+from limits.strategies import SlidingWindowCounterRateLimiter
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from app.auth.middleware import resolve_user_id
+from app.core import rate_limit
+from app.core.rate_limit import RateLimitCounter, SQLCounterStorage
+
+
+@pytest.fixture()
+def counter_db(tmp_path, monkeypatch):
+    """ İki 'worker'ın paylaştığı, sadece rate_limit_counter tablosunu içeren geçici veritabanı. """
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'limits.db'}")
+
+    async def create():
+        async with engine.begin() as conn:
+            await conn.run_sync(RateLimitCounter.__table__.create)
+
+    asyncio.run(create())
+    monkeypatch.setattr(rate_limit, "SessionLocal", async_sessionmaker(bind=engine, class_=AsyncSession,
+                                                                       expire_on_commit=False))
+    yield
+    asyncio.run(engine.dispose())
+
+
+class TestSharedRateLimit:
+    """Worker'lar arası paylaşılan rate limit sayaçları ile ilgili testler."""
+
+    def test_flush_shares_counts_between_workers(self, counter_db):
+        """Flush sonrası her worker diğerinin isteklerini de saymalı."""
+        worker_a, worker_b = SQLCounterStorage(), SQLCounterStorage()
+
+        async def run():
+            for _ in range(3):
+                worker_a.incr("ip/1", 120)
+            for _ in range(2):
+                worker_b.incr("ip/1", 120)
+            await worker_a.flush()
+            await worker_b.flush()
+            await worker_a.flush()
+
+        asyncio.run(run())
+        assert worker_a.get("ip/1") == 5
+        assert worker_b.get("ip/1") == 5
+
+    def test_sliding_window_limit_is_enforced_across_workers(self, counter_db):
+        """Limit, istekler iki worker'a dağılsa da toplam üzerinden uygulanmalı."""
+        limit = parse("5/minute")
+        worker_a, worker_b = SQLCounterStorage(), SQLCounterStorage()
+        limiter_a = SlidingWindowCounterRateLimiter(worker_a)
+        limiter_b = SlidingWindowCounterRateLimiter(worker_b)
+
+        assert all(limiter_a.hit(limit, "10.0.0.1") for _ in range(3))
+        assert all(limiter_b.hit(limit, "10.0.0.1") for _ in range(2))
+
+        async def sync():
+            await worker_a.flush()
+            await worker_b.flush()
+            await worker_a.flush()
+
+        asyncio.run(sync())
+        assert not limiter_a.hit(limit, "10.0.0.1")
+        assert not limiter_b.hit(limit, "10.0.0.1")
+
+
+class TestIdentityResolution:
+    """Limiter için kimlik çözümü ile ilgili testler."""
+
+    def test_unknown_tokens_fall_back_to_ip(self):
+        """Önbellekte olmayan opak token ya da hatalı başlık kullanıcı id'si vermemeli."""
+        assert resolve_user_id(None) is None
+        assert resolve_user_id("Basic abc") is None
+        assert resolve_user_id("Bearer bilinmeyen-token") is None
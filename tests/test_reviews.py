@@ -0,0 +1,102 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from fastapi import HTTPException
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from app.reviews import service
+from app.reviews.models import Review
+
+
+class TestReviewPagination:
+    """Yorum listelerinin (created_at, id) keyset sayfalaması ile ilgili testler."""
+
+    def test_pages_cover_all_reviews_newest_first(self, tmp_path):
+        """Sayfalar art arda okunduğunda aynı anda yazılanlar dahil her onaylı yorum bir kez, yeniden eskiye gelmeli."""
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'reviews.db'}")
+        session_factory = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+        start = datetime(2026, 10, 1, tzinfo=timezone.utc)
+
+        async def run():
+            async with engine.begin() as conn:
+                await conn.run_sync(Review.__table__.create)
+            async with session_factory() as db:
+                db.add_all([
+                    Review(branch_id=1, user_id=i, rating=5, status='approved' if i % 4 else 'pending',
+                           created_at=start + timedelta(hours=i // 3)) # üçer yorum aynı anda
+                    for i in range(1, 24)
+                ])
+                await db.commit()
+
+                pages, cursor = [], None
+                while True:
+                    reviews, cursor = await service.get_all_reviews_for_branch(db, 1, 5, cursor)
+                    pages.append([review.id for review in reviews])
+                    if cursor is None:
+                        break
+            await engine.dispose()
+            return pages
+
+        pages = asyncio.run(run())
+        expected = sorted((i for i in range(1, 24) if i % 4), key=lambda i: (i // 3, i), reverse=True)
+        assert [len(page) for page in pages] == [5, 5, 5, 3]
+        assert [review_id for page in pages for review_id in page] == expected
+
+
+class TestReviewTotal:
+    """Yorum listesindeki toplamın COUNT(*) yerine şube kartından okunması ile ilgili testler."""
+
+    def test_total_comes_from_branch_card(self, tmp_path):
+        """Toplam kartın sayacı olmalı; kartı olmayan şube için 0 dönmeli."""
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'total.db'}")
+        session_factory = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+        async def run():
+            async with engine.begin() as conn:
+                # reviews tablosu bilerek yok: toplam yorumları saymamalı.
+                await conn.execute(text("CREATE TABLE branch_card (branch_id INTEGER PRIMARY KEY, review_count INTEGER)"))
+                await conn.execute(text("INSERT INTO branch_card (branch_id, review_count) VALUES (1, 1234)"))
+            async with session_factory() as db:
+                totals = [await service.get_branch_review_total(db, 1), await service.get_branch_review_total(db, 2)]
+            await engine.dispose()
+            return totals
+
+        assert asyncio.run(run()) == [1234, 0]
+
+
+class TestReviewSummary:
+    """Şube yorum özetinin (sayı, ortalama, histogram) karttaki sayaçlardan üretilmesi ile ilgili testler."""
+
+    def test_summary_from_card_counters(self, tmp_path):
+        """Özet reviews tablosu okunmadan karttan gelmeli; kartı olmayan şube için 404 dönmeli."""
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'summary.db'}")
+        session_factory = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+        async def run():
+            async with engine.begin() as conn:
+                await conn.execute(text(
+                    "CREATE TABLE branch_card (branch_id INTEGER PRIMARY KEY, review_count INTEGER, "
+                    "rating_sum INTEGER, rating_1 INTEGER, rating_2 INTEGER, rating_3 INTEGER, rating_4 INTEGER, "
+                    "rating_5 INTEGER, last_review_at DATETIME)"
+                ))
+                await conn.execute(text(
+                    "INSERT INTO branch_card VALUES (1, 4, 17, 0, 0, 1, 1, 2, '2026-10-01 12:00:00'), "
+                    "(2, 0, 0, 0, 0, 0, 0, 0, NULL)"
+                ))
+            async with session_factory() as db:
+                summaries = [await service.get_branch_rating_summary(db, 1),
+                             await service.get_branch_rating_summary(db, 2)]
+                try:
+                    await service.get_branch_rating_summary(db, 3)
+                except HTTPException as e:
+                    summaries.append(e.status_code)
+            await engine.dispose()
+            return summaries
+
+        summary, empty, missing = asyncio.run(run())
+        assert summary["review_count"] == 4 and summary["average_rating"] == 4.25
+        assert summary["rating_histogram"] == {1: 0, 2: 0, 3: 1, 4: 1, 5: 2}
+        assert summary["last_review_at"].replace(tzinfo=None) == datetime(2026, 10, 1, 12)
+        assert empty["average_rating"] is None and empty["rating_histogram"] == {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}
+        assert missing == 404
@@ -0,0 +1,86 @@
+import asyncio
+import random
+from datetime import datetime, time, timedelta, timezone
+from types import SimpleNamespace
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from app.business.crud import open_at_filter, replace_open_intervals
+from app.business.models import Branch, BranchOpenInterval, DayOfWeekEnum
+from app.business.schedule import compile_schedule, week_second
+
+
+def hour(day: DayOfWeekEnum, opens: time, closes: time):
+    return SimpleNamespace(day_of_week=day, opens=opens, closes=closes)
+
+
+def reference_is_open(opening_hours, now: datetime) -> bool:
+    """ Derlenmiş takvimden önceki, saat satırlarını tek tek gezen hesap. """
+    current_weekday = now.weekday()
+    previous_weekday = (current_weekday - 1) % 7
+    current_time = now.time()
+    for h in opening_hours:
+        day = h.day_of_week.value
+        if day == current_weekday and h.opens <= h.closes and h.opens <= current_time < h.closes:
+            return True
+        if day == current_weekday and h.opens > h.closes and current_time >= h.opens:
+            return True
+        if day == previous_weekday and h.opens > h.closes and current_time < h.closes:
+            return True
+    return False
+
+
+class TestCompiledSchedule:
+    """Haftanın saniyesi cinsinden derlenen çalışma saatleri ile ilgili testler."""
+
+    def test_matches_reference_for_random_schedules(self):
+        """Gece yarısını ve Pazar -> Pazartesi'yi aşan saatler dahil eski hesapla aynı sonucu vermeli."""
+        rng = random.Random(5)
+        start = datetime(2026, 10, 12, tzinfo=timezone.utc) # Pazartesi
+        for _ in range(200):
+            hours = [hour(rng.choice(list(DayOfWeekEnum)), time(rng.randrange(24), rng.choice([0, 30])),
+                          time(rng.randrange(24), rng.choice([0, 30]))) for _ in range(rng.randrange(0, 6))]
+            compiled = compile_schedule(hours)
+            for _ in range(50):
+                now = start + timedelta(seconds=rng.randrange(7 * 24 * 3600))
+                assert compiled.is_open(week_second(now)) == reference_is_open(hours, now)
+
+    def test_sunday_overnight_wraps_to_monday(self):
+        """Pazar 22:00 - 02:00 Pazartesi sabahı 01:00'de açık, 03:00'te kapalı görünmeli."""
+        compiled = compile_schedule([hour(DayOfWeekEnum.sunday, time(22), time(2))])
+
+        assert compiled.is_open(week_second(datetime(2026, 10, 12, 1)))
+        assert not compiled.is_open(week_second(datetime(2026, 10, 12, 3)))
+        assert compiled.opening_hours == [{"day_of_week": "sunday", "opens": "22:00:00", "closes": "02:00:00"}]
+
+
+class TestOpenIntervalFilter:
+    """branch_open_interval tablosu üzerinden sorguda çalışan "açık olanlar" filtresi ile ilgili testler."""
+
+    def test_filter_matches_written_intervals(self, tmp_path):
+        """Yazılan aralıklar gece yarısını aşan saatler dahil doğru şubeleri süzmeli, boş saat listesi hepsini silmeli."""
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'open.db'}")
+        session_factory = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+        def open_ids(db, moment):
+            return db.execute(select(Branch.id).where(open_at_filter(week_second(moment))).order_by(Branch.id))
+
+        async def run():
+            async with engine.begin() as conn:
+                # Geography kolonu SQLite'ta oluşturulamadığından şube tablosunun sadece id'si yeterli.
+                await conn.execute(text("CREATE TABLE branch (id INTEGER PRIMARY KEY)"))
+                await conn.execute(text("INSERT INTO branch (id) VALUES (1), (2)"))
+                await conn.run_sync(BranchOpenInterval.__table__.create)
+            async with session_factory() as db:
+                await replace_open_intervals(db, 1, [hour(DayOfWeekEnum.monday, time(9), time(17))])
+                await replace_open_intervals(db, 2, [hour(DayOfWeekEnum.sunday, time(22), time(2))])
+                await db.commit()
+                results = [(await open_ids(db, datetime(2026, 10, 12, h))).scalars().all() for h in (1, 10, 17)]
+                await replace_open_intervals(db, 1, [])
+                await db.commit()
+                results.append((await open_ids(db, datetime(2026, 10, 12, 10))).scalars().all())
+            await engine.dispose()
+            return results
+
+        assert asyncio.run(run()) == [[2], [1], [], []]
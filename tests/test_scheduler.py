@@ -0,0 +1,161 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from app.auth import maintenance
+from app.auth.models import EmailOutbox, RecoveryCode, SessionModel
+from app.core.scheduler import LeaderLock, PeriodicJob, Scheduler, scheduler
+
+
+class FakeAdvisoryLocks:
+    """ PostgreSQL advisory lock'larının bağlantıya bağlı davranışını taklit eden engine. """
+
+    dialect = SimpleNamespace(name="postgresql")
+
+    def __init__(self):
+        self.holders = {}
+
+    async def connect(self):
+        return FakeConnection(self)
+
+
+class FakeConnection:
+    def __init__(self, server: FakeAdvisoryLocks):
+        self.server = server
+        self.lost = False
+
+    async def execution_options(self, **options):
+        return self
+
+    async def execute(self, statement, params=None):
+        if self.lost:
+            raise ConnectionError("connection lost")
+        sql = str(statement)
+        if "pg_try_advisory_lock" in sql:
+            holder = self.server.holders.setdefault(params["key"], self)
+            return SimpleNamespace(scalar=lambda: holder is self)
+        if "pg_advisory_unlock" in sql:
+            self.server.holders.pop(params["key"], None)
+        return SimpleNamespace(scalar=lambda: 1)
+
+    async def close(self):
+        # Bağlantı kapanınca PostgreSQL session lock'larını bırakır.
+        self.server.holders = {key: conn for key, conn in self.server.holders.items() if conn is not self}
+
+    async def invalidate(self):
+        await self.close()
+
+
+class StaticLeader:
+    def __init__(self, leader: bool):
+        self.leader = leader
+
+    async def is_leader(self) -> bool:
+        return self.leader
+
+    async def release(self) -> None:
+        pass
+
+
+class TestLeaderLock:
+    """Worker'lar arasında leader seçimi ile ilgili testler."""
+
+    def test_lock_is_held_across_runs_and_fails_over(self):
+        """Lock'u alan worker her çalıştırmada leader kalmalı; bağlantısı koparsa diğeri devralmalı."""
+        server = FakeAdvisoryLocks()
+        first, second = LeaderLock("scheduler:leader", bind=server), LeaderLock("scheduler:leader", bind=server)
+
+        async def run():
+            rounds = [(await first.is_leader(), await second.is_leader()) for _ in range(3)]
+            first._conn.lost = True
+            await server.holders[first.key].close() # sunucu tarafında bağlantı düştü
+            rounds.append((await second.is_leader(), await first.is_leader()))
+            await second.release()
+            rounds.append((await first.is_leader(),))
+            return rounds
+
+        assert asyncio.run(run()) == [(True, False)] * 3 + [(True, False), (True,)]
+
+
+class TestScheduler:
+    """Periyodik işlerin çalıştırılması ve istatistikleri ile ilgili testler."""
+
+    def test_followers_skip_leader_only_jobs(self):
+        """Leader olmayan worker leader_only işi atlayıp saymalı, diğer işleri çalıştırmalı."""
+        scheduler = Scheduler(leader=StaticLeader(False))
+        calls = []
+
+        async def job():
+            calls.append(1)
+            return {"ok": 1}
+
+        leader_job = PeriodicJob(name="sweep", interval=60, func=job)
+        local_job = PeriodicJob(name="sync", interval=60, func=job, leader_only=False)
+        asyncio.run(scheduler.run_job(leader_job))
+        asyncio.run(scheduler.run_job(local_job))
+
+        assert leader_job.stats.skipped_not_leader == 1 and leader_job.stats.runs == 0
+        assert local_job.stats.runs == 1 and local_job.stats.last_result == {"ok": 1}
+        assert len(calls) == 1
+
+    def test_failed_job_is_counted_and_does_not_raise(self):
+        """Hata veren iş failures'ı artırmalı, süresi yine kaydedilmeli."""
+        scheduler = Scheduler(leader=StaticLeader(True))
+
+        async def broken():
+            raise RuntimeError("db down")
+
+        job = PeriodicJob(name="sweep", interval=60, func=broken)
+        asyncio.run(scheduler.run_job(job))
+
+        assert job.stats.failures == 1 and job.stats.runs == 0
+        assert job.stats.last_duration_ms is not None
+
+
+class TestLifespanJobs:
+    """Uygulama açılırken kaydedilen periyodik işler ile ilgili testler."""
+
+    def test_card_reconcile_is_not_scheduled_without_postgresql(self, client):
+        """branch_card SQLite'ta olmadığından kart düzeltme işi kaydedilmemeli, diğer işler kaydedilmeli."""
+        assert "reconcile_branch_cards" not in scheduler.jobs
+        assert "sweep_expired_auth_rows" in scheduler.jobs
+
+
+class TestSweepExpiredRows:
+    """Süresi dolmuş auth kayıtlarının batch'ler halinde silinmesi ile ilgili testler."""
+
+    def test_deletes_only_expired_rows_in_batches(self, tmp_path, monkeypatch):
+        """Yalnızca süresi geçmiş kayıtlar silinmeli; batch boyutundan fazlası birden çok batch'te silinmeli."""
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'sweep.db'}")
+        session_factory = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+        monkeypatch.setattr(maintenance, "SessionLocal", session_factory)
+        monkeypatch.setattr(maintenance, "MAINTENANCE_BATCH_SIZE", 2)
+        monkeypatch.setattr(maintenance, "EXPIRING_TABLES", (
+            (SessionModel, SessionModel.token_hash), (RecoveryCode, RecoveryCode.id)
+        ))
+        now = datetime.now(timezone.utc)
+
+        async def run():
+            async with engine.begin() as conn:
+                await conn.run_sync(SessionModel.__table__.create)
+                await conn.run_sync(RecoveryCode.__table__.create)
+                await conn.run_sync(EmailOutbox.__table__.create)
+            async with session_factory() as db:
+                db.add_all([SessionModel(token_hash=bytes([i]) * 32, user_id=1,
+                                         valid_until=now + timedelta(hours=-1 if i < 5 else 1)) for i in range(7)])
+                db.add_all([RecoveryCode(recovery_code=f"{i:06}", user_id=1, valid_until=now + timedelta(hours=1))
+                            for i in range(2)])
+                await db.commit()
+            deleted = await maintenance.sweep_expired_auth_rows()
+            async with session_factory() as db:
+                left = [(await db.execute(select(func.count()).select_from(model))).scalar()
+                        for model in (SessionModel, RecoveryCode)]
+            await engine.dispose()
+            return deleted, left
+
+        deleted, left = asyncio.run(run())
+        assert deleted == {"session": 5, "recovery_code": 0, "email_outbox": 0}
+        assert left == [2, 2]
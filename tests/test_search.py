@@ -0,0 +1,31 @@
+from types import SimpleNamespace
+
+from sqlalchemy.dialects import postgresql
+
+from app.business.search import branch_search_text, normalize_search_text, text_match
+
+
+class TestSearchText:
+    """Arama metninin normalizasyonu ile ilgili testler."""
+
+    def test_turkish_case_and_accents(self):
+        """Türkçe büyük/küçük harf ve aksan farkları aynı metne inmeli."""
+        assert normalize_search_text("İSTANBUL, Kadıköy") == "istanbul kadikoy"
+        assert normalize_search_text("ISPARTA  Çarşı-Şube") == "isparta carsi sube"
+        assert branch_search_text("Kahve Dünyası", None) == "kahve dunyasi"
+
+
+class TestTextMatch:
+    """branch_card üzerinde kurulan metin eşleştirme ifadeleri ile ilgili testler."""
+
+    def test_postgresql_uses_trigram_operators_on_normalized_keyword(self):
+        """PostgreSQL'de filtre LIKE + word similarity (<%), puan word_similarity olmalı; terim normalize edilmeli."""
+        dialect = postgresql.dialect()
+        db = SimpleNamespace(get_bind=lambda: SimpleNamespace(dialect=dialect))
+        where, score = text_match(db, "KADIKÖY Moda")
+
+        compiled = where.compile(dialect=dialect, compile_kwargs={"literal_binds": True})
+        assert "branch_card.search_text LIKE '%%kadikoy moda%%'" in str(compiled)
+        assert "'kadikoy moda' <%% branch_card.search_text" in str(compiled)
+        assert str(score.compile(dialect=dialect, compile_kwargs={"literal_binds": True})) == \
+            "word_similarity('kadikoy moda', branch_card.search_text)"
@@ -0,0 +1,42 @@
+from datetime import datetime, timedelta, timezone
+
+from app.auth.revocation import RevocationList
+from app.auth.security import generate_signed_session_token, verify_signed_session_token, is_signed_session_token
+
+
+class TestSignedSessionToken:
+    """DB'ye gitmeden doğrulanan imzalı session token'ları ile ilgili testler."""
+
+    def test_valid_token_roundtrip(self):
+        """Geçerli token user_id ve bitiş zamanını geri vermeli."""
+        valid_until = datetime.now(timezone.utc).replace(microsecond=0) + timedelta(days=1)
+        token = generate_signed_session_token(42, valid_until)
+
+        assert is_signed_session_token(token)
+        assert verify_signed_session_token(token) == (42, valid_until)
+
+    def test_tampered_token_is_rejected(self):
+        """user_id değiştirilmiş token imza kontrolünden geçmemeli."""
+        token = generate_signed_session_token(42, datetime.now(timezone.utc) + timedelta(days=1))
+        tampered = token.replace("v1.42.", "v1.43.", 1)
+
+        assert verify_signed_session_token(tampered) is None
+
+    def test_expired_token_is_rejected(self):
+        """Süresi dolmuş token reddedilmeli."""
+        token = generate_signed_session_token(42, datetime.now(timezone.utc) - timedelta(seconds=1))
+
+        assert verify_signed_session_token(token) is None
+
+    def test_revocation_list(self):
+        """İptal edilen token, süresi dolana kadar iptal listesinde kalmalı."""
+        revocations = RevocationList()
+        token = generate_signed_session_token(42, datetime.now(timezone.utc) + timedelta(days=1))
+        expired = generate_signed_session_token(42, datetime.now(timezone.utc) + timedelta(days=1))
+
+        revocations.revoke(token, datetime.now(timezone.utc) + timedelta(days=1))
+        revocations.revoke(expired, datetime.now(timezone.utc) - timedelta(seconds=1))
+
+        assert revocations.is_revoked(token)
+        assert not revocations.is_revoked(expired)
+        assert len(revocations) == 1
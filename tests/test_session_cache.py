@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta, timezone
+
+from app.auth.cache import SessionCache
+from app.auth.models import User
+
+
+def make_user(userid: int) -> User:
+    return User(userid=userid, name="ali", surname="kara", username=f"alik{userid}",
+                email=f"user{userid}@example.com", password="hash", user_status="open", email_status=True)
+
+
+def valid_until(**delta) -> datetime:
+    return datetime.now(timezone.utc) + timedelta(**delta)
+
+
+class TestSessionCache:
+    """get_current_user'ın kullandığı session önbelleği ile ilgili testler."""
+
+    def test_hit_returns_detached_user_copy(self):
+        """Önbellekten dönen kullanıcının değiştirilmesi önbelleği bozmamalı."""
+        cache = SessionCache(max_entries=10, ttl_seconds=60)
+        cache.put("token", valid_until(days=1), make_user(1))
+
+        user = cache.get("token").to_user()
+        user.name = "degisti"
+
+        assert cache.get("token").to_user().name == "ali"
+        assert cache.stats()["hits"] == 2
+
+    def test_expired_session_is_a_miss(self):
+        """Süresi dolmuş session önbellekte olsa bile kullanılmamalı."""
+        cache = SessionCache(max_entries=10, ttl_seconds=60)
+        cache.put("token", valid_until(seconds=-1), make_user(1))
+
+        assert cache.get("token") is None
+        assert cache.stats()["misses"] == 1
+        assert cache.stats()["entries"] == 0
+
+    def test_lru_eviction(self):
+        """Kapasite aşılınca en uzun süredir kullanılmayan kayıt atılmalı."""
+        cache = SessionCache(max_entries=2, ttl_seconds=60)
+        cache.put("a", valid_until(days=1), make_user(1))
+        cache.put("b", valid_until(days=1), make_user(2))
+        cache.get("a")
+        cache.put("c", valid_until(days=1), make_user(3))
+
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+        assert cache.stats()["evictions"] == 1
+
+    def test_invalidate_user_drops_all_tokens(self):
+        """Kullanıcı bazlı invalidation o kullanıcının tüm session'larını silmeli."""
+        cache = SessionCache(max_entries=10, ttl_seconds=60)
+        cache.put("a", valid_until(days=1), make_user(1))
+        cache.put("b", valid_until(days=1), make_user(1))
+        cache.put("c", valid_until(days=1), make_user(2))
+
+        cache.invalidate_user(1)
+
+        assert cache.get("a") is None
+        assert cache.get("b") is None
+        assert cache.get("c") is not None
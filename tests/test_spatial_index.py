@@ -0,0 +1,108 @@
+import asyncio
+import random
+from types import SimpleNamespace
+
+from app.business import spatial
+from app.business.spatial import BranchSpatialIndex, haversine
+
+
+def brute_force_nearest(points: dict, lat: float, lon: float, k: int) -> list[int]:
+    return [branch_id for _, branch_id in sorted((haversine(lat, lon, *p), i) for i, p in points.items())[:k]]
+
+
+class TestBranchSpatialIndex:
+    """Şubeler için bellekteki grid spatial index ile ilgili testler."""
+
+    def test_nearest_and_within_match_brute_force(self):
+        """En yakın k ve yarıçap sorguları bütün noktalara bakan hesapla aynı sonucu vermeli."""
+        rng = random.Random(7)
+        points = {i: (rng.gauss(41.0, 0.05), rng.gauss(29.0, 0.08)) for i in range(2000)}
+        index = BranchSpatialIndex(cell_degrees=0.01)
+        index.replace_all(points)
+
+        for _ in range(20):
+            lat, lon = rng.gauss(41.0, 0.05), rng.gauss(29.0, 0.08)
+            assert [i for i, _ in index.nearest(lat, lon, 10)] == brute_force_nearest(points, lat, lon, 10)
+            expected = sorted(i for i, p in points.items() if haversine(lat, lon, *p) <= 1500)
+            assert sorted(i for i, _ in index.within(lat, lon, 1500)) == expected
+
+    def test_nearest_matches_brute_force_for_random_queries(self):
+        """Seyrek ve yoğun bölgeler, farklı k değerleri için en yakın k kümesi bütün noktalara bakan hesapla aynı olmalı."""
+        rng = random.Random(21)
+        points = {i: (rng.uniform(40.9, 41.1), rng.uniform(28.9, 29.1)) for i in range(300)}
+        points.update({300 + i: (rng.gauss(41.0, 0.005), rng.gauss(29.0, 0.005)) for i in range(300)})
+        index = BranchSpatialIndex(cell_degrees=0.01)
+        index.replace_all(points)
+
+        for _ in range(1000):
+            lat, lon, k = rng.uniform(40.85, 41.15), rng.uniform(28.85, 29.15), rng.randrange(1, 25)
+            assert [i for i, _ in index.nearest(lat, lon, k)] == brute_force_nearest(points, lat, lon, k)
+
+    def test_incremental_updates(self):
+        """Eklenen, taşınan ve silinen şubeler sorgulara hemen yansımalı."""
+        index = BranchSpatialIndex(cell_degrees=0.01)
+        index.upsert(1, 41.0, 29.0)
+        index.upsert(2, 41.5, 29.5)
+        assert [i for i, _ in index.within(41.0, 29.0, 1000)] == [1]
+
+        index.upsert(2, 41.0005, 29.0005)
+        assert [i for i, _ in index.within(41.0, 29.0, 1000)] == [1, 2]
+
+        index.remove(1)
+        assert [i for i, _ in index.nearest(41.0, 29.0, 5)] == [2]
+
+    def test_replace_all_reports_changes(self):
+        """Tablodan yeniden eşitleme eklenen, silinen ve taşınan şubeleri saymalı."""
+        index = BranchSpatialIndex()
+        index.replace_all({1: (41.0, 29.0), 2: (40.0, 30.0)})
+
+        assert index.replace_all({1: (41.0, 29.0), 2: (40.1, 30.0), 3: (39.0, 32.0)}) == \
+               {"added": 1, "removed": 0, "moved": 1}
+        assert index.replace_all({3: (39.0, 32.0)}) == {"added": 0, "removed": 2, "moved": 0}
+
+    def test_nearest_gives_up_beyond_limit(self):
+        """Sınır içinde yeterli şube yoksa None dönmeli (PostGIS'e düşülür), daha küçük max_distance ile boş liste."""
+        rng = random.Random(3)
+        index = BranchSpatialIndex(cell_degrees=0.01, knn_limit_meters=5000)
+        index.replace_all({i: (rng.uniform(36, 37), rng.uniform(26, 30)) for i in range(1000)})
+
+        assert index.nearest(43.0, 32.0, 3) is None
+        assert index.nearest(43.0, 32.0, 3, max_distance=1000) == []
+        # max_distance sınırdan büyükse sonuç kırpılmamalı, PostGIS'e bırakılmalı.
+        assert index.nearest(36.5, 28.0, 50, max_distance=100000) is None
+
+    def test_nearest_pages_with_after_cursor(self):
+        """after ile alınan sayfalar art arda eklendiğinde tek seferde alınan listeyle aynı olmalı."""
+        rng = random.Random(11)
+        points = {i: (rng.gauss(41.0, 0.05), rng.gauss(29.0, 0.08)) for i in range(2000)}
+        points[2000] = points[1999] # aynı mesafedeki şubeler id ile sıralanmalı
+        index = BranchSpatialIndex(cell_degrees=0.01)
+        index.replace_all(points)
+
+        pages, after = [], None
+        for _ in range(5):
+            page = index.nearest(41.0, 29.0, 7, after=after)
+            pages.extend(page)
+            after = (page[-1][1], page[-1][0])
+
+        assert pages == index.nearest(41.0, 29.0, 35)
+
+    def test_compare_defers_sparse_samples_to_postgis(self, monkeypatch):
+        """Sınır ötesindeki örnekler hata vermeden atlanmalı ve deferred olarak sayılmalı."""
+        rng = random.Random(5)
+        points = {i: (rng.gauss(41.0, 0.05), rng.gauss(29.0, 0.08)) for i in range(3000)}
+        points.update({3000: (37.0, 43.0), 3001: (37.001, 43.0), 3002: (37.0, 43.001)})
+        index = BranchSpatialIndex(cell_degrees=0.01, knn_limit_meters=5000)
+        index.replace_all(points)
+        assert index.nearest(37.0, 43.0, 10) is None
+
+        async def postgis_nearest(lat, lon, k, db):
+            return [(SimpleNamespace(branch_id=i), haversine(lat, lon, *points[i]))
+                    for i in brute_force_nearest(points, lat, lon, k)]
+
+        monkeypatch.setattr(spatial, "spatial_index", index)
+        monkeypatch.setattr(spatial, "find_nearest_businesses_ordered", postgis_nearest)
+        monkeypatch.setattr(index, "sample_points", lambda count: [(41.0, 29.0), (37.0, 43.0), (37.001, 43.0)])
+
+        report = asyncio.run(spatial.compare_with_postgis(None, 3))
+        assert report == {"samples": 3, "mismatches": 0, "deferred": 2}
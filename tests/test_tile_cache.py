@@ -0,0 +1,121 @@
+import asyncio
+import random
+from types import SimpleNamespace
+
+from app.business import crud, service
+from app.business.geo import Point
+from app.business.spatial import haversine
+from app.business.tile_cache import TileCache
+
+
+def use_points(monkeypatch, points: dict):
+    """ Aday yüklemesini (PostGIS ST_DWithin) verilen noktalar üzerinde çalıştırır ve çağrıları sayar. """
+    calls = []
+
+    async def points_within(db, lat, lon, radius):
+        calls.append((lat, lon, radius))
+        return [(i, *p) for i, p in points.items() if haversine(lat, lon, *p) <= radius]
+
+    monkeypatch.setattr(crud, "get_active_branch_points_within", points_within)
+    return calls
+
+
+class TestTileCache:
+    """near-me / list için harita karesi önbelleği ile ilgili testler."""
+
+    def test_matches_brute_force_and_reuses_tile(self, monkeypatch):
+        """Aynı karedeki farklı noktalar tek yüklemeyle, bütün noktalara bakan hesapla aynı sonucu almalı."""
+        rng = random.Random(11)
+        points = {i: (rng.gauss(41.0, 0.03), rng.gauss(29.0, 0.04)) for i in range(3000)}
+        calls = use_points(monkeypatch, points)
+        cache = TileCache(tile_degrees=0.01, buckets=[500.0, 2000.0], ttl_seconds=60, max_bytes=10 ** 8)
+
+        async def run():
+            results = []
+            for _ in range(30):
+                lat, lon = 41.0 + rng.uniform(0, 0.0099), 29.0 + rng.uniform(0, 0.0099)
+                radius = rng.choice([300, 500, 1500, 2000])
+                entry = await cache.candidates(None, lat, lon, radius)
+                expected = sorted(i for i, p in points.items() if haversine(lat, lon, *p) <= radius)
+                results.append(sorted(i for i, _ in entry.within(lat, lon, radius)) == expected)
+            return results
+
+        assert all(asyncio.run(run()))
+        assert len(calls) == 2 # iki kova, tek kare
+        assert cache.stats()["hits"] == 28
+        assert asyncio.run(cache.candidates(None, 41.0, 29.0, 20000)) is None
+
+    def test_invalidates_only_tiles_covering_point(self, monkeypatch):
+        """Şube yazıldığında yalnızca onu kapsayan kareler yeniden yüklenmeli."""
+        points = {1: (41.0, 29.0)}
+        calls = use_points(monkeypatch, points)
+        cache = TileCache(tile_degrees=0.01, buckets=[1000.0], ttl_seconds=60, max_bytes=10 ** 8)
+
+        async def run():
+            await cache.candidates(None, 41.001, 29.001, 1000)
+            await cache.candidates(None, 41.501, 29.501, 1000)
+            points[2] = (41.002, 29.002)
+            assert cache.invalidate_point(*points[2]) == 1
+            entry = await cache.candidates(None, 41.001, 29.001, 1000)
+            await cache.candidates(None, 41.501, 29.501, 1000)
+            return sorted(i for i, _ in entry.within(41.001, 29.001, 1000))
+
+        assert asyncio.run(run()) == [1, 2]
+        assert len(calls) == 3
+        assert cache.stats()["invalidations"] == 1
+
+    def test_memory_cap_evicts_least_recently_used(self, monkeypatch):
+        """Toplam aday belleği sınırı aşınca en uzun süredir kullanılmayan kare atılmalı."""
+        use_points(monkeypatch, {i: (41.0 + i * 0.1, 29.0) for i in range(3)})
+        cache = TileCache(tile_degrees=0.01, buckets=[1000.0], ttl_seconds=60, max_bytes=2 * 24)
+
+        async def run():
+            for lat in (41.0, 41.1, 41.0, 41.2):
+                await cache.candidates(None, lat, 29.0, 1000)
+
+        asyncio.run(run())
+        stats = cache.stats()
+        assert (stats["entries"], stats["bytes"], stats["evictions"]) == (2, 48, 1)
+        assert cache.key(41.1, 29.0, 1000.0) not in cache._entries
+
+
+class TestNearestPageSource:
+    """/near-me ve /list sayfalarının mesafe kaynağının TILE_CACHE_ENABLED ile seçilmesi ile ilgili testler."""
+
+    def _run(self, monkeypatch, enabled: bool):
+        points = {1: (41.0, 29.0), 2: (41.003, 29.003), 3: (41.2, 29.2)}
+        use_points(monkeypatch, points)
+        postgis_calls = []
+
+        async def cards_by_ids(db, ids, open_second=None):
+            return [SimpleNamespace(branch_id=i) for i in ids]
+
+        async def postgis_nearest(**kwargs):
+            postgis_calls.append(kwargs)
+            return [(SimpleNamespace(branch_id=1), 12.5)]
+
+        monkeypatch.setattr(crud, "get_branch_cards_by_ids", cards_by_ids)
+        monkeypatch.setattr(crud, "find_nearest_businesses_ordered", postgis_nearest)
+        monkeypatch.setattr(service, "spatial_index", SimpleNamespace(ready=False))
+        monkeypatch.setattr(service, "tile_cache", TileCache(tile_degrees=0.01, buckets=[1000.0], ttl_seconds=60,
+                                                             max_bytes=10 ** 8))
+        monkeypatch.setattr(service, "TILE_CACHE_ENABLED", enabled)
+        rows, cursor = asyncio.run(service._nearest_page(Point(x=29.001, y=41.001), 1, None, 1000, None, None))
+        return rows, service.decode_cursor(cursor, str, float, int) if cursor else None, postgis_calls
+
+    def test_disabled_uses_postgis_distances(self, monkeypatch):
+        """Kapalıyken (varsayılan) index hazır değilse mesafeler PostGIS'ten gelmeli."""
+        rows, cursor, postgis_calls = self._run(monkeypatch, enabled=False)
+
+        assert [(card.branch_id, distance) for card, distance in rows] == [(1, 12.5)]
+        assert len(postgis_calls) == 1 and cursor is None
+
+    def test_enabled_uses_tile_candidates_and_sphere_distances(self, monkeypatch):
+        """Açıkken sonuçlar kare adaylarından, küre mesafesiyle ve bellek cursor'ıyla dönmeli."""
+        rows, cursor, postgis_calls = self._run(monkeypatch, enabled=True)
+
+        expected = haversine(41.001, 29.001, 41.0, 29.0)
+        assert [card.branch_id for card, _ in rows] == [1]
+        assert abs(rows[0][1] - expected) < 1e-6
+        assert postgis_calls == []
+        assert cursor[0] == service.INDEX_CURSOR and cursor[2] == 1